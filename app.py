@@ -1,10 +1,214 @@
-from flask import Flask, render_template, jsonify
+from flask import Flask, render_template, jsonify, Response, request
 import json
 import os
-from datetime import datetime
+import embedded
+import history
+import leagues
+import metrics
+import projections
+import shared_snapshot
+import threading
+import time
+from datetime import datetime, time as dt_time, timedelta, timezone
+from zoneinfo import ZoneInfo
 
 app = Flask(__name__)
 CACHE_FILE = "standings_cache.json"
+GAMES_INDEX_FILE = "games_index.json"   # juegos por día local (lo escribe update_cache)
+HISTORY_FILE = "standings_history.jsonl"   # deltas de la tabla por ciclo (lo escribe update_cache)
+MAX_RANGE_DAYS = 366
+SCL = ZoneInfo("America/Santiago")
+METRICS_FILE = os.getenv("METRICS_FILE", "refresh_stats.json")
+# Latido del worker: último ciclo completado aunque los datos no hayan cambiado y
+# cuándo toca el próximo. La web no mantiene conexiones abiertas: consulta
+# /api/status cuando el worker debería haber terminado y, si hubo ciclo nuevo,
+# revalida /api/full con su ETag (304 sin cuerpo si no cambió)
+HEARTBEAT_FILE = os.getenv("HEARTBEAT_FILE", "refresh_heartbeat.json")
+
+# Cada cuánto (seg) se revisa mtime/size del cache; entre revisiones no se toca el disco
+SNAPSHOT_CHECK_SECONDS = float(os.getenv("SNAPSHOT_CHECK_SECONDS", "1"))
+
+# ===== Refresher embebido (EMBEDDED_REFRESH=1) =====
+# Un worker elegido por lock refresca el cache y publica cada snapshot en memoria
+# compartida; todos los workers lo leen de ahí comparando la generación, sin mirar
+# el disco ni re-parsear. Mientras no haya nada publicado se usa el archivo.
+EMBEDDED_REFRESH = embedded.ENABLED
+if EMBEDDED_REFRESH:
+    embedded.start()
+
+# ===== Ligas =====
+# /api/full sirve la liga por defecto; /api/<liga>/full el resto (leagues/*.json).
+# Las ligas se leen al arrancar: agregar una requiere reiniciar la web.
+_LEAGUES = leagues.load_leagues()
+DEFAULT_LEAGUE_SLUG = leagues.default_slug(_LEAGUES)
+LEAGUE_SLUGS = {lg.slug for lg in _LEAGUES} or {DEFAULT_LEAGUE_SLUG}
+
+# ===== Snapshot en memoria (uno por archivo de cache) =====
+# key = (mtime_ns, size) del archivo o ("shm", generación); body = bytes JSON ya serializados
+# variants = {"identity"|"gzip"|"br": bytes}; etag = hash del contenido
+# data = payload parseado (desde memoria compartida se parsea recién al pedirlo)
+def _empty_snapshot():
+    return {"key": None, "data": None, "body": None, "variants": {}, "etag": None,
+            "last_modified": None, "checked_at": 0.0}
+
+
+_snapshots = {CACHE_FILE: _empty_snapshot()}
+_snapshot_lock = threading.Lock()
+_shared_readers = {}   # ruta del cache → SnapshotReader del segmento compartido
+_heartbeat = {"key": None, "data": None, "checked_at": 0.0}
+
+# Historial: lectura incremental del log (sólo se parsea lo agregado)
+_histories = {}
+_history_lock = threading.Lock()
+
+# Proyecciones: una simulación por (cache, etag, cupos), las PROJECTION_CACHE_SIZE más
+# recientes. Cada clave se calcula una sola vez (los requests concurrentes de esa clave
+# esperan el resultado); claves distintas no se bloquean entre sí.
+PROJECTION_CACHE_SIZE = int(os.getenv("PROJECTION_CACHE_SIZE", "32"))
+_projections = {}   # (ruta, etag, cupos) → _Projection, de la menos a la más recientemente usada
+_projection_lock = threading.Lock()
+
+
+class _Projection:
+    __slots__ = ("done", "result")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+
+
+def _league_cache_file(slug):
+    if slug == DEFAULT_LEAGUE_SLUG:
+        return CACHE_FILE
+    return leagues.cache_file_for(slug, DEFAULT_LEAGUE_SLUG)
+
+
+def _league_games_file(slug):
+    if slug == DEFAULT_LEAGUE_SLUG:
+        return GAMES_INDEX_FILE
+    return leagues.games_index_file_for(slug, DEFAULT_LEAGUE_SLUG)
+
+
+def _league_history_file(slug):
+    if slug == DEFAULT_LEAGUE_SLUG:
+        return HISTORY_FILE
+    return leagues.history_file_for(slug, DEFAULT_LEAGUE_SLUG)
+
+
+def _load_shared(path):
+    """
+    Snapshot de `path` desde la memoria compartida del refresher embebido: sólo
+    copia las variantes si cambió la generación. None si aún no hay nada publicado.
+    """
+    with _snapshot_lock:
+        snap = _snapshots.setdefault(path, _empty_snapshot())
+        reader = _shared_readers.get(path)
+        if reader is None:
+            reader = _shared_readers[path] = shared_snapshot.SnapshotReader(embedded.segment_path(path))
+        key = snap["key"]
+        since = key[1] if key and key[0] == "shm" else 0
+        found = reader.read(since)
+        if found is None:
+            return snap if since else None
+        gen, variants, etag, last_modified = found
+        snap.update(
+            key=("shm", gen), data=None, body=variants["identity"], variants=variants, etag=etag,
+            last_modified=datetime.fromtimestamp(last_modified, tz=timezone.utc),
+            checked_at=time.monotonic(),
+        )
+        return snap
+
+
+def _snapshot_data(snap):
+    """Payload parseado del snapshot (lo usan /api/games y /api/projections)."""
+    data = snap["data"]
+    if data is None:
+        data = json.loads(snap["body"])
+        snap["data"] = data
+    return data
+
+
+def _load_snapshot(path=CACHE_FILE):
+    """
+    Devuelve el snapshot vigente de `path`, recargándolo sólo si cambió mtime o
+    tamaño del archivo de cache. Lanza FileNotFoundError si aún no existe.
+    """
+    if EMBEDDED_REFRESH:
+        snap = _load_shared(path)
+        if snap is not None:
+            return snap
+
+    snap = _snapshots.get(path)
+    now = time.monotonic()
+    if snap is not None and snap["body"] is not None and now - snap["checked_at"] < SNAPSHOT_CHECK_SECONDS:
+        return snap
+
+    with _snapshot_lock:
+        snap = _snapshots.setdefault(path, _empty_snapshot())
+        if snap["body"] is not None and now - snap["checked_at"] < SNAPSHOT_CHECK_SECONDS:
+            return snap
+        st = os.stat(path)
+        key = (st.st_mtime_ns, st.st_size)
+        if key == snap["key"]:
+            snap["checked_at"] = now
+            return snap
+
+        # last_updated viene en el payload: hora del ciclo en que cambiaron los datos
+        # (sin cambios el archivo no se reescribe); el último refresco está en /api/status
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        # Caches de versiones anteriores no traen la hora: se usa la del archivo
+        if not data.get("last_updated"):
+            data["last_updated"] = datetime.fromtimestamp(st.st_mtime).strftime("%Y-%m-%d %H:%M:%S")
+
+        body = json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        variants, etag = shared_snapshot.encode_variants(body)
+        snap.update(
+            key=key, data=data, body=body, variants=variants, etag=etag,
+            last_modified=datetime.fromtimestamp(int(st.st_mtime), tz=timezone.utc),
+            checked_at=now,
+        )
+        return snap
+
+
+def _load_heartbeat():
+    """{"last_refresh", "next_refresh"} del worker, o None; se relee sólo si cambió."""
+    now = time.monotonic()
+    if now - _heartbeat["checked_at"] < SNAPSHOT_CHECK_SECONDS:
+        return _heartbeat["data"]
+    with _snapshot_lock:
+        try:
+            st = os.stat(HEARTBEAT_FILE)
+            key = (st.st_mtime_ns, st.st_size)
+            if key != _heartbeat["key"]:
+                with open(HEARTBEAT_FILE, "r", encoding="utf-8") as f:
+                    _heartbeat.update(key=key, data=json.load(f))
+        except (OSError, ValueError):
+            pass
+        _heartbeat["checked_at"] = now
+        return _heartbeat["data"]
+
+
+def _pick_encoding(snap):
+    """Elige br > gzip > identity según Accept-Encoding."""
+    accepted = request.accept_encodings
+    for enc in ("br", "gzip"):
+        if enc in snap["variants"] and accepted[enc] > 0:
+            return enc
+    return "identity"
+
+
+def _variant_etag(snap, encoding):
+    # ETag fuerte distinto por codificación (misma base = mismo contenido)
+    return snap["etag"] if encoding == "identity" else f"{snap['etag']}-{encoding}"
+
+
+def _is_not_modified(snap):
+    if request.if_none_match:
+        return any(request.if_none_match.contains(_variant_etag(snap, enc)) for enc in snap["variants"])
+    ims = request.if_modified_since
+    return ims is not None and snap["last_modified"] <= ims
+
 
 @app.route("/")
 def index():
@@ -12,19 +216,250 @@ def index():
 
 @app.route("/api/full")
 def api_full():
-    if not os.path.exists(CACHE_FILE):
+    return _serve_snapshot(CACHE_FILE)
+
+@app.route("/api/<league>/full")
+def api_league_full(league):
+    if league not in LEAGUE_SLUGS:
+        return jsonify({"error": f"Unknown league: {league}"}), 404
+    return _serve_snapshot(_league_cache_file(league))
+
+@app.route("/api/status")
+def api_status():
+    """
+    Cuándo terminó el último refresco (los datos de /api/full cambian sólo si hubo
+    novedades) y en cuántos segundos se espera el próximo (retry_after).
+    """
+    beat = _load_heartbeat()
+    if beat is None:
         return jsonify({"error": "Data not available yet, please try again in a few minutes."}), 503
+    status = {"last_refresh": beat.get("last_refresh")}
+    if beat.get("next_refresh"):
+        status["retry_after"] = max(int(beat["next_refresh"] - time.time()), 0)
+    resp = jsonify(status)
+    resp.headers["Cache-Control"] = "no-cache"
+    return resp
+
+def _snapshot_or_error(path):
+    """(snapshot, None) o (None, respuesta de error) para `path`."""
+    try:
+        return _load_snapshot(path), None
+    except FileNotFoundError:
+        return None, (jsonify({"error": "Data not available yet, please try again in a few minutes."}), 503)
+    except Exception as e:
+        # Si ya teníamos un snapshot válido, se sigue sirviendo
+        snap = _snapshots.get(path)
+        if snap is None or snap["body"] is None:
+            return None, (jsonify({"error": f"Failed to read cached data: {e}"}), 500)
+        return snap, None
+
+def _serve_snapshot(path):
+    snap, error = _snapshot_or_error(path)
+    if error:
+        return error
+
+    encoding = _pick_encoding(snap)
+    headers = {
+        "ETag": f'"{_variant_etag(snap, encoding)}"',
+        "Last-Modified": snap["last_modified"].strftime("%a, %d %b %Y %H:%M:%S GMT"),
+        "Cache-Control": "no-cache",  # el navegador guarda la copia pero revalida siempre
+        "Vary": "Accept-Encoding",
+    }
+    if _is_not_modified(snap):
+        return Response(status=304, headers=headers)
+
+    if encoding != "identity":
+        headers["Content-Encoding"] = encoding
+    return Response(snap["variants"][encoding], mimetype="application/json", headers=headers)
+
+@app.route("/api/games")
+def api_games():
+    return _serve_games(GAMES_INDEX_FILE)
+
+@app.route("/api/<league>/games")
+def api_league_games(league):
+    if league not in LEAGUE_SLUGS:
+        return jsonify({"error": f"Unknown league: {league}"}), 404
+    return _serve_games(_league_games_file(league))
+
+def _parse_day(s):
+    return datetime.strptime(s, "%Y-%m-%d").date()
+
+def _serve_games(path):
+    """
+    Juegos por día desde el índice del worker (sin tocar el upstream):
+      ?day=YYYY-MM-DD                    un día (por defecto, hoy)
+      ?from=YYYY-MM-DD&to=YYYY-MM-DD     rango inclusive (máx. MAX_RANGE_DAYS)
+    Los días siguen la ventana del worker (día deportivo 06:00–05:59 o calendario).
+    """
+    snap, error = _snapshot_or_error(path)
+    if error:
+        return error
+    index = _snapshot_data(snap)
+
+    try:
+        if "from" in request.args or "to" in request.args:
+            first = _parse_day(request.args.get("from") or request.args["to"])
+            last = _parse_day(request.args.get("to") or request.args["from"])
+        elif request.args.get("day"):
+            first = last = _parse_day(request.args["day"])
+        else:
+            now = datetime.now(SCL) - timedelta(hours=index.get("day_start_hour") or 0)
+            first = last = now.date()
+    except ValueError:
+        return jsonify({"error": "Invalid date, use YYYY-MM-DD."}), 400
+    if last < first or (last - first).days >= MAX_RANGE_DAYS:
+        return jsonify({"error": f"Invalid range (from <= to, at most {MAX_RANGE_DAYS} days)."}), 400
+
+    lo, hi = first.isoformat(), last.isoformat()
+    days = {d: lines for d, lines in sorted((index.get("days") or {}).items()) if lo <= d <= hi}
+    body = {
+        "from": lo,
+        "to": hi,
+        "day_window": index.get("day_window"),
+        "days": days,
+        "games": [line for lines in days.values() for line in lines],
+        "last_updated": index.get("last_updated"),
+    }
+    resp = jsonify(body)
+    resp.headers["Cache-Control"] = "no-cache"
+    return resp
+
+@app.route("/api/history")
+def api_history():
+    return _serve_history(HISTORY_FILE)
+
+@app.route("/api/<league>/history")
+def api_league_history(league):
+    if league not in LEAGUE_SLUGS:
+        return jsonify({"error": f"Unknown league: {league}"}), 404
+    return _serve_history(_league_history_file(league))
+
+def _parse_ts(s, end_of_day=False):
+    """
+    "YYYY-MM-DD HH:MM:SS[±HH:MM]" o "YYYY-MM-DD" → instante epoch del log. Sin
+    offset se toma como hora Chile (en la hora repetida de fin de horario de
+    verano, la primera pasada; con offset no hay ambigüedad).
+    """
+    if len(s) == 10:
+        # Fin del día = la última pasada de las 23:59:59 (fold=1 si se repite)
+        day = datetime.combine(_parse_day(s), dt_time(23, 59, 59, fold=1) if end_of_day else dt_time())
+        return int(day.replace(tzinfo=SCL).timestamp())
+    d = datetime.fromisoformat(s)
+    if d.tzinfo is None:
+        d = d.replace(tzinfo=SCL)
+    return int(d.timestamp())
+
+def _history_entry(entry):
+    # Para mostrar: la hora Chile (con offset) junto al instante `t`
+    return dict(entry, ts=history.local_ts(entry["t"]))
+
+def _serve_history(path):
+    """
+    Historial de la tabla desde el log del worker:
+      ?since=TS     registros (keyframes y deltas) posteriores a TS; sin parámetros,
+                    desde la última keyframe (alcanza para armar la tabla actual)
+      ?at=TS        tabla y juegos reconstruidos a esa hora
+    TS = "YYYY-MM-DD HH:MM:SS" o "YYYY-MM-DD", hora Chile (o con offset explícito).
+    Cada registro trae `t` (epoch, el orden real) y `ts` (hora Chile con offset).
+    """
+    try:
+        since = _parse_ts(request.args["since"]) if request.args.get("since") else None
+        at = _parse_ts(request.args["at"], end_of_day=True) if request.args.get("at") else None
+    except ValueError:
+        return jsonify({"error": "Invalid time, use YYYY-MM-DD or YYYY-MM-DD HH:MM:SS."}), 400
+
+    with _history_lock:
+        log = _histories.get(path)
+        if log is None:
+            log = _histories[path] = history.HistoryLog(path)
+        try:
+            log.refresh()
+        except Exception as e:
+            return jsonify({"error": f"Failed to read history: {e}"}), 500
+        if at is not None:
+            state = log.state_at(at)
+            if state is None:
+                return jsonify({"error": f"No history at {history.local_ts(at)}."}), 404
+            body = {"at": history.local_ts(at), "t": state["t"], "ts": history.local_ts(state["t"]),
+                    "standings": state["standings"], "days": state["days"]}
+        else:
+            entries = [_history_entry(e) for e in log.since(since)]
+            body = {"since": history.local_ts(since) if since is not None else None, "entries": entries,
+                    "last": history.local_ts(log.entries[-1]["t"]) if log.entries else None}
+        resp = jsonify(body)
+    resp.headers["Cache-Control"] = "no-cache"
+    return resp
+
+@app.route("/api/projections")
+def api_projections():
+    return _serve_projections(CACHE_FILE)
+
+@app.route("/api/<league>/projections")
+def api_league_projections(league):
+    if league not in LEAGUE_SLUGS:
+        return jsonify({"error": f"Unknown league: {league}"}), 404
+    return _serve_projections(_league_cache_file(league))
+
+def _serve_projections(path):
+    """
+    Probabilidad de clasificar / quedar eliminado por equipo (ver projections.py):
+      ?spots=N   cupos de clasificación (por defecto PLAYOFF_SPOTS)
+    """
+    snap, error = _snapshot_or_error(path)
+    if error:
+        return error
+    try:
+        spots = int(request.args.get("spots") or projections.PLAYOFF_SPOTS)
+    except ValueError:
+        return jsonify({"error": "Invalid spots, use an integer."}), 400
+    if spots < 1:
+        return jsonify({"error": "Invalid spots, use an integer >= 1."}), 400
+
+    data = _snapshot_data(snap)
+    standings = data.get("standings") or []
+    # Más cupos que equipos es lo mismo que todos: una sola entrada en el cache
+    spots = min(spots, len(standings))
+
+    key = (path, snap["etag"], spots)
+    with _projection_lock:
+        entry = _projections.pop(key, None)
+        owner = entry is None
+        if owner:
+            entry = _Projection()
+        _projections[key] = entry
+        while len(_projections) > PROJECTION_CACHE_SIZE:
+            del _projections[next(iter(_projections))]
+    if owner:
+        try:
+            result = projections.project(standings, spots=spots)
+            result["last_updated"] = data.get("last_updated")
+            entry.result = result
+        finally:
+            if entry.result is None:
+                # Falló: que el próximo request lo vuelva a intentar
+                with _projection_lock:
+                    if _projections.get(key) is entry:
+                        del _projections[key]
+            entry.done.set()
+    entry.done.wait()
+    if entry.result is None:
+        return jsonify({"error": "Failed to compute projections, please try again."}), 500
+    resp = jsonify(entry.result)
+    resp.headers["Cache-Control"] = "no-cache"
+    return resp
 
+@app.route("/metrics")
+def metrics_endpoint():
+    """Métricas del worker de refresco en formato Prometheus (desde METRICS_FILE)."""
     try:
-        with open(CACHE_FILE, "r", encoding="utf-8") as f:
+        with open(METRICS_FILE, "r", encoding="utf-8") as f:
             data = json.load(f)
-        
-        # Opcional: añadir la marca de tiempo de la última actualización
-        data["last_updated"] = datetime.fromtimestamp(os.path.getmtime(CACHE_FILE)).strftime("%Y-%m-%d %H:%M:%S")
-        
-        return jsonify(data)
+    except FileNotFoundError:
+        data = {}
     except Exception as e:
-        return jsonify({"error": f"Failed to read cached data: {e}"}), 500
+        return Response(f"# error leyendo {METRICS_FILE}: {e}\n", status=500, mimetype="text/plain")
+    return Response(metrics.render_prometheus(data), mimetype="text/plain; version=0.0.4")
 
 if __name__ == "__main__":
-    app.run(debug=True)
\ No newline at end of file
+    app.run(debug=True)
@@ -0,0 +1,246 @@
+# bench/baseline_standings.py
+# Copia CONGELADA del cálculo original (commit inicial de
+# standings_cascade_points_desc.py): una pasada secuencial por equipo, sin
+# caches, sin store y sin paralelismo. Es la referencia contra la que
+# bench/replay.py y tests/test_replay.py comparan el motor actual.
+#
+# No tocar la lógica: si el motor cambia a propósito el resultado (reglas,
+# ventana de "hoy"), el banco lo neutraliza en el motor, no aquí.
+# Sólo se quitaron prints/dumps y la config quedó en configure() para poder
+# apuntar API a un servidor local y usar la liga del banco.
+
+import re, time
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+import requests
+
+API = "https://mlb25.theshow.com/apis/game_history.json"
+PLATFORM = "psn"
+MODE = "LEAGUE"
+SINCE = datetime(2025, 8, 23)
+PAGES = (1, 2, 3, 4, 5, 6)
+TIMEOUT = 20
+RETRIES = 2
+SCHEDULED = 13
+
+LEAGUE_ORDER = []
+FETCH_ALIASES = {}
+TEAM_RECORD_ADJUSTMENTS = {}
+TEAM_POINT_ADJUSTMENTS = {}
+LEAGUE_USERS_NORM = set()
+
+
+def configure(cfg, api=None, pages=None):
+    """Carga una leagues.LeagueConfig (y opcionalmente API/PAGES) en los globals."""
+    global SINCE, SCHEDULED, LEAGUE_ORDER, FETCH_ALIASES, TEAM_RECORD_ADJUSTMENTS, TEAM_POINT_ADJUSTMENTS
+    global LEAGUE_USERS_NORM, API, PAGES
+    SINCE = cfg.since
+    SCHEDULED = cfg.scheduled
+    LEAGUE_ORDER = list(cfg.league_order)
+    FETCH_ALIASES = dict(cfg.fetch_aliases)
+    TEAM_RECORD_ADJUSTMENTS = dict(cfg.team_record_adjustments)
+    TEAM_POINT_ADJUSTMENTS = dict(cfg.team_point_adjustments)
+    LEAGUE_USERS_NORM = {u.lower() for u in cfg.league_users}
+    if api is not None:
+        API = api
+    if pages is not None:
+        PAGES = tuple(pages)
+
+
+# ===== Utilidades =====
+BXX_RE = re.compile(r"\^(b\d+)\^", flags=re.IGNORECASE)
+
+def normalize_user_for_compare(raw: str) -> str:
+    if not raw: return ""
+    return BXX_RE.sub("", raw).strip().lower()
+
+def is_cpu(raw: str) -> bool:
+    return normalize_user_for_compare(raw) == "cpu"
+
+def parse_date(s: str):
+    for fmt in ("%m/%d/%Y %H:%M:%S", "%m/%d/%Y %H:%M"):
+        try:
+            return datetime.strptime(s, fmt)
+        except:
+            pass
+    return None
+
+def fetch_page(username: str, page: int):
+    params = {"username": username, "platform": PLATFORM, "page": page}
+    for _ in range(RETRIES):
+        try:
+            r = requests.get(API, params=params, timeout=TIMEOUT)
+            r.raise_for_status()
+            return (r.json() or {}).get("game_history") or []
+        except Exception:
+            time.sleep(0.4)
+    return []
+
+def dedup_by_id(gs):
+    seen = set(); out = []
+    for g in gs:
+        gid = str(g.get("id") or "")
+        if gid and gid in seen:
+            continue
+        if gid:
+            seen.add(gid)
+        out.append(g)
+    return out
+
+def norm_team(s: str) -> str:
+    return (s or "").strip().lower()
+
+def compute_team_record_for_user(username_exact: str, team_name: str):
+    # 1) Descargar páginas del usuario PRINCIPAL y de sus ALIAS; luego deduplicar globalmente por id
+    pages_raw = []
+    usernames_to_fetch = [username_exact] + FETCH_ALIASES.get(username_exact, [])
+    for uname in usernames_to_fetch:
+        for p in PAGES:
+            pages_raw += fetch_page(uname, p)
+    pages_dedup = dedup_by_id(pages_raw)
+
+    # 2) Filtrar: LEAGUE + fecha + que juegue ese equipo + rival válido
+    considered = []
+    for g in pages_dedup:
+        if (g.get("game_mode") or "").strip().upper() != MODE:
+            continue
+        d = parse_date(g.get("display_date",""))
+        if not d or d < SINCE:
+            continue
+
+        home = (g.get("home_full_name") or "").strip()
+        away = (g.get("away_full_name") or "").strip()
+        if norm_team(team_name) not in (norm_team(home), norm_team(away)):
+            continue
+
+        # Filtro: ambos miembros o CPU + miembro
+        home_name_raw = g.get("home_name","")
+        away_name_raw = g.get("away_name","")
+        h_norm = normalize_user_for_compare(home_name_raw)
+        a_norm = normalize_user_for_compare(away_name_raw)
+        h_mem = h_norm in LEAGUE_USERS_NORM
+        a_mem = a_norm in LEAGUE_USERS_NORM
+        if not ( (h_mem and a_mem) or (is_cpu(home_name_raw) and a_mem) or (is_cpu(away_name_raw) and h_mem) ):
+            continue
+
+        considered.append(g)
+
+    # 3) Contar W/L
+    wins = losses = 0
+    for g in considered:
+        home = (g.get("home_full_name") or "").strip()
+        away = (g.get("away_full_name") or "").strip()
+        hr = (g.get("home_display_result") or "").strip().upper()
+        ar = (g.get("away_display_result") or "").strip().upper()
+        if hr == "W":
+            win, lose = home, away
+        elif ar == "W":
+            win, lose = away, home
+        else:
+            continue
+
+        if norm_team(win) == norm_team(team_name):
+            wins += 1
+        elif norm_team(lose) == norm_team(team_name):
+            losses += 1
+
+    # 4) Ajuste algebraico del equipo (W/L)
+    adj_w, adj_l = TEAM_RECORD_ADJUSTMENTS.get(team_name, (0, 0))
+    wins_adj, losses_adj = wins + adj_w, losses + adj_l
+
+    # 5) Puntos y métricas de tabla
+    scheduled = SCHEDULED
+    played = max(wins_adj + losses_adj, 0)
+    remaining = max(scheduled - played, 0)
+    points_base = 3 * wins_adj + 2 * losses_adj
+
+    # 6) Ajuste manual de PUNTOS (desconexiones, sanciones, etc.)
+    pts_extra, pts_reason = TEAM_POINT_ADJUSTMENTS.get(team_name, (0, ""))
+    points_final = points_base + pts_extra
+
+    return {
+        "user": username_exact,
+        "team": team_name,
+        "scheduled": scheduled,
+        "played": played,
+        "wins": wins_adj,
+        "losses": losses_adj,
+        "remaining": remaining,
+        "points": points_final,
+        "points_base": points_base,
+        "points_extra": pts_extra,
+        "points_reason": pts_reason,
+        "detail": [],
+    }
+
+def compute_rows():
+    rows = []
+    for user_exact, team_name in LEAGUE_ORDER:
+        rows.append(compute_team_record_for_user(user_exact, team_name))
+    rows.sort(key=lambda r: (-r.get("points", 0), -r.get("wins", 0), r.get("losses", 0)))
+    return rows
+
+def games_played_today_scl():
+    tz_scl = ZoneInfo("America/Santiago")
+    tz_utc = ZoneInfo("UTC")
+    today_local = datetime.now(tz_scl).date()
+
+    all_pages = []
+    for username_exact, _team in LEAGUE_ORDER:
+        for p in PAGES:
+            all_pages += fetch_page(username_exact, p)
+
+    seen_ids = set()
+    seen_keys = set()  # (home, away, hr, ar, pitcher_info)
+    items = []
+
+    for g in dedup_by_id(all_pages):
+        if (g.get("game_mode") or "").strip().upper() != MODE:
+            continue
+
+        d = parse_date(g.get("display_date", ""))
+        if not d:
+            continue
+
+        if d.tzinfo is None:
+            d = d.replace(tzinfo=tz_utc)
+        d_local = d.astimezone(tz_scl)
+
+        if d_local.date() != today_local:
+            continue
+
+        home_name_raw = (g.get("home_name") or "")
+        away_name_raw = (g.get("away_name") or "")
+        h_norm = normalize_user_for_compare(home_name_raw)
+        a_norm = normalize_user_for_compare(away_name_raw)
+        if not (h_norm in LEAGUE_USERS_NORM and a_norm in LEAGUE_USERS_NORM):
+            continue
+
+        gid = str(g.get("id") or "")
+        if gid and gid in seen_ids:
+            continue
+
+        home = (g.get("home_full_name") or "").strip()
+        away = (g.get("away_full_name") or "").strip()
+        hr = str(g.get("home_runs") or "0")
+        ar = str(g.get("away_runs") or "0")
+        pitcher_info = (g.get("display_pitcher_info") or "").strip()
+
+        canon_key = (home, away, hr, ar, pitcher_info)
+        if canon_key in seen_keys:
+            continue
+
+        if gid:
+            seen_ids.add(gid)
+        seen_keys.add(canon_key)
+
+        try:
+            fecha_hora = d_local.strftime("%d-%m-%Y - %-I:%M %p").lower()
+        except Exception:
+            fecha_hora = d_local.strftime("%d-%m-%Y - %#I:%M %p").lower()
+
+        items.append((d_local, f"{home} {hr} - {away} {ar}  - {fecha_hora} (hora Chile)"))
+
+    items.sort(key=lambda x: x[0])
+    return [s for _, s in items]
@@ -0,0 +1,127 @@
+# bench/bench_records.py
+# Microbenchmark del loop de clasificación: historial sintético de N juegos,
+# filtro + conteo W/L al estilo original (strptime + normalización por comparación)
+# contra GameRecord (parseo único, campos precomputados).
+#
+# Uso:  python bench/bench_records.py [N]     (por defecto 100000)
+
+import os, random, sys, time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import standings_cascade_points_desc as s
+
+
+def synthetic_games(n, seed=1):
+    rnd = random.Random(seed)
+    league = list(s.LEAGUE_ORDER)
+    base = datetime(2025, 8, 1)
+    out = []
+    for gid in range(n):
+        (hu, ht), (au, at) = rnd.sample(league, 2)
+        if rnd.random() < 0.1:
+            au, at = "CPU^b12^", "Reds"
+        hw = rnd.random() < 0.5
+        d = base + timedelta(minutes=rnd.randint(0, 60 * 24 * 90))
+        fmt = "%m/%d/%Y %H:%M:%S" if rnd.random() < 0.9 else "%m/%d/%Y %H:%M"
+        out.append({
+            "id": gid,
+            "game_mode": rnd.choice(["LEAGUE", "LEAGUE", "LEAGUE", "RS"]),
+            "display_date": d.strftime(fmt),
+            "home_full_name": ht, "away_full_name": at,
+            "home_name": hu, "away_name": au,
+            "home_display_result": "W" if hw else "L",
+            "away_display_result": "L" if hw else "W",
+        })
+    return out
+
+
+def _legacy_parse_date(v):
+    for fmt in ("%m/%d/%Y %H:%M:%S", "%m/%d/%Y %H:%M"):
+        try:
+            return datetime.strptime(v, fmt)
+        except ValueError:
+            pass
+    return None
+
+
+def legacy_count(games, team_name):
+    # Copia del loop original de compute_team_record_for_user
+    wins = losses = 0
+    for g in games:
+        if (g.get("game_mode") or "").strip().upper() != s.MODE:
+            continue
+        d = _legacy_parse_date(g.get("display_date", ""))
+        if not d or d < s.SINCE:
+            continue
+        home = (g.get("home_full_name") or "").strip()
+        away = (g.get("away_full_name") or "").strip()
+        if s.norm_team(team_name) not in (s.norm_team(home), s.norm_team(away)):
+            continue
+        h_raw, a_raw = g.get("home_name", ""), g.get("away_name", "")
+        h_mem = s.BXX_RE.sub("", h_raw).strip().lower() in s.LEAGUE_USERS_NORM
+        a_mem = s.BXX_RE.sub("", a_raw).strip().lower() in s.LEAGUE_USERS_NORM
+        h_cpu = s.BXX_RE.sub("", h_raw).strip().lower() == "cpu"
+        a_cpu = s.BXX_RE.sub("", a_raw).strip().lower() == "cpu"
+        if not ((h_mem and a_mem) or (h_cpu and a_mem) or (a_cpu and h_mem)):
+            continue
+        hr = (g.get("home_display_result") or "").strip().upper()
+        ar = (g.get("away_display_result") or "").strip().upper()
+        if hr == "W":
+            win, lose = home, away
+        elif ar == "W":
+            win, lose = away, home
+        else:
+            continue
+        if s.norm_team(win) == s.norm_team(team_name):
+            wins += 1
+        elif s.norm_team(lose) == s.norm_team(team_name):
+            losses += 1
+    return wins, losses
+
+
+def record_count(records, team_name):
+    key = s.norm_team(team_name)
+    wins = losses = 0
+    for rec in records:
+        if not rec.is_mode or not rec.dt or rec.dt < s.SINCE:
+            continue
+        if key != rec.home_key and key != rec.away_key:
+            continue
+        if not rec.league_match or rec.winner is None:
+            continue
+        win_key, lose_key = (rec.home_key, rec.away_key) if rec.winner == "home" else (rec.away_key, rec.home_key)
+        if win_key == key:
+            wins += 1
+        elif lose_key == key:
+            losses += 1
+    return wins, losses
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    games = synthetic_games(n)
+    teams = [t for _u, t in s.LEAGUE_ORDER]
+
+    t0 = time.perf_counter()
+    legacy = [legacy_count(games, t) for t in teams]
+    t_legacy = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    s._RECORDS.clear()
+    records = [s.game_record(g) for g in games]
+    t_parse = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    fast = [record_count(records, t) for t in teams]
+    t_filter = time.perf_counter() - t0
+
+    assert legacy == fast, "los conteos no coinciden"
+    total = t_parse + t_filter
+    print(f"{n} juegos × {len(teams)} equipos")
+    print(f"  original (strptime + normalización por comparación): {t_legacy:8.3f} s")
+    print(f"  GameRecord: parseo {t_parse:.3f} s + filtros {t_filter:.3f} s = {total:8.3f} s")
+    print(f"  speedup: x{t_legacy / total:.1f}")
+
+
+if __name__ == "__main__":
+    main()
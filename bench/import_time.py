@@ -0,0 +1,72 @@
+# bench/import_time.py
+# Tiempo de import en frío de cada punto de entrada (un intérprete nuevo por
+# medición, como un arranque de Render o un worker de gunicorn recién creado):
+#   app                               → tier web
+#   update_cache                      → worker / --once
+#   standings_cascade_points_desc     → motor
+#
+# Usa `python -X importtime` y reporta mediana y mínimo del tiempo acumulado del
+# módulo, los imports más pesados y si quedaron cargados `requests`/`sqlite3`
+# (no deberían: se cargan en la primera descarga / primer uso del almacén).
+#
+# Uso:  python bench/import_time.py [--runs 7] [--top 8] [modulo ...]
+
+import argparse, os, re, statistics, subprocess, sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TARGETS = ("app", "update_cache", "standings_cascade_points_desc")
+HEAVY = ("requests", "sqlite3", "concurrent.futures")
+
+LINE_RE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def import_once(module):
+    """(µs acumulados del módulo, [(µs, nombre)] de su subárbol de imports, módulos pesados cargados)."""
+    code = f"import sys, {module}; print(','.join(m for m in {HEAVY!r} if m in sys.modules))"
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=ROOT,
+                          capture_output=True, text=True, check=True)
+    rows = []
+    for line in proc.stderr.splitlines():
+        m = LINE_RE.match(line)
+        if m:
+            rows.append((int(m.group(2)), len(m.group(3)), m.group(4)))
+    # -X importtime imprime los hijos antes que el padre: el subárbol del módulo son
+    # las líneas inmediatamente anteriores con más sangría (lo del arranque queda fuera)
+    i = max(k for k, r in enumerate(rows) if r[2] == module)
+    total, depth = rows[i][0], rows[i][1]
+    entries = []
+    for cumulative, indent, name in reversed(rows[:i]):
+        if indent <= depth:
+            break
+        entries.append((cumulative, name))
+    loaded = [m for m in proc.stdout.strip().split(",") if m]
+    return total, entries, loaded
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("modules", nargs="*", default=TARGETS)
+    ap.add_argument("--runs", type=int, default=7)
+    ap.add_argument("--top", type=int, default=8, help="imports más pesados a listar por módulo")
+    args = ap.parse_args()
+
+    print(f"{'módulo':<32} {'mediana ms':>10} {'mín ms':>8}  cargados")
+    details = {}
+    for module in args.modules:
+        times, loaded = [], []
+        for _ in range(args.runs):
+            total, entries, loaded = import_once(module)
+            times.append(total / 1000)
+        details[module] = entries
+        print(f"{module:<32} {statistics.median(times):>10.1f} {min(times):>8.1f}  {', '.join(loaded) or '-'}")
+
+    if args.top:
+        for module, entries in details.items():
+            print(f"\n{module}: imports más pesados (acumulado, última medición)")
+            for cumulative, name in sorted(entries, reverse=True)[:args.top]:
+                print(f"  {cumulative / 1000:>8.1f} ms  {name}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,417 @@
+# bench/replay.py
+# Banco de pruebas offline del ciclo de refresco: levanta un servidor local que
+# imita game_history.json (fixtures grabados o páginas sintéticas), apunta el
+# módulo de standings a él y mide compute_rows, games_played_today_scl y
+# update_data_cache en cada combinación de modos del motor.
+#
+# Reporta por etapa: tiempo real, CPU, requests al "upstream" y memoria pico.
+# Verifica además, ciclo a ciclo, standings y juegos de hoy contra la copia
+# congelada del cálculo original (bench/baseline_standings.py). El historial
+# sintético crece entre ciclos y en los ciclos de --fail-cycles algunas
+# páginas responden HTTP 500: ahí sólo pueden diferir las filas de los
+# usuarios afectados, y marcadas como stale; el ciclo siguiente debe volver
+# a coincidir con la referencia.
+#
+# Uso:
+#   python bench/replay.py                                  # liga sintética por defecto
+#   python bench/replay.py --users 40 --pages 10 --per-page 25 --latency-ms 80
+#   python bench/replay.py --cycles 6 --fail-cycles 2,4 --growth 10
+#   python bench/replay.py --record fixtures/               # graba páginas reales de LEAGUE_ORDER
+#   python bench/replay.py --fixtures fixtures/             # reproduce lo grabado
+
+import argparse, contextlib, copy, io, json, os, random, shutil, sys, tempfile, threading, time, tracemalloc
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import baseline_standings as baseline
+import game_rules
+import leagues
+import standings_cascade_points_desc as s
+import update_cache
+import upstream
+
+# Modos a medir; todos se comparan contra baseline_standings
+ENGINE_MODES = [
+    ("per_team", dict(ENGINE="per_team", FETCH_WORKERS=1, INCREMENTAL=False, GAME_STORE_ENABLED=False,
+                      RESPONSE_CACHE_ENABLED=False, CHANGE_DETECTION=False)),
+    ("league", dict(ENGINE="league", FETCH_WORKERS=1, INCREMENTAL=False, GAME_STORE_ENABLED=False,
+                    RESPONSE_CACHE_ENABLED=False, CHANGE_DETECTION=False)),
+    ("league+parallel", dict(ENGINE="league", FETCH_WORKERS=6, INCREMENTAL=False, GAME_STORE_ENABLED=False,
+                             RESPONSE_CACHE_ENABLED=False, CHANGE_DETECTION=False)),
+    ("incremental", dict(ENGINE="league", FETCH_WORKERS=6, INCREMENTAL=True, GAME_STORE_ENABLED=False,
+                         RESPONSE_CACHE_ENABLED=False, CHANGE_DETECTION=True)),
+    ("default", dict(ENGINE="league", FETCH_WORKERS=6, INCREMENTAL=True, GAME_STORE_ENABLED=True,
+                     RESPONSE_CACHE_ENABLED=True, CHANGE_DETECTION=True)),
+]
+
+
+# ---------- Datos ----------
+def synthetic_league(n_users):
+    return [(f"user{i:03d}", f"Team {i:03d}") for i in range(n_users)]
+
+
+def _synthetic_game(rnd, gid, teams, now, max_minutes):
+    """Un juego al azar entre dos usuarios (10% contra CPU); devuelve (home_user, away_user, juego)."""
+    hu, au = rnd.sample(list(teams), 2)
+    if rnd.random() < 0.1:
+        au = "CPU^b07^"
+    hw = rnd.random() < 0.5
+    g = {
+        "id": gid,
+        "game_mode": "LEAGUE" if rnd.random() < 0.8 else "RS",
+        "display_date": (now - timedelta(minutes=rnd.randint(0, max_minutes))).strftime("%m/%d/%Y %H:%M:%S"),
+        "home_full_name": teams[hu], "away_full_name": teams.get(au, "Reds"),
+        "home_name": hu, "away_name": au,
+        "home_display_result": "W" if hw else "L", "away_display_result": "L" if hw else "W",
+        "home_runs": rnd.randint(0, 9), "away_runs": rnd.randint(0, 9),
+        "display_pitcher_info": f"p{gid}",
+    }
+    return hu, au, g
+
+
+def _paginate(hist, pages, per_page):
+    return {u: [{"game_history": h[i * per_page:(i + 1) * per_page]} for i in range(pages)]
+            for u, h in hist.items()}
+
+
+def synthetic_history(league, pages, per_page, seed=1):
+    """{username: [juegos ordenados id desc]} con pages*per_page juegos por usuario aprox."""
+    rnd = random.Random(seed)
+    now = datetime.utcnow().replace(second=0, microsecond=0)
+    hist = {u: [] for u, _t in league}
+    teams = dict(league)
+    n_games = max(1, len(league) * pages * per_page // 2)
+    for gid in range(1, n_games + 1):
+        hu, au, g = _synthetic_game(rnd, gid, teams, now, 60 * 24 * 30)
+        hist[hu].append(g)
+        if au in hist:
+            hist[au].append(g)
+    for u in hist:
+        hist[u].sort(key=lambda g: -g["id"])
+    return _paginate(hist, pages, per_page)
+
+
+class GrowingHistory:
+    """
+    Historial sintético que crece entre ciclos: arranca con ~fill de la
+    capacidad (pages*per_page por usuario) repartido en 30 días y cada grow()
+    agrega juegos recientes (id mayor) arriba de la p1, corriendo el resto de
+    las páginas como hace la API real.
+    """
+    def __init__(self, league, pages, per_page, fill=0.6, seed=1):
+        self.rnd = random.Random(seed)
+        self.teams = dict(league)
+        self.pages, self.per_page = pages, per_page
+        self.hist = {u: [] for u, _t in league}
+        self.next_id = 1
+        self._add(max(1, int(len(league) * pages * per_page * fill) // 2), 60 * 24 * 30)
+
+    def _add(self, n, max_minutes):
+        now = datetime.utcnow().replace(second=0, microsecond=0)
+        for _ in range(n):
+            hu, au, g = _synthetic_game(self.rnd, self.next_id, self.teams, now, max_minutes)
+            self.next_id += 1
+            self.hist[hu].insert(0, g)
+            if au in self.hist:
+                self.hist[au].insert(0, g)
+
+    def grow(self, n):
+        self._add(n, 120)
+
+    def snapshot(self):
+        """Páginas actuales; falla si algún usuario ya no cabe en PAGES (la referencia no vería sus juegos viejos)."""
+        full = [u for u, h in self.hist.items() if len(h) > self.pages * self.per_page]
+        if full:
+            raise ValueError(f"historial más largo que {self.pages}x{self.per_page} para {full[:3]}: "
+                             "bajar --growth/--cycles o subir --pages")
+        return _paginate(self.hist, self.pages, self.per_page)
+
+
+def failure_plan(usernames, cycles, fail_cycles):
+    """Por ciclo, {(usuario, página)} que responden HTTP 500: una página profunda de un usuario y la p1 de otro."""
+    plan = []
+    for cycle in range(1, cycles + 1):
+        failing = set()
+        if cycle in fail_cycles and usernames:
+            failing.add((usernames[0], min(2, len(s.PAGES))))
+            if len(usernames) > 1:
+                failing.add((usernames[1], 1))
+        plan.append(failing)
+    return plan
+
+
+def load_fixtures(path):
+    """Archivos <username>_p<page>.json con la respuesta cruda de la API."""
+    pages = {}
+    for name in sorted(os.listdir(path)):
+        if not name.endswith(".json") or "_p" not in name:
+            continue
+        user, page = name[:-5].rsplit("_p", 1)
+        with open(os.path.join(path, name), "r", encoding="utf-8") as f:
+            pages.setdefault(user, {})[int(page)] = json.load(f)
+    return {u: [ps[p] for p in sorted(ps)] for u, ps in pages.items()}
+
+
+def record_fixtures(path):
+    """Graba las PAGES reales de cada usuario (y alias) de LEAGUE_ORDER."""
+    import requests
+    os.makedirs(path, exist_ok=True)
+    for user in s._league_fetch_usernames():
+        for p in s.PAGES:
+            r = requests.get(upstream.API, params={"username": user, "platform": upstream.PLATFORM, "page": p},
+                             timeout=upstream.TIMEOUT)
+            r.raise_for_status()
+            with open(os.path.join(path, f"{user}_p{p}.json"), "w", encoding="utf-8") as f:
+                json.dump(r.json(), f, ensure_ascii=False)
+            print(f"  grabado {user} p{p}")
+
+
+# ---------- Servidor local ----------
+class FakeAPI:
+    def __init__(self, pages_by_user, latency=0.0):
+        self.pages = pages_by_user
+        self.failing = set()   # (usuario, página) que responden HTTP 500
+        self.latency = latency
+        self.requests = 0
+        self.bytes = 0
+        self._lock = threading.Lock()
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                q = parse_qs(urlparse(self.path).query)
+                user = (q.get("username") or [""])[0]
+                page = int((q.get("page") or ["1"])[0])
+                pages = api.pages.get(user, [])
+                if api.latency:
+                    time.sleep(api.latency)  # simula el round-trip al upstream
+                if (user, page) in api.failing:
+                    with api._lock:
+                        api.requests += 1
+                    self.send_error(500)
+                    return
+                body = json.dumps(pages[page - 1] if 0 < page <= len(pages) else {"game_history": []}).encode()
+                with api._lock:
+                    api.requests += 1
+                    api.bytes += len(body)
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_port}/apis/game_history.json"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+
+
+# ---------- Medición ----------
+def reset_engine(tmpdir, overrides):
+    """Estado limpio del módulo (como un proceso recién iniciado) con los modos indicados."""
+    for k, v in overrides.items():
+        setattr(upstream if hasattr(upstream, k) else s, k, v)
+    for name in ("_USER_STATE", "_PREV_ROWS", "_USER_PAGES", "_LAST_TOP_IDS", "_RECORDS", "_DAY_INDEX", "_DAY_KEYS",
+                 "_INDEXED_USERS", "_SYNCED_USERS", "_LAST_GOOD_PAGES", "_INCOMPLETE_USERS",
+                 "_OLD_DAYS", "_OLD_SEEN"):
+        getattr(s, name).clear()
+    s._INDEX_CUTOFF = None
+    for mod, name in ((s, "_GAME_STORE"), (upstream, "_RESPONSE_CACHE")):
+        obj = getattr(mod, name)
+        if obj is not None:
+            obj.close()
+        setattr(mod, name, None)
+    s.GAME_STORE_PATH = os.path.join(tmpdir, "games.db")
+    upstream.RESPONSE_CACHE_PATH = os.path.join(tmpdir, "http_cache.db")
+    update_cache.CACHE_FILE = os.path.join(tmpdir, "standings_cache.json")
+    update_cache.GAMES_INDEX_FILE = os.path.join(tmpdir, "games_index.json")
+    update_cache.HISTORY_FILE = os.path.join(tmpdir, "standings_history.jsonl")
+    update_cache.METRICS_FILE = os.path.join(tmpdir, "refresh_stats.json")
+    update_cache.HEARTBEAT_FILE = os.path.join(tmpdir, "refresh_heartbeat.json")
+    update_cache._HISTORY.clear()
+    update_cache._LAST_HASH.clear()
+
+
+def measure(api, fn):
+    req0 = api.requests
+    tracemalloc.start()
+    w0, c0 = time.perf_counter(), time.process_time()
+    result = fn()
+    wall, cpu = time.perf_counter() - w0, time.process_time() - c0
+    _cur, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, {"wall": wall, "cpu": cpu, "requests": api.requests - req0, "peak_kb": peak / 1024}
+
+
+def run_mode(api, overrides, snapshots, plan):
+    """Corre el motor en un estado limpio, un ciclo por snapshot; devuelve ([(rows, games)], reporte)."""
+    tmpdir = tempfile.mkdtemp(prefix="replay_")
+    try:
+        reset_engine(tmpdir, overrides)
+        results, report = [], []
+        for cycle, (pages, failing) in enumerate(zip(snapshots, plan), start=1):
+            api.pages, api.failing = pages, failing
+            with contextlib.redirect_stdout(io.StringIO()):
+                s.begin_refresh_cycle()
+                rows, m_rows = measure(api, s.compute_rows)
+                games, m_today = measure(api, s.games_played_today_scl)
+                _ok, m_cache = measure(api, update_cache.update_data_cache)
+            # copia: el motor reutiliza (y actualiza) las filas de un ciclo a otro
+            results.append((copy.deepcopy(rows), list(games)))
+            report.append((cycle, m_rows, m_today, m_cache))
+        return results, report
+    finally:
+        api.failing = set()
+        reset_engine(tmpdir, {})
+        shutil.rmtree(tmpdir, ignore_errors=True)
+
+
+def run_baseline(api, snapshots):
+    """Referencia por ciclo con baseline_standings, siempre sin fallas inyectadas."""
+    results, report = [], []
+    api.failing = set()
+    for cycle, pages in enumerate(snapshots, start=1):
+        api.pages = pages
+        rows, m_rows = measure(api, baseline.compute_rows)
+        games, m_today = measure(api, baseline.games_played_today_scl)
+        results.append((rows, games))
+        report.append((cycle, m_rows, m_today, None))
+    return results, report
+
+
+def check(name, results, references, plan, aliases):
+    """
+    Diferencias contra la referencia. Ciclo sin fallas: filas (en orden) y
+    juegos de hoy idénticos, ninguna fila stale. Ciclo con fallas: cada fila
+    igual a la referencia o, si su usuario (o alias) tuvo una página caída,
+    marcada stale; los juegos de hoy no se comparan.
+    """
+    problems = []
+    for cycle, ((rows, games), (ref_rows, ref_games), failing) in enumerate(zip(results, references, plan), 1):
+        plain = [{k: v for k, v in r.items() if k != "stale"} for r in rows]
+        if not failing:
+            if plain != ref_rows or games != ref_games or any(r.get("stale") for r in rows):
+                problems.append(f"{name} ciclo {cycle}: standings/juegos de hoy distintos a la referencia")
+            continue
+        failed_users = {u for u, _p in failing}
+        ref_by_team = {r["team"]: r for r in ref_rows}
+        for row, p in zip(rows, plain):
+            if p == ref_by_team.get(row["team"]):
+                continue
+            if row.get("stale") and {row["user"], *aliases.get(row["user"], [])} & failed_users:
+                continue
+            problems.append(f"{name} ciclo {cycle}: {row['team']} distinto a la referencia sin marcar stale")
+    return problems
+
+
+@contextlib.contextmanager
+def _patched(mod, **attrs):
+    old = {k: getattr(mod, k) for k in attrs}
+    for k, v in attrs.items():
+        setattr(mod, k, v)
+    try:
+        yield
+    finally:
+        for k, v in old.items():
+            setattr(mod, k, v)
+
+
+def replay(cfg, snapshots, plan, latency=0.0, modes=ENGINE_MODES, out=print):
+    """
+    Mide cada modo sobre los mismos snapshots/fallas y los compara con la
+    referencia; devuelve la lista de diferencias (vacía = OK). Activa cfg en
+    el motor; el resto de la config que toca se restaura al salir.
+    """
+    api = FakeAPI(snapshots[0], latency=latency)
+    engine_keys = {k for _name, overrides in modes for k in overrides}
+    baseline.configure(cfg, api=api.url, pages=s.PAGES)
+    s.use_league(cfg)
+    problems = []
+    with contextlib.ExitStack() as stack:
+        stack.enter_context(_patched(upstream, API=api.url, RATE_LIMIT_PER_SEC=0,
+                                     **{k: getattr(upstream, k) for k in engine_keys if hasattr(upstream, k)}))
+        # La referencia no conoce game_rules.json ni el día deportivo: se apagan en el motor
+        stack.enter_context(_patched(s, GAME_RULES=game_rules.RuleSet(), DAY_WINDOW_MODE="calendar",
+                                     PRINT_CAPTURE_SUMMARY=False, PRINT_CAPTURE_LIST=False,
+                                     PRINT_DETAILS=False, DUMP_ENABLED=False,
+                                     **{k: getattr(s, k) for k in engine_keys if not hasattr(upstream, k)}))
+        stack.callback(api.close)
+
+        out(f"Liga: {len(s.LEAGUE_ORDER)} equipos, {len(s.PAGES)} páginas/usuario, {len(snapshots)} ciclos"
+            f" (con fallas: {[c for c, f in enumerate(plan, 1) if f] or 'ninguno'}) — servidor local {api.url}\n")
+        out(f"{'modo':<16} {'ciclo':>5} {'etapa':<24} {'real s':>8} {'cpu s':>8} {'req':>5} {'pico KB':>9}")
+        references, report = run_baseline(api, snapshots)
+        _print_report(out, "baseline", report)
+        for name, overrides in modes:
+            results, report = run_mode(api, overrides, snapshots, plan)
+            _print_report(out, name, report)
+            problems += check(name, results, references, plan, cfg.fetch_aliases)
+    return problems
+
+
+def _print_report(out, name, report):
+    for cycle, m_rows, m_today, m_cache in report:
+        for stage, m in (("compute_rows", m_rows), ("games_played_today_scl", m_today),
+                         ("update_data_cache", m_cache)):
+            if m is not None:
+                out(f"{name:<16} {cycle:>5} {stage:<24} {m['wall']:>8.3f} {m['cpu']:>8.3f} "
+                    f"{m['requests']:>5} {m['peak_kb']:>9.0f}")
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("--users", type=int, default=13)
+    ap.add_argument("--pages", type=int, default=6)
+    ap.add_argument("--per-page", type=int, default=25)
+    ap.add_argument("--cycles", type=int, default=4, help="ciclos por modo (desde el 2º se ve el efecto incremental)")
+    ap.add_argument("--growth", type=int, default=6, help="juegos nuevos por ciclo (liga sintética)")
+    ap.add_argument("--fail-cycles", default="2", help="ciclos con páginas caídas, separados por coma ('' = ninguno)")
+    ap.add_argument("--latency-ms", type=float, default=20, help="latencia simulada por request")
+    ap.add_argument("--fixtures", help="directorio con <username>_p<page>.json grabados")
+    ap.add_argument("--record", help="graba páginas reales de LEAGUE_ORDER en este directorio y sale")
+    args = ap.parse_args()
+
+    if args.record:
+        record_fixtures(args.record)
+        return 0
+
+    if args.fixtures:
+        pages = load_fixtures(args.fixtures)
+        s.PAGES = tuple(range(1, max(len(p) for p in pages.values()) + 1))
+        cfg = s.DEFAULT_LEAGUE
+        snapshots = [pages] * args.cycles
+    else:
+        league = synthetic_league(args.users)
+        cfg = leagues.LeagueConfig(slug="replay", league_order=league,
+                                   since=datetime.utcnow() - timedelta(days=30))
+        s.PAGES = tuple(range(1, args.pages + 1))
+        history = GrowingHistory(league, args.pages, args.per_page)
+        snapshots = []
+        for cycle in range(args.cycles):
+            if cycle:
+                history.grow(args.growth)
+            snapshots.append(history.snapshot())
+    fail_cycles = {int(c) for c in args.fail_cycles.split(",") if c.strip()}
+    plan = failure_plan(cfg.fetch_usernames(), args.cycles, fail_cycles)
+
+    problems = replay(cfg, snapshots, plan, latency=args.latency_ms / 1000)
+    if problems:
+        print("\nERROR: diferencias contra baseline_standings:")
+        for p in problems:
+            print(f"  - {p}")
+        return 1
+    print("\nOK: standings y juegos de hoy idénticos a la referencia en todos los modos.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,95 @@
+# embedded.py
+# Refresher embebido en la web (EMBEDDED_REFRESH=1): cada worker de gunicorn
+# arranca un hilo que intenta tomar un lock de archivo; el que lo consigue es el
+# líder y corre el bucle de update_cache dentro del proceso, publicando cada
+# snapshot en un segmento compartido (shared_snapshot). El resto de los workers
+# sólo lee ese segmento y reintenta el lock cada LEADER_RETRY_SECONDS, así si el
+# líder muere (el SO libera el lock) otro worker toma el relevo.
+# Con este modo no hace falta un proceso worker aparte; sin él, todo sigue igual
+# (update_cache.py como proceso propio y la web leyendo el archivo de cache).
+
+import hashlib, json, os, threading, time
+import shared_snapshot
+
+try:
+    import fcntl
+except ImportError:   # Windows
+    fcntl = None
+    import msvcrt
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+ENABLED = os.getenv("EMBEDDED_REFRESH", "0") == "1"
+LOCK_FILE = os.getenv("EMBEDDED_LOCK_FILE", os.path.join(BASE_DIR, "refresher.lock"))
+# /dev/shm es memoria (tmpfs); si no existe, el archivo mapeado vive junto al cache
+SHARED_DIR = os.getenv("SHARED_SNAPSHOT_DIR", "/dev/shm" if os.path.isdir("/dev/shm") else BASE_DIR)
+LEADER_RETRY_SECONDS = float(os.getenv("LEADER_RETRY_SECONDS", "30"))
+
+_started = False
+_start_lock = threading.Lock()
+_stop = threading.Event()
+_writers = {}      # ruta del cache → SnapshotWriter
+_published = {}    # ruta del cache → content_hash publicado
+
+
+def segment_path(cache_path):
+    """Archivo del segmento compartido para el cache `cache_path` (uno por despliegue)."""
+    tag = hashlib.sha1(BASE_DIR.encode("utf-8")).hexdigest()[:8]
+    return os.path.join(SHARED_DIR, f"legends-{tag}-{os.path.basename(cache_path)}.shm")
+
+
+def _try_lock(path):
+    """Descriptor con el lock exclusivo tomado, o None si otro proceso lo tiene."""
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+    except OSError:
+        os.close(fd)
+        return None
+    os.ftruncate(fd, 0)
+    os.write(fd, str(os.getpid()).encode("ascii"))
+    return fd
+
+
+def publish(path, payload):
+    """
+    Publica `payload` (el mismo dict que se escribe en `path`) en su segmento
+    compartido, ya serializado y comprimido. Sin cambios de contenido no publica.
+    """
+    content_hash = payload.get("content_hash")
+    if content_hash is not None and _published.get(path) == content_hash:
+        return
+    writer = _writers.get(path)
+    if writer is None:
+        writer = _writers[path] = shared_snapshot.SnapshotWriter(segment_path(path))
+    body = json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    variants, etag = shared_snapshot.encode_variants(body)
+    writer.publish(variants, etag, int(time.time()))
+    _published[path] = content_hash
+
+
+def _run():
+    fd = _try_lock(LOCK_FILE)
+    while fd is None:
+        if _stop.wait(LEADER_RETRY_SECONDS):
+            return
+        fd = _try_lock(LOCK_FILE)
+    print(f"[embedded] pid {os.getpid()} es el líder del refresco")
+    try:
+        import update_cache
+        update_cache.PUBLISHERS.append(publish)
+        update_cache.run_forever(stop=_stop)
+    finally:
+        os.close(fd)   # libera el lock: otro worker toma el relevo
+
+
+def start():
+    """Arranca (una vez por proceso) el hilo que compite por ser el líder."""
+    global _started
+    with _start_lock:
+        if _started:
+            return
+        _started = True
+    threading.Thread(target=_run, name="embedded-refresher", daemon=True).start()
@@ -0,0 +1,129 @@
+# game_rules.py
+# Reglas por juego (exclusiones y resultados asignados) cargadas desde un
+# archivo de datos y compiladas UNA vez en búsquedas indexadas:
+#   - por id de juego                       → dict
+#   - por par de equipos (local, visita)    → dict
+#   - resto (sin id ni par de equipos)      → lista (evitarlas: se evalúan en cada juego)
+# El motor de standings las consulta al clasificar cada juego (GameRecord),
+# así que un juego excluido no llega ni a la tabla ni a los juegos de hoy.
+#
+# Formato de game_rules.json:
+#   {"rules": [
+#     {"id": "123456", "reason": "duplicado"},
+#     {"home_team": "Yankees", "away_team": "Mets", "home_runs": 0, "away_runs": 0,
+#      "local_time": "2025-09-08 21:40", "scope": "games", "reason": "juego de prueba"},
+#     {"id": "654321", "winner": "home", "reason": "desconexión del visitante"}
+#   ]}
+# Sin "winner" la regla excluye el juego; con "winner" ("home"/"away") el juego
+# cuenta con ese ganador. local_time/local_date son hora Chile.
+# "scope" (sólo exclusiones): "all" (por defecto) lo saca de la tabla y de las
+# listas de juegos; "games" sólo de las listas (juegos de hoy, /api/games), para
+# juegos que la tabla ya compensa con TEAM_RECORD_ADJUSTMENTS.
+
+import json, os
+from zoneinfo import ZoneInfo
+
+SCL = ZoneInfo("America/Santiago")
+UTC = ZoneInfo("UTC")
+
+MATCH_FIELDS = ("id", "home_team", "away_team", "home_runs", "away_runs", "local_date", "local_time")
+SCOPES = ("all", "games")
+
+
+class Rule:
+    __slots__ = ("match", "winner", "scope", "reason")
+
+    def __init__(self, raw):
+        unknown = set(raw) - set(MATCH_FIELDS) - {"winner", "scope", "reason"}
+        if unknown:
+            raise ValueError(f"campos desconocidos en regla {raw!r}: {', '.join(sorted(unknown))}")
+        self.match = {k: raw[k] for k in MATCH_FIELDS if k in raw}
+        if not self.match:
+            raise ValueError(f"regla sin condiciones: {raw!r}")
+        self.winner = raw.get("winner")
+        if self.winner not in (None, "home", "away"):
+            raise ValueError(f"winner inválido en regla {raw!r}")
+        self.scope = raw.get("scope", "all")
+        if self.scope not in SCOPES:
+            raise ValueError(f"scope inválido en regla {raw!r}")
+        if self.winner and self.scope != "all":
+            raise ValueError(f"una regla con winner siempre aplica a la tabla: {raw!r}")
+        self.reason = raw.get("reason", "")
+
+    @property
+    def excludes(self):
+        return self.winner is None
+
+    @property
+    def excludes_from_table(self):
+        return self.excludes and self.scope == "all"
+
+    def matches(self, rec):
+        """Condiciones restantes (las del índice ya coinciden)."""
+        m = self.match
+        if "id" in m and rec.gid != str(m["id"]):
+            return False
+        if "home_team" in m and rec.home_key != _team_key(m["home_team"]):
+            return False
+        if "away_team" in m and rec.away_key != _team_key(m["away_team"]):
+            return False
+        if "home_runs" in m and rec.home_runs != str(m["home_runs"]):
+            return False
+        if "away_runs" in m and rec.away_runs != str(m["away_runs"]):
+            return False
+        if "local_date" in m or "local_time" in m:
+            if rec.dt is None:
+                return False
+            d = rec.dt if rec.dt.tzinfo else rec.dt.replace(tzinfo=UTC)
+            d_local = d.astimezone(SCL)
+            if "local_date" in m and d_local.strftime("%Y-%m-%d") != m["local_date"]:
+                return False
+            if "local_time" in m and d_local.strftime("%Y-%m-%d %H:%M") != m["local_time"]:
+                return False
+        return True
+
+
+def _team_key(s):
+    return (s or "").strip().lower()
+
+
+class RuleSet:
+    def __init__(self, rules=()):
+        self.by_id = {}
+        self.by_teams = {}
+        self.other = []
+        for raw in rules:
+            rule = Rule(raw)
+            m = rule.match
+            if "id" in m:
+                self.by_id.setdefault(str(m["id"]), []).append(rule)
+            elif "home_team" in m and "away_team" in m:
+                key = (_team_key(m["home_team"]), _team_key(m["away_team"]))
+                self.by_teams.setdefault(key, []).append(rule)
+            else:
+                self.other.append(rule)
+
+    def __bool__(self):
+        return bool(self.by_id or self.by_teams or self.other)
+
+    def lookup(self, rec):
+        """Primera regla que aplica al juego clasificado `rec` (GameRecord), o None."""
+        for rule in self.by_id.get(rec.gid, ()):
+            if rule.matches(rec):
+                return rule
+        for rule in self.by_teams.get((rec.home_key, rec.away_key), ()):
+            if rule.matches(rec):
+                return rule
+        for rule in self.other:
+            if rule.matches(rec):
+                return rule
+        return None
+
+
+def load_rules(path):
+    """RuleSet desde `path` (vacío si el archivo no existe)."""
+    if not path or not os.path.exists(path):
+        return RuleSet()
+    with open(path, "r", encoding="utf-8") as f:
+        raw = json.load(f) or {}
+    return RuleSet(raw.get("rules") or [])
@@ -0,0 +1,190 @@
+# game_store.py
+# Almacén local (SQLite) de juegos de game_history, indexado por id.
+# Cada ciclo hace upsert de lo descargado; standings y juegos de hoy se
+# consultan desde aquí en vez de re-escanear las páginas completas.
+
+import json, os, sqlite3, threading
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS games (
+    id            TEXT PRIMARY KEY,
+    game_mode     TEXT,
+    display_date  TEXT,          -- ISO 'YYYY-MM-DD HH:MM:SS' (UTC naive) o NULL
+    home_team_key TEXT,          -- norm_team(home_full_name)
+    away_team_key TEXT,          -- norm_team(away_full_name)
+    home_name     TEXT,
+    away_name     TEXT,
+    raw           TEXT NOT NULL  -- JSON original del juego
+);
+CREATE TABLE IF NOT EXISTS user_games (
+    username TEXT NOT NULL,
+    game_id  TEXT NOT NULL,
+    PRIMARY KEY (username, game_id)
+);
+CREATE TABLE IF NOT EXISTS synced_users (
+    username TEXT PRIMARY KEY     -- última sincronización completa bajó todas sus páginas
+);
+CREATE INDEX IF NOT EXISTS ix_games_mode_date ON games (game_mode, display_date);
+CREATE INDEX IF NOT EXISTS ix_games_date      ON games (display_date);
+CREATE INDEX IF NOT EXISTS ix_games_home_team ON games (home_team_key);
+CREATE INDEX IF NOT EXISTS ix_games_away_team ON games (away_team_key);
+CREATE INDEX IF NOT EXISTS ix_games_home_name ON games (home_name);
+CREATE INDEX IF NOT EXISTS ix_games_away_name ON games (away_name);
+CREATE INDEX IF NOT EXISTS ix_user_games_game ON user_games (game_id);
+"""
+
+DATE_FMT = "%Y-%m-%d %H:%M:%S"
+FETCH_BATCH = 500   # filas por lote al iterar resultados
+
+
+def _team_key(s):
+    return (s or "").strip().lower()
+
+
+class GameStore:
+    def __init__(self, path):
+        self.path = path
+        d = os.path.dirname(os.path.abspath(path))
+        os.makedirs(d, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    # ---------- escritura ----------
+    def upsert(self, username, games, parse_date):
+        """
+        Inserta/actualiza los juegos (con id) y los asocia al historial de `username`.
+        Devuelve cuántos ids eran nuevos para ese usuario.
+        """
+        game_rows, links = [], []
+        for g in games:
+            gid = str(g.get("id") or "")
+            if not gid:
+                continue
+            d = parse_date(g.get("display_date", ""))
+            game_rows.append((
+                gid,
+                (g.get("game_mode") or "").strip().upper(),
+                d.strftime(DATE_FMT) if d else None,
+                _team_key(g.get("home_full_name")),
+                _team_key(g.get("away_full_name")),
+                g.get("home_name") or "",
+                g.get("away_name") or "",
+                json.dumps(g, ensure_ascii=False),
+            ))
+            links.append((username, gid))
+        if not game_rows:
+            return 0
+        with self._lock, self._conn:
+            before = self._conn.total_changes
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO user_games (username, game_id) VALUES (?, ?)", links)
+            added = self._conn.total_changes - before
+            self._conn.executemany(
+                """INSERT INTO games (id, game_mode, display_date, home_team_key, away_team_key,
+                                      home_name, away_name, raw)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                   ON CONFLICT(id) DO UPDATE SET
+                       game_mode=excluded.game_mode, display_date=excluded.display_date,
+                       home_team_key=excluded.home_team_key, away_team_key=excluded.away_team_key,
+                       home_name=excluded.home_name, away_name=excluded.away_name,
+                       raw=excluded.raw""",
+                game_rows)
+        return added
+
+    def set_synced(self, username, synced):
+        """Marca (o desmarca) a `username` como sincronizado por completo."""
+        with self._lock, self._conn:
+            if synced:
+                self._conn.execute("INSERT OR IGNORE INTO synced_users (username) VALUES (?)", (username,))
+            else:
+                self._conn.execute("DELETE FROM synced_users WHERE username = ?", (username,))
+
+    # ---------- lectura ----------
+    def is_synced(self, username):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM synced_users WHERE username = ?", (username,)).fetchone()
+        return row is not None
+
+    def known_ids(self, username):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT game_id FROM user_games WHERE username = ?", (username,)).fetchall()
+        return {r[0] for r in rows}
+
+    def _iter_rows(self, sql, args):
+        # El cursor se lee de a lotes: el lock sólo se toma mientras se trae cada lote
+        with self._lock:
+            cur = self._conn.execute(sql, args)
+            rows = cur.fetchmany(FETCH_BATCH)
+        while rows:
+            yield from rows
+            with self._lock:
+                rows = cur.fetchmany(FETCH_BATCH)
+
+    def iter_games_with_owners(self, usernames, game_mode=None, since=None, until=None):
+        """
+        Juegos únicos del historial de `usernames` con el conjunto de esos usuarios
+        en cuyo historial aparece cada uno, filtrados por modo y rango de fecha
+        [since, until): (juego, {usernames}) a medida que se leen (por lotes).
+        """
+        usernames = list(dict.fromkeys(usernames))
+        if not usernames:
+            return
+        where = ["ug.username IN (%s)" % ",".join("?" * len(usernames))]
+        args = list(usernames)
+        if game_mode is not None:
+            where.append("g.game_mode = ?")
+            args.append(game_mode.strip().upper())
+        if since is not None:
+            where.append("g.display_date >= ?")
+            args.append(since.strftime(DATE_FMT))
+        if until is not None:
+            where.append("g.display_date < ?")
+            args.append(until.strftime(DATE_FMT))
+        sql = ("SELECT g.raw, GROUP_CONCAT(ug.username, char(31)) FROM games g "
+               "JOIN user_games ug ON ug.game_id = g.id WHERE " + " AND ".join(where) +
+               " GROUP BY g.id")
+        for raw, owners in self._iter_rows(sql, args):
+            yield json.loads(raw), set(owners.split("\x1f"))
+
+    def iter_games(self, usernames=None, game_mode=None, since=None, until=None, team=None):
+        """
+        Juegos (dict original) del historial de `usernames`, filtrados por modo,
+        rango de fecha [since, until) y equipo. Sin duplicados; orden id desc.
+        Se entregan a medida que se leen (por lotes).
+        """
+        where, args = [], []
+        if usernames is not None:
+            usernames = list(usernames)
+            if not usernames:
+                return
+            where.append("g.id IN (SELECT game_id FROM user_games WHERE username IN (%s))"
+                         % ",".join("?" * len(usernames)))
+            args += usernames
+        if game_mode is not None:
+            where.append("g.game_mode = ?")
+            args.append(game_mode.strip().upper())
+        if since is not None:
+            where.append("g.display_date >= ?")
+            args.append(since.strftime(DATE_FMT))
+        if until is not None:
+            where.append("g.display_date < ?")
+            args.append(until.strftime(DATE_FMT))
+        if team is not None:
+            where.append("(g.home_team_key = ? OR g.away_team_key = ?)")
+            args += [_team_key(team), _team_key(team)]
+        sql = "SELECT g.raw FROM games g"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY CASE WHEN g.id NOT GLOB '*[^0-9]*' THEN CAST(g.id AS INTEGER) END DESC, g.id DESC"
+        for (raw,) in self._iter_rows(sql, args):
+            yield json.loads(raw)
@@ -0,0 +1,200 @@
+# history.py
+# Historial de standings en un log append-only (JSON Lines), un registro por
+# ciclo que cambió algo:
+#   {"t": ..., "kind": "full", "standings": [...], "days": {...}}      ← keyframe
+#   {"t": ..., "kind": "delta",
+#    "changed": [filas nuevas o cambiadas], "removed": [equipos],
+#    "order": [equipos], "moves": {equipo: +subió/-bajó},            ← sólo si cambió el orden
+#    "games": {día: [juegos nuevos]}, "games_removed": {día: [juegos]}}
+# Cada KEYFRAME_EVERY deltas se escribe una keyframe: reconstruir la tabla a
+# cualquier hora es partir de la keyframe anterior y aplicar los deltas que siguen.
+# `t` es el instante del ciclo en segundos epoch (UTC) y es la clave de orden:
+# la hora Chile repite una hora al terminar el horario de verano, así que sólo se
+# usa para mostrar (local_ts). Registros viejos con `ts` (hora Chile en texto) se
+# convierten al leerlos.
+
+import bisect, copy, json, os
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+KEYFRAME_EVERY = int(os.getenv("HISTORY_KEYFRAME_EVERY", "288"))   # ~1 día con ciclos de 5 min
+
+SCL = ZoneInfo("America/Santiago")
+
+# Campos de fila que no son parte de la tabla (frescura del ciclo)
+_TRANSIENT = ("stale",)
+
+
+def local_ts(t):
+    """Instante epoch → hora Chile con su offset ("YYYY-MM-DD HH:MM:SS-03:00")."""
+    return datetime.fromtimestamp(t, SCL).isoformat(" ", "seconds")
+
+
+def _legacy_t(ts):
+    # Hora Chile sin offset: en la hora repetida se toma la primera pasada
+    return int(datetime.strptime(ts, "%Y-%m-%d %H:%M:%S").replace(tzinfo=SCL).timestamp())
+
+
+def _row(r):
+    return {k: v for k, v in r.items() if k not in _TRANSIENT}
+
+
+def _day_diff(a, b):
+    """Juegos de `b` que no están en `a`, por día."""
+    out = {}
+    for day, lines in b.items():
+        seen = set(a.get(day) or ())
+        new = [line for line in lines if line not in seen]
+        if new:
+            out[day] = new
+    return out
+
+
+def compute_delta(prev, rows, days):
+    """
+    Delta entre el estado `prev` ({"standings", "days"}) y la tabla/índice
+    nuevos, o None si no cambió nada.
+    """
+    rows = [_row(r) for r in rows]
+    prev_rows = {r.get("team"): r for r in prev["standings"]}
+    prev_order = [r.get("team") for r in prev["standings"]]
+    order = [r.get("team") for r in rows]
+    delta = {
+        "changed": [r for r in rows if prev_rows.get(r.get("team")) != r],
+        "removed": [t for t in prev_order if t not in set(order)],
+        "games": _day_diff(prev["days"], days),
+        "games_removed": _day_diff(days, prev["days"]),
+    }
+    if order != prev_order:
+        old_pos = {t: i for i, t in enumerate(prev_order)}
+        delta["order"] = order
+        delta["moves"] = {t: old_pos[t] - i for i, t in enumerate(order) if t in old_pos and old_pos[t] != i}
+    delta = {k: v for k, v in delta.items() if v}
+    return delta or None
+
+
+def apply_entry(state, entry):
+    """Aplica un registro del log (keyframe o delta) a `state` (se modifica)."""
+    if entry["kind"] == "full":
+        state["standings"] = copy.deepcopy(entry["standings"])
+        state["days"] = copy.deepcopy(entry["days"])
+    else:
+        rows = {r.get("team"): r for r in state["standings"]}
+        for r in entry.get("changed") or ():
+            rows[r.get("team")] = r
+        for t in entry.get("removed") or ():
+            rows.pop(t, None)
+        order = list(entry.get("order") or [r.get("team") for r in state["standings"]])
+        order += [t for t in rows if t not in set(order)]
+        state["standings"] = [rows[t] for t in order if t in rows]
+        days = state["days"]
+        for day, lines in (entry.get("games_removed") or {}).items():
+            gone = set(lines)
+            days[day] = [line for line in days.get(day, ()) if line not in gone]
+            if not days[day]:
+                del days[day]
+        for day, lines in (entry.get("games") or {}).items():
+            days[day] = days.get(day, []) + lines
+    state["t"] = entry["t"]
+    return state
+
+
+class HistoryLog:
+    """
+    Lectura incremental del log: sólo parsea lo agregado desde la última vez
+    (el archivo sólo crece). Lo usan el worker (para calcular el próximo delta)
+    y la web (para /api/history).
+    """
+    def __init__(self, path):
+        self.path = path
+        self.entries = []
+        self.keyframes = []    # índices de las keyframes en `entries`
+        self._offset = 0
+        self._state = None     # estado tras el último registro (se arma al pedirlo)
+
+    def refresh(self):
+        try:
+            size = os.path.getsize(self.path)
+        except FileNotFoundError:
+            size = 0
+        if size < self._offset:          # archivo reemplazado: releer
+            self.__init__(self.path)
+        if size == self._offset:
+            return self
+        with open(self.path, "rb") as f:
+            f.seek(self._offset)
+            chunk = f.read(size - self._offset)
+        # Una línea sin "\n" final está a medio escribir: queda para la próxima
+        end = chunk.rfind(b"\n") + 1
+        for line in chunk[:end].splitlines():
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            self._add(entry)
+        self._offset += end
+        return self
+
+    def _add(self, entry):
+        if "t" not in entry:
+            try:
+                entry["t"] = _legacy_t(entry.pop("ts"))
+            except (KeyError, TypeError, ValueError):
+                return
+        if entry.get("kind") == "full":
+            self.keyframes.append(len(self.entries))
+        elif not self.keyframes:
+            return    # delta sin keyframe previa: no se puede aplicar
+        self.entries.append(entry)
+        if self._state is not None:
+            apply_entry(self._state, entry)
+
+    def state_at(self, t=None):
+        """Estado {"t", "standings", "days"} al instante `t` (epoch; None = último), o None."""
+        if t is None:
+            if self._state is None and self.entries:
+                self._state = self.state_at(self.entries[-1]["t"])
+            return self._state
+        times = [self.entries[i]["t"] for i in self.keyframes]
+        k = bisect.bisect_right(times, t) - 1
+        if k < 0:
+            return None
+        start = self.keyframes[k]
+        state = {}
+        for entry in self.entries[start:]:
+            if entry["t"] > t:
+                break
+            apply_entry(state, entry)
+        return state
+
+    def since(self, t=None):
+        """Registros posteriores al instante `t` (epoch); sin `t`, desde la última keyframe."""
+        if t is None:
+            return self.entries[self.keyframes[-1]:] if self.keyframes else []
+        times = [e["t"] for e in self.entries]
+        return self.entries[bisect.bisect_right(times, t):]
+
+    def append(self, rows, days, t):
+        """
+        Agrega el registro del ciclo del instante `t` (epoch; keyframe o delta
+        contra el último estado). Devuelve el registro escrito, o None si nada cambió.
+        """
+        self.refresh()
+        prev = self.state_at()
+        if prev is not None:
+            t = max(t, prev["t"])   # el reloj pudo retroceder: el log sigue ordenado
+        delta = compute_delta(prev, rows, days) if prev is not None else None
+        if prev is not None and delta is None:
+            return None
+        if prev is None or len(self.entries) - self.keyframes[-1] > KEYFRAME_EVERY:
+            entry = {"t": t, "kind": "full", "standings": [_row(r) for r in rows], "days": days}
+        else:
+            entry = dict({"t": t, "kind": "delta"}, **delta)
+
+        line = json.dumps(entry, ensure_ascii=False, separators=(",", ":")) + "\n"
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(line)
+            f.flush()
+            os.fsync(f.fileno())
+        self.refresh()
+        return entry
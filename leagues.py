@@ -0,0 +1,123 @@
+# leagues.py
+# Configuración de ligas/temporadas desde archivos de datos.
+# Cada archivo leagues/<slug>.json describe una liga:
+#
+#   {
+#     "name": "Strike Latino 2",
+#     "since": "2025-08-23",
+#     "scheduled": 13,
+#     "league_order": [["MVP140605", "Blue Jays"], ["SergiioRD", "Tigers"]],
+#     "fetch_aliases": {"MVP140605": ["OtraCuenta"]},
+#     "extra_users": ["AiramReynoso_"],
+#     "team_record_adjustments": {"Dodgers": [0, -1]},
+#     "team_point_adjustments": {"Padres": [-1, "Desconexión vs Blue Jays"]}
+#   }
+#
+# Sin archivos, la única liga es la definida por las constantes de
+# standings_cascade_points_desc (slug "default"). Este módulo no importa
+# el motor de standings: lo puede usar la web sin costo.
+
+import json, os, re
+from datetime import datetime
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+LEAGUES_DIR = os.getenv("LEAGUES_DIR", os.path.join(BASE_DIR, "leagues"))
+DEFAULT_SLUG = os.getenv("DEFAULT_LEAGUE", "default")
+CACHE_FILE = os.path.join(BASE_DIR, "standings_cache.json")
+GAMES_INDEX_FILE = os.path.join(BASE_DIR, "games_index.json")
+HISTORY_FILE = os.path.join(BASE_DIR, "standings_history.jsonl")
+
+SLUG_RE = re.compile(r"^[a-z0-9][a-z0-9_-]*$")
+
+
+class LeagueConfig:
+    def __init__(self, slug, league_order, since, scheduled=13, fetch_aliases=None,
+                 extra_users=(), team_record_adjustments=None, team_point_adjustments=None, name=None):
+        self.slug = slug
+        self.name = name or slug
+        self.league_order = [tuple(x) for x in league_order]
+        self.since = since
+        self.scheduled = scheduled
+        self.fetch_aliases = {k: list(v) for k, v in (fetch_aliases or {}).items()}
+        self.extra_users = set(extra_users)
+        self.team_record_adjustments = {k: tuple(v) for k, v in (team_record_adjustments or {}).items()}
+        self.team_point_adjustments = {k: tuple(v) for k, v in (team_point_adjustments or {}).items()}
+
+    @property
+    def league_users(self):
+        # principales + alias + equivalencias históricas (para el filtro de rival)
+        users = {u for (u, _t) in self.league_order}
+        for base, alts in self.fetch_aliases.items():
+            users.add(base)
+            users.update(alts)
+        users.update(self.extra_users)
+        return users
+
+    def fetch_usernames(self):
+        names = []
+        for user_exact, _team in self.league_order:
+            names.append(user_exact)
+            names += self.fetch_aliases.get(user_exact, [])
+        return names
+
+
+def load_league_file(path):
+    slug = os.path.splitext(os.path.basename(path))[0].lower()
+    if not SLUG_RE.match(slug):
+        raise ValueError(f"nombre de liga inválido: {slug!r}")
+    with open(path, "r", encoding="utf-8") as f:
+        raw = json.load(f)
+    return LeagueConfig(
+        slug=slug,
+        name=raw.get("name"),
+        league_order=raw["league_order"],
+        since=datetime.strptime(raw["since"], "%Y-%m-%d"),
+        scheduled=int(raw.get("scheduled", 13)),
+        fetch_aliases=raw.get("fetch_aliases"),
+        extra_users=raw.get("extra_users", ()),
+        team_record_adjustments=raw.get("team_record_adjustments"),
+        team_point_adjustments=raw.get("team_point_adjustments"),
+    )
+
+
+def league_files(leagues_dir=None):
+    d = leagues_dir or LEAGUES_DIR
+    if not os.path.isdir(d):
+        return []
+    return [os.path.join(d, n) for n in sorted(os.listdir(d)) if n.endswith(".json")]
+
+
+def load_leagues(leagues_dir=None):
+    """Ligas definidas en LEAGUES_DIR (lista vacía si no hay archivos)."""
+    return [load_league_file(p) for p in league_files(leagues_dir)]
+
+
+def default_slug(leagues=None):
+    """La liga de /api/full: DEFAULT_LEAGUE si existe, si no la primera."""
+    if leagues:
+        slugs = [lg.slug for lg in leagues]
+        return DEFAULT_SLUG if DEFAULT_SLUG in slugs else slugs[0]
+    return DEFAULT_SLUG
+
+
+def _league_file(path, slug, default):
+    # La liga por defecto usa `path` tal cual; el resto, <nombre>.<slug>.json
+    if slug == (default or default_slug(load_leagues())):
+        return path
+    stem, ext = os.path.splitext(os.path.basename(path))
+    return os.path.join(BASE_DIR, f"{stem}.{slug}{ext}")
+
+
+def cache_file_for(slug, default=None):
+    """standings_cache.json para la liga por defecto; standings_cache.<slug>.json para el resto."""
+    return _league_file(CACHE_FILE, slug, default)
+
+
+def games_index_file_for(slug, default=None):
+    """games_index.json (juegos por día) para la liga por defecto; games_index.<slug>.json para el resto."""
+    return _league_file(GAMES_INDEX_FILE, slug, default)
+
+
+def history_file_for(slug, default=None):
+    """standings_history.jsonl (log de deltas por ciclo) para la liga por defecto; standings_history.<slug>.jsonl para el resto."""
+    return _league_file(HISTORY_FILE, slug, default)
@@ -0,0 +1,158 @@
+# metrics.py
+# Métricas del pipeline de refresco: spans de tiempo por etapa, latencia de
+# requests por usuario (histograma), reintentos, fallos y bytes descargados.
+# Etapas: fetch, count (dedup + filtro + conteo: van en streaming en la misma
+# pasada, no se miden por separado), sort, games_index, games_today y cache_write.
+# El worker las vuelca a un archivo JSON; app.py las expone en /metrics
+# (formato de texto de Prometheus). Sin dependencias externas.
+
+import json, os, tempfile, threading, time
+from contextlib import contextmanager
+
+# Límites superiores (seg) de los buckets del histograma de latencia
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0)
+
+_lock = threading.Lock()
+
+
+def _empty():
+    return {
+        "stages": {},        # etapa → {"sum": seg, "count": n, "last": seg del último ciclo}
+        "requests": {},      # usuario → {"buckets": [...], "sum": seg, "count": n, "bytes": n}
+        "counters": {"retries": 0, "failures": 0, "cache_hits": 0, "cycles": 0, "cycle_errors": 0},
+        "last_cycle": {"started_at": None, "duration": None, "ok": None},
+    }
+
+
+_stats = _empty()
+
+
+def begin_cycle():
+    """Marca el inicio de un ciclo: los tiempos 'last' de cada etapa vuelven a 0."""
+    with _lock:
+        for st in _stats["stages"].values():
+            st["last"] = 0.0
+        _stats["last_cycle"] = {"started_at": time.time(), "duration": None, "ok": None}
+        _stats["_t0"] = time.perf_counter()
+
+
+def end_cycle(ok):
+    with _lock:
+        t0 = _stats.pop("_t0", None)
+        _stats["counters"]["cycles"] += 1
+        if not ok:
+            _stats["counters"]["cycle_errors"] += 1
+        _stats["last_cycle"]["ok"] = bool(ok)
+        if t0 is not None:
+            _stats["last_cycle"]["duration"] = time.perf_counter() - t0
+
+
+@contextmanager
+def span(stage):
+    """Acumula el tiempo del bloque en la etapa indicada."""
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        dt = time.perf_counter() - t0
+        with _lock:
+            st = _stats["stages"].setdefault(stage, {"sum": 0.0, "count": 0, "last": 0.0})
+            st["sum"] += dt
+            st["count"] += 1
+            st["last"] += dt
+
+
+def observe_request(username, seconds, nbytes):
+    with _lock:
+        r = _stats["requests"].setdefault(
+            username, {"buckets": [0] * len(LATENCY_BUCKETS), "sum": 0.0, "count": 0, "bytes": 0})
+        for i, le in enumerate(LATENCY_BUCKETS):
+            if seconds <= le:
+                r["buckets"][i] += 1
+        r["sum"] += seconds
+        r["count"] += 1
+        r["bytes"] += nbytes
+
+
+def inc(counter, n=1):
+    with _lock:
+        _stats["counters"][counter] = _stats["counters"].get(counter, 0) + n
+
+
+def snapshot():
+    with _lock:
+        return json.loads(json.dumps({k: v for k, v in _stats.items() if not k.startswith("_")}))
+
+
+def write_stats(path):
+    """Vuelca las métricas a `path` de forma atómica (temp + rename)."""
+    data = snapshot()
+    data["written_at"] = time.time()
+    d = os.path.dirname(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(prefix=".refresh_stats.", suffix=".tmp", dir=d)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f, separators=(",", ":"))
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+
+
+# ===== Formato Prometheus =====
+def _label(v):
+    return str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def render_prometheus(data):
+    out = []
+
+    def metric(name, mtype, help_text):
+        out.append(f"# HELP {name} {help_text}")
+        out.append(f"# TYPE {name} {mtype}")
+
+    metric("legends_stage_seconds_total", "counter", "Tiempo acumulado por etapa del refresco.")
+    for stage, st in sorted(data.get("stages", {}).items()):
+        out.append(f'legends_stage_seconds_total{{stage="{_label(stage)}"}} {st["sum"]:.6f}')
+    metric("legends_stage_last_cycle_seconds", "gauge", "Tiempo de cada etapa en el último ciclo.")
+    for stage, st in sorted(data.get("stages", {}).items()):
+        out.append(f'legends_stage_last_cycle_seconds{{stage="{_label(stage)}"}} {st["last"]:.6f}')
+
+    metric("legends_upstream_request_seconds", "histogram", "Latencia de requests a game_history por usuario.")
+    for user, r in sorted(data.get("requests", {}).items()):
+        u = _label(user)
+        for le, n in zip(LATENCY_BUCKETS, r["buckets"]):
+            out.append(f'legends_upstream_request_seconds_bucket{{user="{u}",le="{le}"}} {n}')
+        out.append(f'legends_upstream_request_seconds_bucket{{user="{u}",le="+Inf"}} {r["count"]}')
+        out.append(f'legends_upstream_request_seconds_sum{{user="{u}"}} {r["sum"]:.6f}')
+        out.append(f'legends_upstream_request_seconds_count{{user="{u}"}} {r["count"]}')
+    metric("legends_upstream_bytes_total", "counter", "Bytes descargados de game_history por usuario.")
+    for user, r in sorted(data.get("requests", {}).items()):
+        out.append(f'legends_upstream_bytes_total{{user="{_label(user)}"}} {r["bytes"]}')
+
+    counters = data.get("counters", {})
+    for key, help_text in (
+        ("retries", "Reintentos de requests a game_history."),
+        ("failures", "Páginas que agotaron los reintentos."),
+        ("cache_hits", "Páginas servidas desde el cache HTTP en disco."),
+        ("coalesced", "Requests idénticas en vuelo que esperaron la de otro hilo."),
+        ("rate_limited", "Respuestas 429 de game_history."),
+        ("circuit_trips", "Aperturas del circuit breaker de game_history."),
+        ("short_circuits", "Páginas no pedidas por el circuito abierto."),
+        ("cycles", "Ciclos de refresco ejecutados."),
+        ("cycle_errors", "Ciclos de refresco con error."),
+    ):
+        metric(f"legends_{key}_total", "counter", help_text)
+        out.append(f"legends_{key}_total {counters.get(key, 0)}")
+
+    last = data.get("last_cycle", {})
+    metric("legends_last_cycle_duration_seconds", "gauge", "Duración del último ciclo de refresco.")
+    out.append(f"legends_last_cycle_duration_seconds {last.get('duration') or 0:.6f}")
+    metric("legends_last_cycle_ok", "gauge", "1 si el último ciclo terminó bien.")
+    out.append(f"legends_last_cycle_ok {1 if last.get('ok') else 0}")
+    metric("legends_stats_written_timestamp_seconds", "gauge", "Momento en que el worker escribió estas métricas.")
+    out.append(f"legends_stats_written_timestamp_seconds {data.get('written_at') or 0:.3f}")
+    return "\n".join(out) + "\n"
@@ -0,0 +1,192 @@
+# projections.py
+# Proyección de clasificación / eliminación a partir de la tabla actual
+# (filas de compute_rows(), tal como quedan en el cache).
+#
+# Cada juego restante de cada equipo se simula como ganado (3 pts) o perdido
+# (2 pts); no hay calendario de enfrentamientos, así que los juegos de cada
+# equipo son independientes. Los escenarios se evalúan en bloques de BATCH a la
+# vez con NumPy (si no está instalado, con un bucle en Python: mismos números,
+# menos simulaciones dentro del presupuesto) hasta SIMULATIONS o hasta agotar
+# el presupuesto de tiempo. El orden final usa el mismo desempate que la tabla:
+# puntos desc, victorias desc, derrotas asc (y, si todo empata, la posición actual).
+#
+# Además de las probabilidades se calcula lo matemáticamente seguro:
+#   clinched   → clasifica aunque pierda todo y los demás ganen todo
+#   eliminated → no clasifica aunque gane todo y los demás pierdan todo
+
+import hashlib, json, os, random, time
+
+# NumPy es opcional y se importa recién en la primera proyección (importar la
+# web no paga ese costo); sin NumPy se usa el bucle en Python
+np = None
+_numpy_checked = False
+
+WIN_POINTS = 3
+LOSS_POINTS = 2
+PLAYOFF_SPOTS = int(os.getenv("PLAYOFF_SPOTS", "4"))
+SIMULATIONS = int(os.getenv("PROJECTION_SIMULATIONS", "20000"))
+TIME_BUDGET_SECONDS = float(os.getenv("PROJECTION_BUDGET_SECONDS", "2"))
+BATCH = 2000
+# "record" = prob. de ganar según el récord (con suavizado de Laplace) | "even" = 50%
+MODEL = os.getenv("PROJECTION_MODEL", "record")
+
+
+def _numpy():
+    global np, _numpy_checked
+    if not _numpy_checked:
+        try:
+            import numpy
+            np = numpy
+        except ImportError:
+            np = None
+        _numpy_checked = True
+    return np
+
+
+def _win_probability(row):
+    if MODEL == "even":
+        return 0.5
+    return (row.get("wins", 0) + 1) / (row.get("wins", 0) + row.get("losses", 0) + 2)
+
+
+def _seed(rows, spots):
+    # Misma tabla → mismos números (las respuestas no bailan entre requests)
+    raw = json.dumps([[r.get("team"), r.get("points"), r.get("wins"), r.get("losses"), r.get("remaining")]
+                      for r in rows] + [spots, MODEL], sort_keys=True)
+    return int(hashlib.sha256(raw.encode("utf-8")).hexdigest()[:16], 16)
+
+
+class _Table:
+    """La tabla como columnas + la clave de orden compuesta (mayor = mejor)."""
+    def __init__(self, rows):
+        self.n = len(rows)
+        self.points = [int(r.get("points", 0)) for r in rows]
+        self.wins = [int(r.get("wins", 0)) for r in rows]
+        self.losses = [int(r.get("losses", 0)) for r in rows]
+        self.remaining = [max(int(r.get("remaining", 0)), 0) for r in rows]
+        self.prob = [_win_probability(r) for r in rows]
+        # base > cualquier cantidad de victorias/derrotas al final de la temporada
+        self.base = max([w + l + m for w, l, m in zip(self.wins, self.losses, self.remaining)] + [0]) + 1
+
+    def key(self, i, extra_wins, extra_losses):
+        b, n = self.base, self.n
+        pts = self.points[i] + WIN_POINTS * extra_wins + LOSS_POINTS * extra_losses
+        w = self.wins[i] + extra_wins
+        l = self.losses[i] + extra_losses
+        return (pts * b * b + w * b + (b - 1 - l)) * n + (n - 1 - i)
+
+
+def _certain(table, spots):
+    """(clinched, eliminated) por equipo: peor/mejor caso propio contra mejor/peor del resto."""
+    best = [table.key(i, table.remaining[i], 0) for i in range(table.n)]
+    worst = [table.key(i, 0, table.remaining[i]) for i in range(table.n)]
+    clinched, eliminated = [], []
+    for i in range(table.n):
+        above_worst = sum(1 for j in range(table.n) if j != i and best[j] > worst[i])
+        above_best = sum(1 for j in range(table.n) if j != i and worst[j] > best[i])
+        clinched.append(above_worst < spots)
+        eliminated.append(above_best >= spots)
+    return clinched, eliminated
+
+
+def _simulate_numpy(table, spots, seed, simulations, deadline):
+    rng = np.random.default_rng(seed)
+    n, b = table.n, table.base
+    points = np.array(table.points, dtype=np.int64)
+    wins = np.array(table.wins, dtype=np.int64)
+    losses = np.array(table.losses, dtype=np.int64)
+    remaining = np.array(table.remaining, dtype=np.int64)
+    prob = np.array(table.prob)
+    tiebreak = np.arange(n - 1, -1, -1, dtype=np.int64)
+    positions = np.arange(n, dtype=np.int64)
+
+    in_spot = np.zeros(n, dtype=np.int64)
+    position_sum = np.zeros(n, dtype=np.int64)
+    points_sum = np.zeros(n, dtype=np.int64)
+    done = 0
+    while done < simulations:
+        size = min(BATCH, simulations - done)
+        extra_wins = rng.binomial(remaining, prob, size=(size, n))
+        extra_losses = remaining - extra_wins
+        pts = points + WIN_POINTS * extra_wins + LOSS_POINTS * extra_losses
+        key = (pts * b * b + (wins + extra_wins) * b + (b - 1 - losses - extra_losses)) * n + tiebreak
+        order = np.argsort(-key, axis=1)
+        ranks = np.empty_like(order)
+        np.put_along_axis(ranks, order, np.broadcast_to(positions, order.shape), axis=1)
+        in_spot += np.bincount(order[:, :spots].ravel(), minlength=n)
+        position_sum += ranks.sum(axis=0)
+        points_sum += pts.sum(axis=0)
+        done += size
+        if time.monotonic() >= deadline:
+            break
+    return done, in_spot.tolist(), position_sum.tolist(), points_sum.tolist()
+
+
+def _simulate_python(table, spots, seed, simulations, deadline):
+    rng = random.Random(seed)
+    n = table.n
+    in_spot = [0] * n
+    position_sum = [0] * n
+    points_sum = [0] * n
+    done = 0
+    while done < simulations:
+        for _ in range(min(BATCH, simulations - done)):
+            keys = []
+            for i in range(n):
+                ew = sum(1 for _ in range(table.remaining[i]) if rng.random() < table.prob[i])
+                el = table.remaining[i] - ew
+                points_sum[i] += table.points[i] + WIN_POINTS * ew + LOSS_POINTS * el
+                keys.append((table.key(i, ew, el), i))
+            keys.sort(reverse=True)
+            for pos, (_k, i) in enumerate(keys):
+                position_sum[i] += pos
+                if pos < spots:
+                    in_spot[i] += 1
+            done += 1
+        if time.monotonic() >= deadline:
+            break
+    return done, in_spot, position_sum, points_sum
+
+
+def project(rows, spots=None, simulations=None, budget=None):
+    """
+    Proyección de la tabla `rows` (ordenada como la devuelve compute_rows()):
+    probabilidad de terminar en los `spots` primeros puestos, de quedar fuera,
+    certezas matemáticas, puntos y posición esperados por equipo.
+    """
+    spots = PLAYOFF_SPOTS if spots is None else spots
+    simulations = SIMULATIONS if simulations is None else simulations
+    budget = TIME_BUDGET_SECONDS if budget is None else budget
+    t0 = time.monotonic()
+    table = _Table(rows)
+    spots = max(0, min(spots, table.n))
+    clinched, eliminated = _certain(table, spots)
+
+    simulate = _simulate_numpy if _numpy() is not None else _simulate_python
+    done, in_spot, position_sum, points_sum = simulate(
+        table, spots, _seed(rows, spots), max(simulations, 1), t0 + budget) if table.n else (0, [], [], [])
+
+    teams = []
+    for i, r in enumerate(rows):
+        # Lo seguro manda sobre lo simulado
+        p = 1.0 if clinched[i] else 0.0 if eliminated[i] else round(in_spot[i] / done, 4)
+        teams.append({
+            "user": r.get("user"),
+            "team": r.get("team"),
+            "points": table.points[i],
+            "remaining": table.remaining[i],
+            "clinch_probability": p,
+            "elimination_probability": round(1 - p, 4),
+            "clinched": clinched[i],
+            "eliminated": eliminated[i],
+            "expected_points": round(points_sum[i] / done, 2),
+            "expected_position": round(position_sum[i] / done + 1, 2),
+        })
+    return {
+        "spots": spots,
+        "simulations": done,
+        "engine": "numpy" if np is not None else "python",
+        "model": MODEL,
+        "elapsed": round(time.monotonic() - t0, 3),
+        "teams": teams,
+    }
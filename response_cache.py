@@ -0,0 +1,91 @@
+# response_cache.py
+# Cache persistente (SQLite) de respuestas de game_history, con TTL por entrada,
+# cuerpos comprimidos (zlib) y tope de tamaño con expulsión LRU.
+# Clave = (username, platform, page).
+
+import os, sqlite3, threading, time, zlib
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    username    TEXT NOT NULL,
+    platform    TEXT NOT NULL,
+    page        INTEGER NOT NULL,
+    body        BLOB NOT NULL,    -- JSON comprimido con zlib
+    size        INTEGER NOT NULL,
+    fetched_at  REAL NOT NULL,
+    last_access REAL NOT NULL,
+    PRIMARY KEY (username, platform, page)
+);
+CREATE INDEX IF NOT EXISTS ix_responses_access ON responses (last_access);
+"""
+
+
+class ResponseCache:
+    def __init__(self, path, max_bytes):
+        self.path = path
+        self.max_bytes = max_bytes
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def get(self, username, platform, page, ttl, min_fetched_at=None):
+        """
+        Cuerpo (bytes JSON) si existe y tiene menos de `ttl` segundos (y se bajó
+        después de `min_fetched_at`, si se indica); si no, None.
+        ttl=None devuelve la entrada aunque esté vencida (respaldo ante fallos).
+        """
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT body, fetched_at FROM responses WHERE username=? AND platform=? AND page=?",
+                (username, platform, page)).fetchone()
+            if row is None or (ttl is not None and now - row[1] > ttl) \
+                    or (min_fetched_at is not None and row[1] < min_fetched_at):
+                return None
+            self._conn.execute(
+                "UPDATE responses SET last_access=? WHERE username=? AND platform=? AND page=?",
+                (now, username, platform, page))
+            self._conn.commit()
+        return zlib.decompress(row[0])
+
+    def fetched_at(self, username, platform, page):
+        """Momento (epoch) en que se guardó la página, o None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT fetched_at FROM responses WHERE username=? AND platform=? AND page=?",
+                (username, platform, page)).fetchone()
+        return row[0] if row else None
+
+    def put(self, username, platform, page, body):
+        blob = zlib.compress(body, 6)
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                """INSERT OR REPLACE INTO responses
+                   (username, platform, page, body, size, fetched_at, last_access)
+                   VALUES (?, ?, ?, ?, ?, ?, ?)""",
+                (username, platform, page, blob, len(blob), now, now))
+            self._evict()
+
+    def _evict(self):
+        # LRU: borra las entradas menos accedidas hasta quedar bajo max_bytes
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        rows = self._conn.execute(
+            "SELECT username, platform, page, size FROM responses ORDER BY last_access ASC").fetchall()
+        for username, platform, page, size in rows:
+            if total <= self.max_bytes:
+                break
+            self._conn.execute(
+                "DELETE FROM responses WHERE username=? AND platform=? AND page=?",
+                (username, platform, page))
+            total -= size
@@ -0,0 +1,121 @@
+# shared_snapshot.py
+# Snapshot compartido entre procesos (workers de gunicorn) en un archivo mapeado
+# en memoria (mmap; en Linux bajo /dev/shm). Un único escritor (el refresher
+# líder) publica las variantes ya serializadas y comprimidas; los lectores sólo
+# comparan un contador de generación y copian bytes: sin sondear el disco ni
+# re-parsear JSON por worker.
+#
+# Formato:
+#   [magic 8s][generation u64][length u64]  ← cabecera (24 bytes)
+#   [meta_len u32][meta JSON][variante 1][variante 2]...
+#   meta = {"etag", "last_modified", "variants": [[nombre, largo], ...]}
+# Protocolo seqlock: el escritor deja la generación impar mientras escribe y la
+# vuelve par al terminar; el lector reintenta si la ve impar o si cambió.
+
+import gzip, hashlib, json, mmap, os, struct, time
+
+try:
+    import brotli  # opcional: variante br pre-comprimida
+except ImportError:
+    brotli = None
+
+MAGIC = b"LGSNAP01"
+HEADER = struct.Struct("<8sQQ")
+META_LEN = struct.Struct("<I")
+INITIAL_SIZE = 256 * 1024
+READ_ATTEMPTS = 50
+
+
+def encode_variants(body):
+    """Variantes de `body` (bytes JSON) por Content-Encoding y su ETag base."""
+    variants = {"identity": body, "gzip": gzip.compress(body, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variants["br"] = brotli.compress(body, quality=11)
+    return variants, hashlib.sha256(body).hexdigest()[:32]
+
+
+class SnapshotWriter:
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        if os.fstat(self._fd).st_size < HEADER.size + INITIAL_SIZE:
+            os.ftruncate(self._fd, HEADER.size + INITIAL_SIZE)
+        self._mm = mmap.mmap(self._fd, 0)
+        magic, gen, _length = HEADER.unpack_from(self._mm, 0)
+        # Un líder nuevo sigue la numeración del anterior (los lectores ven el cambio)
+        self.generation = gen + (gen % 2) if magic == MAGIC else 0
+
+    def close(self):
+        self._mm.close()
+        os.close(self._fd)
+
+    def publish(self, variants, etag, last_modified):
+        meta = json.dumps({
+            "etag": etag,
+            "last_modified": last_modified,
+            "variants": [[name, len(data)] for name, data in variants.items()],
+        }).encode("utf-8")
+        blob = b"".join([META_LEN.pack(len(meta)), meta, *variants.values()])
+        needed = HEADER.size + len(blob)
+        if needed > len(self._mm):
+            self._mm.close()
+            os.ftruncate(self._fd, max(needed, 2 * (needed - HEADER.size)))
+            self._mm = mmap.mmap(self._fd, 0)
+        gen = self.generation
+        HEADER.pack_into(self._mm, 0, MAGIC, gen + 1, 0)      # impar: escribiendo
+        self._mm[HEADER.size:needed] = blob
+        HEADER.pack_into(self._mm, 0, MAGIC, gen + 2, len(blob))
+        self.generation = gen + 2
+        return self.generation
+
+
+class SnapshotReader:
+    def __init__(self, path):
+        self.path = path
+        self._fd = None
+        self._mm = None
+
+    def _map(self):
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+        if self._fd is None:
+            try:
+                self._fd = os.open(self.path, os.O_RDONLY)
+            except FileNotFoundError:
+                return False
+        if os.fstat(self._fd).st_size < HEADER.size:
+            return False
+        self._mm = mmap.mmap(self._fd, 0, access=mmap.ACCESS_READ)
+        return True
+
+    def read(self, since=0):
+        """
+        (generación, variantes, etag, last_modified) si hay una generación publicada
+        distinta de `since`; None si no hay nada nuevo (o nada publicado aún).
+        """
+        for _ in range(READ_ATTEMPTS):
+            if self._mm is None and not self._map():
+                return None
+            magic, gen, length = HEADER.unpack_from(self._mm, 0)
+            if magic != MAGIC or gen == 0 or gen == since:
+                return None
+            if gen % 2:
+                time.sleep(0.001)
+                continue
+            if HEADER.size + length > len(self._mm):
+                self._map()   # el escritor agrandó el archivo
+                continue
+            blob = self._mm[HEADER.size:HEADER.size + length]
+            if HEADER.unpack_from(self._mm, 0)[1] != gen:
+                continue
+            (meta_len,) = META_LEN.unpack_from(blob, 0)
+            pos = META_LEN.size + meta_len
+            meta = json.loads(blob[META_LEN.size:pos])
+            variants = {}
+            for name, size in meta["variants"]:
+                variants[name] = blob[pos:pos + size]
+                pos += size
+            return gen, variants, meta["etag"], meta["last_modified"]
+        return None
@@ -4,8 +4,17 @@
 # Reglas: LEAGUE + fecha, filtro (ambos miembros) o (CPU + miembro), dedup por id, ajustes algebraicos.
 # Orden: por puntos (desc). Empates: por W (desc), luego L (asc).
 
-import requests, time, re, os, json
-from datetime import datetime
+# Import liviano: `requests` (upstream.py), SQLite (game_store/response_cache),
+# el pool de hilos y las reglas por juego se cargan recién cuando se usan.
+import re, os, json
+import game_rules
+import leagues
+import metrics
+import upstream
+from contextlib import ExitStack, contextmanager
+from datetime import datetime, time as dt_time, timedelta
+from itertools import chain
+from zoneinfo import ZoneInfo
 # ===== Config general =====
 
 # ===== MODO DE EJECUCIÓN (switch) =====
@@ -35,43 +44,46 @@ CFG = {
 conf = CFG.get(MODE, CFG["DEBUG"])
 PRINT_DETAILS = conf["PRINT_DETAILS"]
 # Si ya tenías estas variables definidas arriba, estas líneas las sobreescriben según el modo:
-try:
-    PRINT_CAPTURE_SUMMARY
-except NameError:
-    PRINT_CAPTURE_SUMMARY = conf["PRINT_CAPTURE_SUMMARY"]
-else:
-    PRINT_CAPTURE_SUMMARY = conf["PRINT_CAPTURE_SUMMARY"]
-
-try:
-    PRINT_CAPTURE_LIST
-except NameError:
-    PRINT_CAPTURE_LIST = conf["PRINT_CAPTURE_LIST"]
-else:
-    PRINT_CAPTURE_LIST = conf["PRINT_CAPTURE_LIST"]
-
-try:
-    DUMP_ENABLED
-except NameError:
-    DUMP_ENABLED = conf["DUMP_ENABLED"]
-else:
-    DUMP_ENABLED = conf["DUMP_ENABLED"]
-
-try:
-    STOP_AFTER_N
-except NameError:
-    STOP_AFTER_N = conf["STOP_AFTER_N"]
-else:
-    STOP_AFTER_N = conf["STOP_AFTER_N"]
+PRINT_CAPTURE_SUMMARY = conf["PRINT_CAPTURE_SUMMARY"]
+PRINT_CAPTURE_LIST = conf["PRINT_CAPTURE_LIST"]
+DUMP_ENABLED = conf["DUMP_ENABLED"]
+STOP_AFTER_N = conf["STOP_AFTER_N"]
 
 DAY_WINDOW_MODE = conf["DAY_WINDOW_MODE"]  # "calendar" o "sports"
 
-API = "https://mlb25.theshow.com/apis/game_history.json"
-PLATFORM = "psn"
+# API, plataforma, timeouts, límite de requests y cache HTTP: ver upstream.py
 MODE = "LEAGUE"
 SINCE = datetime(2025, 8, 23)
+SCHEDULED_GAMES = 13                # partidos programados por equipo (Prog)
 PAGES = (1, 2, 3, 4, 5, 6)          # <-- SOLO p1 y p2, como validaste
-TIMEOUT = 20
-RETRIES = 2
+
+# === Descarga concurrente ===
+FETCH_WORKERS = int(os.getenv("FETCH_WORKERS", "6"))              # 1 = modo secuencial
+
+# === Ingesta incremental ===
+# Tras la primera sincronización completa de un usuario, sólo se piden páginas
+# hasta encontrar una con juegos ya ingeridos (o todos anteriores a SINCE).
+INCREMENTAL = os.getenv("INCREMENTAL", "1") == "1"
+FORCE_FULL_RESYNC = os.getenv("FORCE_FULL_RESYNC") == "1"   # ignora el estado y baja todas las PAGES
+
+# === Motor de agregación ===
+# "league"   = una pasada sobre los juegos únicos de toda la liga (por defecto)
+# "per_team" = cálculo original, equipo por equipo
+ENGINE = os.getenv("STANDINGS_ENGINE", "league")
+
+# === Detección de cambios por usuario ===
+# Cada ciclo baja la p1 de todos; sólo usuarios con ids nuevos se recalculan.
+CHANGE_DETECTION = os.getenv("CHANGE_DETECTION", "1") == "1"
+
+# === Almacén local de juegos (SQLite) ===
+# Persiste todo lo descargado (historial más allá de PAGES, arranques en frío rápidos).
+GAME_STORE_ENABLED = os.getenv("GAME_STORE", "1") == "1"
+GAME_STORE_PATH = os.getenv("GAME_STORE_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "games.db"))
+
+# Reglas por juego (exclusiones / ganador asignado): se compilan una vez, al
+# clasificar el primer juego (GAME_RULES = None hasta entonces)
+GAME_RULES_FILE = os.getenv("GAME_RULES_FILE", os.path.join(os.path.dirname(os.path.abspath(__file__)), "game_rules.json"))
+GAME_RULES = None
 
 # Mostrar detalle por equipo (línea a línea). Deja False para tabla limpia.
 PRINT_DETAILS = False
@@ -132,15 +144,25 @@ TEAM_POINT_ADJUSTMENTS = {
     # "Cubs": (+1, "Bonificación fair play"),
 }
 
+# Alias/equivalencias históricas que cuentan como miembros de esta liga
+EXTRA_LEAGUE_USERS = {"AiramReynoso_", "Yosoyreynoso_"}
+
+# Liga definida por las constantes de arriba (la única si no hay leagues/*.json)
+DEFAULT_LEAGUE = leagues.LeagueConfig(
+    slug=leagues.DEFAULT_SLUG,
+    league_order=LEAGUE_ORDER,
+    since=SINCE,
+    scheduled=SCHEDULED_GAMES,
+    fetch_aliases=FETCH_ALIASES,
+    extra_users=EXTRA_LEAGUE_USERS,
+    team_record_adjustments=TEAM_RECORD_ADJUSTMENTS,
+    team_point_adjustments=TEAM_POINT_ADJUSTMENTS,
+)
+
 # ===== Miembros de liga (para el filtro de rival) =====
 # Incluye principales + alias para que NINGÚN partido válido se descarte por “no miembro”
-LEAGUE_USERS = {u for (u, _t) in LEAGUE_ORDER}
-for base, alts in FETCH_ALIASES.items():
-    LEAGUE_USERS.add(base)
-    LEAGUE_USERS.update(alts)
-# Agrega alias/equivalencias históricas si corresponde a esta liga:
-LEAGUE_USERS.update({"AiramReynoso_", "Yosoyreynoso_"})
-LEAGUE_USERS_NORM = {u.lower() for u in LEAGUE_USERS}
+LEAGUE_USERS = DEFAULT_LEAGUE.league_users
+LEAGUE_USERS_NORM = frozenset(u.lower() for u in LEAGUE_USERS)
 
 # ===== Utilidades =====
 BXX_RE = re.compile(r"\^(b\d+)\^", flags=re.IGNORECASE)
@@ -157,14 +179,40 @@ def _dump_json(filename: str, data):
         json.dump(data, f, ensure_ascii=False, indent=2)
     return path
 
+@contextmanager
+def _dump_jsonl(filename: str):
+    """
+    Dump en JSON Lines (un objeto por línea) escrito a medida que los juegos
+    pasan por el pipeline: nunca se arma la lista completa en memoria.
+    Entrega una función write(obj), o None si DUMP_ENABLED está apagado.
+    """
+    if not DUMP_ENABLED:
+        yield None
+        return
+    os.makedirs(DUMP_DIR, exist_ok=True)
+    with open(os.path.join(DUMP_DIR, filename), "w", encoding="utf-8") as f:
+        yield lambda obj: f.write(json.dumps(obj, ensure_ascii=False) + "\n")
+
 def normalize_user_for_compare(raw: str) -> str:
     if not raw: return ""
+    if "^" not in raw:  # camino rápido: sin marcas ^bNN^ no hace falta el regex
+        return raw.strip().lower()
     return BXX_RE.sub("", raw).strip().lower()
 
 def is_cpu(raw: str) -> bool:
     return normalize_user_for_compare(raw) == "cpu"
 
 def parse_date(s: str):
+    # Camino rápido para "MM/DD/YYYY HH:MM[:SS]" (el formato de la API), sin strptime
+    try:
+        date_part, time_part = s.split(" ")
+        m, d, y = date_part.split("/")
+        hms = time_part.split(":")
+        if len(y) == 4 and len(hms) in (2, 3):
+            return datetime(int(y), int(m), int(d), int(hms[0]), int(hms[1]),
+                            int(hms[2]) if len(hms) == 3 else 0)
+    except (AttributeError, TypeError, ValueError):
+        pass
     for fmt in ("%m/%d/%Y %H:%M:%S", "%m/%d/%Y %H:%M"):
         try:
             return datetime.strptime(s, fmt)
@@ -172,112 +220,578 @@ def parse_date(s: str):
             pass
     return None
 
+# ===== Sesión HTTP compartida (keep-alive) + rate limit por host =====
 def fetch_page(username: str, page: int):
-    params = {"username": username, "platform": PLATFORM, "page": page}
-    last = None
-    for _ in range(RETRIES):
-        try:
-            r = requests.get(API, params=params, timeout=TIMEOUT)
-            r.raise_for_status()
-            return (r.json() or {}).get("game_history") or []
-        except Exception as e:
-            last = e
-            time.sleep(0.4)
-    print(f"[WARN] {username} p{page} sin datos ({last})")
-    return []
+    """Página de game_history (ver upstream.py); si falla queda en _FAILED_PAGES y devuelve []."""
+    items = upstream.fetch_page(username, page, anchor=_cache_anchor(username))
+    if items is None:
+        _FAILED_PAGES.add((username, page))
+        return []
+    return items
+
+# ===== Almacén de páginas por ciclo =====
+# Cada (username, page) se descarga como máximo UNA vez por ciclo de refresco;
+# compute_rows() y games_played_today_scl() leen de aquí.
+_PAGE_STORE = {}
+_PAGE_READ = set()      # claves ya entregadas por get_page() en este ciclo
+_CYCLE_INGESTED = set()  # usuarios ya ingeridos en este ciclo
+_CACHE_ANCHORS = {}     # usuario → p1 del cache HTTP usable en frío (o None), por ciclo
+PAGE_STORE_STATS = {"fetched": 0, "saved": 0, "failed": 0, "new_games": 0, "rows_reused": 0}
+_FAILED_PAGES = set()   # (username, page) que agotaron RETRIES en este ciclo
+
+# Respaldo ante fallos: última versión buena de cada página (entre ciclos)
+_LAST_GOOD_PAGES = {}
+STALE_USERS = set()     # usuarios servidos con datos de respaldo en este ciclo
+DEGRADED_USERS = set()  # usuarios con páginas fallidas y sin respaldo en este ciclo
+# Usuarios cuya última ingesta perdió páginas sin respaldo (entre ciclos): siguen
+# como 'degraded' aunque se reutilice lo anterior, hasta que una pasada las recupere
+_INCOMPLETE_USERS = set()
+_full_resync_cycle = False
+
+# ids de la página 1 de cada usuario en el ciclo anterior (señal de actividad)
+_LAST_TOP_IDS = {}
+
+# Detección de cambios por usuario: usuarios sin ids nuevos en p1 reutilizan
+# sus juegos y filas del ciclo anterior (sin páginas profundas ni recálculo)
+_UNCHANGED_USERS = set()
+_CYCLE_CHANGED = {}    # usuario → cambió (se decide una sola vez por ciclo, para todas las ligas)
+# usuario → páginas de su última ingesta (las mismas listas de _LAST_GOOD_PAGES,
+# no copias): de ahí salen los juegos sin id y, sin almacén ni INCREMENTAL, todo
+_USER_PAGES = {}
+_PREV_ROWS = {}        # (user, team) → fila calculada (de la liga activa)
+_LEAGUE_PREV_ROWS = {leagues.DEFAULT_SLUG: _PREV_ROWS}   # slug → _PREV_ROWS de esa liga
+ACTIVE_LEAGUE = leagues.DEFAULT_SLUG
+
+# Con varias ligas las páginas se comparten: el corte incremental usa el SINCE más antiguo
+FETCH_SINCE = None
+
+# Estado incremental por usuario sin almacén (vive entre ciclos del worker):
+#   usuario → {id: juego}, del más antiguo al más nuevo (se recorre al revés)
+_USER_STATE = {}
+
+# Usuarios cuya última sincronización completa bajó todas las PAGES sin fallos
+# (y sin fallos desde entonces): sólo ellos pasan a modo incremental o pueden
+# reutilizar lo anterior. Una página perdida deja al usuario fuera hasta que
+# una pasada completa la recupere. Con almacén se guarda también en SQLite.
+_SYNCED_USERS = set()
+
+def begin_refresh_cycle(full_resync: bool = False):
+    """Vacía el almacén de páginas: llamar al inicio de cada ciclo."""
+    global _full_resync_cycle
+    _PAGE_STORE.clear()
+    _PAGE_READ.clear()
+    _CYCLE_INGESTED.clear()
+    _CACHE_ANCHORS.clear()
+    _UNCHANGED_USERS.clear()
+    _CYCLE_CHANGED.clear()
+    metrics.begin_cycle()
+    for k in PAGE_STORE_STATS:
+        PAGE_STORE_STATS[k] = 0
+    _FAILED_PAGES.clear()
+    STALE_USERS.clear()
+    DEGRADED_USERS.clear()
+    _full_resync_cycle = full_resync or FORCE_FULL_RESYNC
+    if _full_resync_cycle:
+        _USER_STATE.clear()
+        _USER_PAGES.clear()
+        _SYNCED_USERS.clear()
+        _clear_day_index()
+        for rows in _LEAGUE_PREV_ROWS.values():
+            rows.clear()
+
+def register_leagues(configs):
+    """Declara las ligas que se calculan en cada ciclo (define FETCH_SINCE)."""
+    global FETCH_SINCE
+    configs = list(configs)
+    FETCH_SINCE = min(cfg.since for cfg in configs) if configs else None
+
+def use_league(cfg):
+    """
+    Activa la configuración de una liga (LeagueConfig) para compute_rows() y
+    games_played_today_scl(). Páginas, juegos por usuario y almacén son
+    compartidos entre ligas; sólo las filas reutilizables son por liga.
+    """
+    global LEAGUE_ORDER, FETCH_ALIASES, TEAM_RECORD_ADJUSTMENTS, TEAM_POINT_ADJUSTMENTS
+    global SINCE, SCHEDULED_GAMES, LEAGUE_USERS, LEAGUE_USERS_NORM, ACTIVE_LEAGUE, _PREV_ROWS
+    LEAGUE_ORDER = list(cfg.league_order)
+    FETCH_ALIASES = cfg.fetch_aliases
+    TEAM_RECORD_ADJUSTMENTS = cfg.team_record_adjustments
+    TEAM_POINT_ADJUSTMENTS = cfg.team_point_adjustments
+    SINCE = cfg.since
+    SCHEDULED_GAMES = cfg.scheduled
+    LEAGUE_USERS = cfg.league_users
+    LEAGUE_USERS_NORM = frozenset(u.lower() for u in LEAGUE_USERS)
+    ACTIVE_LEAGUE = cfg.slug
+    _PREV_ROWS = _LEAGUE_PREV_ROWS.setdefault(cfg.slug, {})
+
+def _cache_anchor(username: str):
+    """
+    Cache HTTP sólo en frío: un usuario cuya p1 ya se vio en este proceso
+    siempre va al upstream. Se decide una vez por usuario y ciclo (antes de
+    bajar sus páginas), así todas sus páginas salen de la misma fuente.
+    """
+    if username not in _CACHE_ANCHORS:
+        cold = username not in _LAST_TOP_IDS and not _full_resync_cycle
+        _CACHE_ANCHORS[username] = upstream.cache_anchor(username, PAGES[0]) if cold else None
+    return _CACHE_ANCHORS[username]
+
+def get_page(username: str, page: int):
+    key = (username, page)
+    if key in _PAGE_STORE:
+        # La primera lectura de una página precargada no es un ahorro; las siguientes sí
+        if key in _PAGE_READ:
+            PAGE_STORE_STATS["saved"] += 1
+        _PAGE_READ.add(key)
+        return _PAGE_STORE[key]
+    items = _resolve_page(key, fetch_page(username, page))
+    PAGE_STORE_STATS["fetched"] += 1
+    PAGE_STORE_STATS["failed"] = len(_FAILED_PAGES)
+    _PAGE_STORE[key] = items
+    _PAGE_READ.add(key)
+    return items
+
+def _resolve_page(key, items):
+    """
+    Stale-while-revalidate por página: si la descarga falló se usa la última
+    versión buena (memoria o cache HTTP en disco, aunque esté vencida) y el
+    usuario queda marcado como 'stale'. Sin respaldo, queda como 'degraded'.
+    """
+    if key not in _FAILED_PAGES:
+        _LAST_GOOD_PAGES[key] = items
+        return items
+    username, page = key
+    fallback = _LAST_GOOD_PAGES.get(key)
+    if fallback is None:
+        fallback = upstream.cached_page(username, page)
+    if fallback is None:
+        DEGRADED_USERS.add(username)
+        return items
+    STALE_USERS.add(username)
+    return fallback
+
+def prefetch_pages(usernames, pages=None):
+    """
+    Descarga en paralelo (FETCH_WORKERS hilos) todas las PAGES (o `pages`) de los
+    usuarios indicados que aún no estén en el almacén del ciclo. Con FETCH_WORKERS <= 1
+    no hace nada y get_page() sigue el camino secuencial.
+    """
+    if FETCH_WORKERS <= 1:
+        return
+    keys = []
+    for u in usernames:
+        # En modo incremental, un usuario ya sincronizado sólo necesita p1 de entrada
+        if u in _UNCHANGED_USERS:
+            user_pages = ()
+        elif pages is not None:
+            user_pages = pages
+        else:
+            user_pages = PAGES[:1] if _is_incremental(u) else PAGES
+        for p in user_pages:
+            if (u, p) not in _PAGE_STORE and (u, p) not in keys:
+                keys.append((u, p))
+    if not keys:
+        return
+    for u in dict.fromkeys(u for u, _p in keys):
+        _cache_anchor(u)
+    from concurrent.futures import ThreadPoolExecutor
+    with ThreadPoolExecutor(max_workers=FETCH_WORKERS) as ex:
+        results = list(ex.map(lambda k: fetch_page(*k), keys))
+    for key, items in zip(keys, results):
+        _PAGE_STORE[key] = _resolve_page(key, items)
+        PAGE_STORE_STATS["fetched"] += 1
+    PAGE_STORE_STATS["failed"] = len(_FAILED_PAGES)
+
+def _league_fetch_usernames():
+    names = []
+    for user_exact, _team in LEAGUE_ORDER:
+        names.append(user_exact)
+        names += FETCH_ALIASES.get(user_exact, [])
+    return names
+
+_GAME_STORE = None
+
+def _store():
+    """GameStore compartido (o None si GAME_STORE=0)."""
+    global _GAME_STORE
+    if not GAME_STORE_ENABLED:
+        return None
+    if _GAME_STORE is None:
+        from game_store import GameStore
+        _GAME_STORE = GameStore(GAME_STORE_PATH)
+    return _GAME_STORE
+
+def _is_incremental(username: str) -> bool:
+    if not INCREMENTAL or _full_resync_cycle:
+        return False
+    return _is_synced(username)
+
+def _is_synced(username: str) -> bool:
+    if username in _SYNCED_USERS:
+        return True
+    store = _store()
+    if store is not None and store.is_synced(username):
+        _SYNCED_USERS.add(username)
+        return True
+    return False
+
+def _set_synced(username: str, synced: bool):
+    if synced == _is_synced(username):
+        return
+    if synced:
+        _SYNCED_USERS.add(username)
+    else:
+        _SYNCED_USERS.discard(username)
+    store = _store()
+    if store is not None:
+        store.set_synced(username, synced)
+
+def _known_ids(username: str):
+    store = _store()
+    if store is not None:
+        return store.known_ids(username)
+    return _USER_STATE.get(username) or {}
+
+def _game_key(g) -> str:
+    return str(g.get("id") or "")
+
+def _page_is_exhausted(page_items, known) -> bool:
+    """True si la página sólo trae juegos ya ingeridos o anteriores a SINCE (FETCH_SINCE)."""
+    since = FETCH_SINCE or SINCE
+    for g in page_items:
+        if _game_key(g) in known:
+            continue
+        d = game_record(g).dt
+        if d and d < since:
+            continue
+        return False
+    return True
 
-def dedup_by_id(gs):
-    seen = set(); out = []
+def _ingest_user(username: str):
+    """
+    Ingiere los juegos del usuario (una sola vez por ciclo).
+    - Primera vez (o resync completo): descarga todas las PAGES.
+    - Incremental: pide páginas en orden y corta en cuanto una página
+      no aporta juegos nuevos; el resto ya está en el estado acumulado.
+    Sólo una pasada completa sin páginas fallidas deja al usuario sincronizado;
+    cualquier página fallida lo devuelve a pasadas completas.
+    Lo nuevo va al almacén (o al estado en memoria) y al índice por día; la
+    lista completa de juegos del usuario no se arma ni se guarda.
+    """
+    if username in _CYCLE_INGESTED:
+        return
+    _CYCLE_INGESTED.add(username)
+    if username in _UNCHANGED_USERS and username in _USER_PAGES:
+        return
+
+    incremental = _is_incremental(username)
+    known = _known_ids(username) if incremental else {}
+
+    pages = []
+    for p in PAGES:
+        page_items = get_page(username, p)
+        pages.append(page_items)
+        if PRINT_CAPTURE_LIST:
+            for g in page_items:
+                print(f"    [cap] {username} p{p} id={g.get('id')}  {g.get('away_full_name','')} @ {g.get('home_full_name','')}  {g.get('display_date','')}")
+        if incremental and _page_is_exhausted(page_items, known):
+            break
+
+    # Actividad: ids nuevos en p1 respecto del ciclo anterior
+    top_ids = {_game_key(g) for g in _PAGE_STORE.get((username, PAGES[0])) or []} - {""}
+    if username in _LAST_TOP_IDS and (username, PAGES[0]) not in _FAILED_PAGES:
+        PAGE_STORE_STATS["new_games"] += len(top_ids - _LAST_TOP_IDS[username])
+    if (username, PAGES[0]) not in _FAILED_PAGES:
+        _LAST_TOP_IDS[username] = top_ids
+    if any((username, p) in _FAILED_PAGES for p in PAGES[:len(pages)]):
+        _set_synced(username, False)
+    elif not incremental:
+        _set_synced(username, True)
+    if username in DEGRADED_USERS:
+        _INCOMPLETE_USERS.add(username)
+    else:
+        _INCOMPLETE_USERS.discard(username)
+
+    _USER_PAGES[username] = pages
+    store = _store()
+    if store is not None:
+        # Persistir: el historial acumulado se lee del almacén con consultas indexadas.
+        # Al índice por día sólo entra lo descargado (lo anterior ya está indexado),
+        # salvo la primera vez en el proceso: ahí entra una vez lo guardado desde el corte.
+        store.upsert(username, chain.from_iterable(pages), parse_date)
+        if username in _INDEXED_USERS:
+            _index_games(username, chain.from_iterable(pages))
+        else:
+            _index_history(username)
+    elif INCREMENTAL:
+        games = _USER_STATE.get(username) if incremental else None
+        if games is None:
+            games = _USER_STATE[username] = {}
+        new_games = {}
+        for g in chain.from_iterable(pages):
+            gid = _game_key(g)
+            if gid and gid not in games:
+                new_games[gid] = g
+        # Se agregan al final en orden inverso: recorrido al revés quedan los nuevos
+        # primero (mismo orden que las páginas) y luego lo ya ingerido, sin copiar
+        for gid in reversed(new_games):
+            games[gid] = new_games[gid]
+        _index_games(username, chain.from_iterable(pages))
+    else:
+        _index_games(username, chain.from_iterable(pages))
+
+def _games_without_id(pages):
+    return (g for items in pages for g in items if not _game_key(g))
+
+def user_games(username: str):
+    """
+    Juegos del usuario para el ciclo actual (iterable perezoso; ingiere si hace
+    falta). Salen del almacén, del estado acumulado o de las páginas, sin copias.
+    """
+    _ingest_user(username)
+    return _user_history(username)
+
+def _user_history(username: str):
+    """Lo ya ingerido del usuario (sin ingerir): almacén, estado acumulado o páginas."""
+    pages = _USER_PAGES.get(username, ())
+    store = _store()
+    if store is not None:
+        return chain(_games_without_id(pages), store.iter_games(usernames=[username]))
+    if INCREMENTAL and username in _USER_STATE:
+        # Juegos sin id no se pueden acumular: se toman tal cual de la última pasada
+        return chain(_games_without_id(pages), reversed(_USER_STATE[username].values()))
+    return chain.from_iterable(pages)
+
+def detect_changed_users(usernames):
+    """
+    Pasada barata: baja sólo la p1 de cada usuario y compara sus ids con el
+    ciclo anterior. Devuelve el set de usuarios cambiados (o sin referencia);
+    el resto queda marcado como sin cambios para este ciclo.
+    """
+    usernames = list(dict.fromkeys(usernames))
+    first = PAGES[0]
+    prefetch_pages([u for u in usernames if u not in _CYCLE_CHANGED], pages=(first,))
+    changed = set()
+    for u in usernames:
+        # Ya decidido por otra liga en este ciclo (su p1 ya actualizó _LAST_TOP_IDS)
+        if u in _CYCLE_CHANGED:
+            if _CYCLE_CHANGED[u]:
+                changed.add(u)
+            continue
+        items = get_page(u, first)
+        top_ids = {_game_key(g) for g in items} - {""}
+        if (u, first) in _FAILED_PAGES:
+            # Sin datos frescos: se reutiliza lo anterior si existe (si estaba
+            # incompleto, sigue degradado)
+            if u not in _USER_PAGES:
+                changed.add(u)
+            else:
+                (DEGRADED_USERS if u in _INCOMPLETE_USERS else STALE_USERS).add(u)
+            continue
+        if u not in _LAST_TOP_IDS or top_ids != _LAST_TOP_IDS[u] or u not in _USER_PAGES or not _is_synced(u):
+            changed.add(u)
+    for u in usernames:
+        _CYCLE_CHANGED.setdefault(u, u in changed)
+    _UNCHANGED_USERS.update(u for u in usernames if u not in changed)
+    return changed
+
+def iter_dedup_by_id(gs):
+    """Deduplica por id sobre la marcha: sólo guarda los ids ya vistos."""
+    seen = set()
     for g in gs:
         gid = str(g.get("id") or "")
         if gid and gid in seen:
             continue
         if gid:
             seen.add(gid)
-        out.append(g)
-    return out
-
-def norm_team(s: str) -> str:
-    return (s or "").strip().lower()
+        yield g
 
-def compute_team_record_for_user(username_exact: str, team_name: str):
-    # 1) Descargar páginas del usuario PRINCIPAL y de sus ALIAS; luego deduplicar globalmente por id
-    pages_raw = []
-    usernames_to_fetch = [username_exact] + FETCH_ALIASES.get(username_exact, [])
-    for uname in usernames_to_fetch:
-        for p in PAGES:
-            page_items = fetch_page(uname, p)
-            pages_raw += page_items
-            if PRINT_CAPTURE_LIST:
-                for g in page_items:
-                    print(f"    [cap] {uname} p{p} id={g.get('id')}  {g.get('away_full_name','')} @ {g.get('home_full_name','')}  {g.get('display_date','')}")
-    pages_dedup = dedup_by_id(pages_raw)
-
-    # 2) Filtrar: LEAGUE + fecha + que juegue ese equipo + rival válido
-    considered = []
-    for g in pages_dedup:
-        if (g.get("game_mode") or "").strip().upper() != MODE:
-            continue
-        d = parse_date(g.get("display_date",""))
-        if not d or d < SINCE:
-            continue
+def dedup_by_id(gs):
+    return list(iter_dedup_by_id(gs))
 
-        home = (g.get("home_full_name") or "").strip()
-        away = (g.get("away_full_name") or "").strip()
-        if norm_team(team_name) not in (norm_team(home), norm_team(away)):
-            continue
+def _tap(games, counts, key, write=None):
+    """Cuenta (y opcionalmente vuelca) los juegos que pasan por una etapa del pipeline."""
+    for g in games:
+        counts[key] += 1
+        if write is not None:
+            write(g)
+        yield g
 
-        # Filtro: ambos miembros o CPU + miembro
-        home_name_raw = g.get("home_name","")
-        away_name_raw = g.get("away_name","")
-        h_norm = normalize_user_for_compare(home_name_raw)
-        a_norm = normalize_user_for_compare(away_name_raw)
-        h_mem = h_norm in LEAGUE_USERS_NORM
-        a_mem = a_norm in LEAGUE_USERS_NORM
-        if not ( (h_mem and a_mem) or (is_cpu(home_name_raw) and a_mem) or (is_cpu(away_name_raw) and h_mem) ):
-            continue
+def _team_dumps(stack, teams):
+    """
+    Dumps raw/dedup/considered por equipo del cálculo de liga, con los mismos
+    archivos que el cálculo por equipo: [(raw, dedup, considered, ids vistos)]
+    por equipo, o None si DUMP_ENABLED está apagado.
+    """
+    if not DUMP_ENABLED:
+        return None
+    out = []
+    for user_exact, _team, _owners in teams:
+        base = _safe_name(user_exact)
+        writers = [stack.enter_context(_dump_jsonl(f"{base}_{kind}.jsonl")) for kind in ("raw", "dedup", "considered")]
+        out.append((*writers, set()))
+    return out
 
-        considered.append(g)
+def norm_team(s: str) -> str:
+    return (s or "").strip().lower()
 
-    # === Captura/dumps por usuario principal ===
-    if PRINT_CAPTURE_SUMMARY:
-        print(f"    [capturas] {team_name} ({username_exact}): raw={len(pages_raw)}  dedup={len(pages_dedup)}  considerados={len(considered)}")
-    if DUMP_ENABLED:
-        base = _safe_name(username_exact)
-        _dump_json(f"{base}_raw.json", pages_raw)
-        _dump_json(f"{base}_dedup.json", pages_dedup)
-        _dump_json(f"{base}_considered.json", considered)
-
-    # 3) Contar W/L
-    wins = losses = 0
-    detail_lines = []
-    for g in considered:
-        home = (g.get("home_full_name") or "").strip()
-        away = (g.get("away_full_name") or "").strip()
+class GameRecord:
+    """
+    Juego ya clasificado una sola vez: fecha parseada, claves normalizadas de
+    equipo/usuario y banderas de modo/membresía/resultado. Los filtros del
+    cálculo trabajan sobre estos campos en vez de re-parsear el dict crudo.
+    """
+    __slots__ = ("gid", "sig", "dt", "is_mode", "home", "away", "home_key", "away_key",
+                 "home_norm", "away_norm", "home_runs", "away_runs", "members_of",
+                 "home_member", "away_member", "both_members", "league_match", "winner", "excluded", "unlisted")
+
+    def __init__(self, g, sig=None):
+        self.sig = _signature(g) if sig is None else sig
+        self.gid = str(g.get("id") or "")
+        self.dt = parse_date(g.get("display_date", ""))
+        self.is_mode = (g.get("game_mode") or "").strip().upper() == MODE
+        self.home = (g.get("home_full_name") or "").strip()
+        self.away = (g.get("away_full_name") or "").strip()
+        self.home_key = self.home.lower()
+        self.away_key = self.away.lower()
+        self.home_norm = normalize_user_for_compare(g.get("home_name", ""))
+        self.away_norm = normalize_user_for_compare(g.get("away_name", ""))
+        self.home_runs = str(g.get("home_runs") or "0")
+        self.away_runs = str(g.get("away_runs") or "0")
+        self.set_members(LEAGUE_USERS_NORM)
         hr = (g.get("home_display_result") or "").strip().upper()
         ar = (g.get("away_display_result") or "").strip().upper()
-        dt = g.get("display_date","")
-        if hr == "W":
-            win, lose = home, away
-        elif ar == "W":
-            win, lose = away, home
+        self.winner = "home" if hr == "W" else ("away" if ar == "W" else None)
+        # Reglas por juego (GAME_RULES): exclusión o ganador asignado
+        rules = _game_rules()
+        rule = rules.lookup(self) if rules else None
+        self.excluded = rule is not None and rule.excludes_from_table   # fuera de la tabla
+        self.unlisted = rule is not None and rule.excludes              # fuera de las listas de juegos
+        if rule is not None and rule.winner:
+            self.winner = rule.winner
+
+    def set_members(self, members_norm):
+        """Banderas de membresía respecto de los usuarios de una liga."""
+        h_norm, a_norm = self.home_norm, self.away_norm
+        self.members_of = members_norm
+        self.home_member = h_norm in members_norm
+        self.away_member = a_norm in members_norm
+        self.both_members = self.home_member and self.away_member
+        # Filtro de rival: ambos miembros o CPU + miembro
+        self.league_match = self.both_members or (h_norm == "cpu" and self.away_member) \
+            or (a_norm == "cpu" and self.home_member)
+
+# id → GameRecord (se reutiliza entre funciones y ciclos). Sólo juegos desde el
+# corte de la ventana (ver _index_cutoff); los anteriores se clasifican al vuelo
+_RECORDS = {}
+
+# Campos del juego que leen GameRecord y DayEntry: su huella detecta un juego
+# corregido sin guardar el dict original
+_SIGNATURE_FIELDS = ("id", "game_mode", "display_date", "home_full_name", "away_full_name",
+                     "home_name", "away_name", "home_display_result", "away_display_result",
+                     "home_runs", "away_runs", "display_pitcher_info")
+
+def _signature(g) -> int:
+    return hash(tuple(g.get(k) for k in _SIGNATURE_FIELDS))
+
+def _game_rules():
+    global GAME_RULES
+    if GAME_RULES is None:
+        GAME_RULES = game_rules.load_rules(GAME_RULES_FILE)
+    return GAME_RULES
+
+def game_record(g, sig=None) -> GameRecord:
+    gid = str(g.get("id") or "")
+    if not gid:
+        return GameRecord(g, sig)
+    if sig is None:
+        sig = _signature(g)
+    rec = _RECORDS.get(gid)
+    if rec is None or rec.sig != sig:
+        rec = GameRecord(g, sig)
+        if rec.dt is not None and rec.dt >= _index_cutoff():
+            _RECORDS[gid] = rec
         else:
-            continue
+            _RECORDS.pop(gid, None)
+    elif rec.members_of is not LEAGUE_USERS_NORM:
+        # Clasificado con otra liga activa: sólo se recalcula la membresía
+        rec.set_members(LEAGUE_USERS_NORM)
+    return rec
 
-        if norm_team(win) == norm_team(team_name):
-            wins += 1
-        elif norm_team(lose) == norm_team(team_name):
-            losses += 1
+def compute_team_record_for_user(username_exact: str, team_name: str):
+    # 1) Páginas del usuario PRINCIPAL y de sus ALIAS (quedan en el almacén del ciclo)
+    usernames_to_fetch = [username_exact] + FETCH_ALIASES.get(username_exact, [])
+    store = _store()
+    with metrics.span("fetch"):
+        for uname in usernames_to_fetch:
+            _ingest_user(uname)
+    if store is not None:
+        # Consulta indexada: sólo juegos LEAGUE desde SINCE de este equipo. Los juegos
+        # sin id no se guardan: salen de la última pasada, igual que sin almacén
+        source = chain((g for uname in usernames_to_fetch for g in _games_without_id(_USER_PAGES.get(uname, ()))),
+                       store.iter_games(usernames=usernames_to_fetch, game_mode=MODE, since=SINCE, team=team_name))
+    else:
+        source = (g for uname in usernames_to_fetch for g in user_games(uname))
+
+    # 2) Pipeline en streaming: dedup global por id → filtro → conteo.
+    # Sólo se retienen los ids vistos y los contadores (no hay listas intermedias);
+    # por eso dedup/filtro/conteo se miden juntos en la etapa "count".
+    team_key = norm_team(team_name)
+    counts = {"raw": 0, "dedup": 0, "considered": 0}
+    base = _safe_name(username_exact)
+    with metrics.span("count"), ExitStack() as dumps:
+        raw_out, dedup_out, considered_out = (
+            dumps.enter_context(_dump_jsonl(f"{base}_{kind}.jsonl")) for kind in ("raw", "dedup", "considered"))
+        games = _tap(source, counts, "raw", raw_out)
+        games = _tap(iter_dedup_by_id(games), counts, "dedup", dedup_out)
+
+        wins = losses = 0
+        detail_lines = []
+        for g in games:
+            # Filtrar: LEAGUE + fecha + que juegue ese equipo + rival válido
+            rec = game_record(g)
+            if not rec.is_mode or rec.excluded:
+                continue
+            if not rec.dt or rec.dt < SINCE:
+                continue
+            if team_key != rec.home_key and team_key != rec.away_key:
+                continue
+            # Filtro: ambos miembros o CPU + miembro
+            if not rec.league_match:
+                continue
+            counts["considered"] += 1
+            if considered_out is not None:
+                considered_out(g)
+
+            # 3) Contar W/L
+            if rec.winner == "home":
+                win, win_key, lose_key = rec.home, rec.home_key, rec.away_key
+            elif rec.winner == "away":
+                win, win_key, lose_key = rec.away, rec.away_key, rec.home_key
+            else:
+                continue
+
+            if win_key == team_key:
+                wins += 1
+            elif lose_key == team_key:
+                losses += 1
+
+            if PRINT_DETAILS:
+                detail_lines.append(f"{g.get('display_date','')}  {rec.away} @ {rec.home} -> ganó {win}")
+
+    # === Captura por usuario principal ===
+    if PRINT_CAPTURE_SUMMARY:
+        print(f"    [capturas] {team_name} ({username_exact}): raw={counts['raw']}  dedup={counts['dedup']}  considerados={counts['considered']}")
 
-        if PRINT_DETAILS:
-            detail_lines.append(f"{dt}  {away} @ {home} -> ganó {win}")
+    return _finish_row(username_exact, team_name, wins, losses, detail_lines)
 
+def _finish_row(username_exact: str, team_name: str, wins: int, losses: int, detail_lines):
+    """Aplica ajustes de W/L y de puntos y arma la fila de la tabla."""
     # 4) Ajuste algebraico del equipo (W/L)
     adj_w, adj_l = TEAM_RECORD_ADJUSTMENTS.get(team_name, (0, 0))
     wins_adj, losses_adj = wins + adj_w, losses + adj_l
 
     # 5) Puntos y métricas de tabla
-    scheduled = 13
+    scheduled = SCHEDULED_GAMES
     played = max(wins_adj + losses_adj, 0)
     remaining = max(scheduled - played, 0)
     points_base = 3 * wins_adj + 2 * losses_adj
@@ -301,12 +815,121 @@ def compute_team_record_for_user(username_exact: str, team_name: str):
         "detail": detail_lines,
     }
 
+def _league_games_with_owners(usernames=None):
+    """
+    Juegos de toda la liga con los usuarios (de `usernames`) en cuyo historial
+    aparecen: iterable perezoso de (juego, {usernames}). Con almacén llega cada
+    juego una vez (GROUP BY en SQL); sin almacén, cada aparición por usuario por
+    separado (quien consume descarta los ids repetidos).
+    """
+    if usernames is None:
+        usernames = _league_fetch_usernames()
+    usernames = list(dict.fromkeys(usernames))
+    with metrics.span("fetch"):
+        for uname in usernames:
+            _ingest_user(uname)
+
+    store = _store()
+    if store is not None:
+        # Juegos sin id (no se guardan): de la última pasada, igual que sin almacén
+        return chain(((g, {u}) for u in usernames for g in _games_without_id(_USER_PAGES.get(u, ()))),
+                     store.iter_games_with_owners(usernames=usernames, game_mode=MODE, since=SINCE))
+    return ((g, {uname}) for uname in usernames for g in user_games(uname))
+
+def compute_league_records(league_order=None):
+    """
+    Agregación en una sola pasada en streaming: cada juego de la liga se clasifica
+    una vez y acredita W/L a los dos equipos a la vez; sólo se retienen los ids ya
+    contados por equipo y los contadores. Un equipo sólo suma juegos que aparecen
+    en el historial de su usuario (o alias), igual que el cálculo por equipo.
+    Los ajustes de W/L y puntos se aplican al final. Devuelve filas sin ordenar.
+    `league_order` permite calcular sólo un subconjunto de LEAGUE_ORDER.
+    """
+    if league_order is None:
+        league_order = LEAGUE_ORDER
+    teams = []        # [(user, team, {usernames})]
+    by_key = {}       # norm_team → [índices en teams]
+    for i, (user_exact, team_name) in enumerate(league_order):
+        owners = {user_exact, *FETCH_ALIASES.get(user_exact, [])}
+        teams.append((user_exact, team_name, owners))
+        by_key.setdefault(norm_team(team_name), []).append(i)
+    wins = [0] * len(teams)
+    losses = [0] * len(teams)
+    considered = [0] * len(teams)
+    details = [[] for _ in teams]
+    counted = [set() for _ in teams]   # ids ya acreditados (usuario y alias pueden repetirlos)
+
+    usernames = list(dict.fromkeys(u for _user, _team, owners in teams for u in sorted(owners)))
+    games = _league_games_with_owners(usernames)
+
+    # Filtro y conteo en la misma pasada (por eso se miden juntos en la etapa "count").
+    # Con dumps, "raw" es cada juego del historial del equipo tal como llega
+    # (con almacén, ya filtrado por MODE y SINCE en la consulta)
+    with metrics.span("count"), ExitStack() as stack:
+        dumps = _team_dumps(stack, teams)
+        for g, owners in games:
+            rec = game_record(g)
+            if dumps is not None:
+                for i, (_user, _team, team_owners) in enumerate(teams):
+                    if team_owners & owners:
+                        raw_out, dedup_out, _considered_out, seen = dumps[i]
+                        raw_out(g)
+                        if not rec.gid or rec.gid not in seen:
+                            seen.add(rec.gid)
+                            dedup_out(g)
+            hk, ak = rec.home_key, rec.away_key
+            if hk not in by_key and ak not in by_key:
+                continue
+            if not rec.is_mode or rec.excluded:
+                continue
+            if not rec.dt or rec.dt < SINCE:
+                continue
+            if not rec.league_match:
+                continue
+
+            # Conteo: acredita W/L a ambos equipos del juego
+            if rec.winner == "home":
+                win, wk, lk = rec.home, hk, ak
+            elif rec.winner == "away":
+                win, wk, lk = rec.away, ak, hk
+            else:
+                win = wk = lk = None
+
+            for i in dict.fromkeys(by_key.get(hk, []) + by_key.get(ak, [])):
+                if not (teams[i][2] & owners):
+                    continue
+                if rec.gid:
+                    if rec.gid in counted[i]:
+                        continue
+                    counted[i].add(rec.gid)
+                considered[i] += 1
+                if dumps is not None:
+                    dumps[i][2](g)
+                if wk is None:
+                    continue
+                team_key = norm_team(teams[i][1])
+                if team_key == wk:
+                    wins[i] += 1
+                elif team_key == lk:
+                    losses[i] += 1
+                if PRINT_DETAILS:
+                    details[i].append(f"{g.get('display_date','')}  {rec.away} @ {rec.home} -> ganó {win}")
+
+    rows = []
+    for i, (user_exact, team_name, _owners) in enumerate(teams):
+        if PRINT_CAPTURE_SUMMARY:
+            print(f"    [capturas] {team_name} ({user_exact}): considerados={considered[i]}")
+        rows.append(_finish_row(user_exact, team_name, wins[i], losses[i], details[i]))
+    return rows
+
 def main():
     os.makedirs(DUMP_DIR, exist_ok=True)
+    begin_refresh_cycle()
 
     take = len(LEAGUE_ORDER) if STOP_AFTER_N is None else min(STOP_AFTER_N, len(LEAGUE_ORDER))
     rows = []
     print(f"Procesando {take} equipos (páginas {PAGES})...\n")
+    prefetch_pages(_league_fetch_usernames())
     for i, (user, team) in enumerate(LEAGUE_ORDER[:take], start=1):
         print(f"[{i}/{take}] {team} ({user})...")
         row = compute_team_record_for_user(user, team)
@@ -356,19 +979,18 @@ def main():
         for i, s in enumerate(games_today, 1):
             print(f"{i:>2}- {s}")
 
-    print(f"\nÚltima actualización: {datetime.now():%Y-%m-%d %H:%M:%S}")
+    print(f"\nPáginas descargadas: {PAGE_STORE_STATS['fetched']}  (ahorradas: {PAGE_STORE_STATS['saved']})")
+    print(f"Última actualización: {datetime.now():%Y-%m-%d %H:%M:%S}")
     print(f"JSON generados en: .\\{DUMP_DIR}\\")
     print("  - standings.json")
     print("  - games_today.json")
-    print("  - <usuario>_raw.json / _dedup.json / _considered.json")
+    print("  - <usuario>_raw.jsonl / _dedup.jsonl / _considered.jsonl  (JSON Lines)")
 
 if __name__ == "__main__":
     main()
 
 
 # ====== AÑADIR AL FINAL DE standings_cascade_points_desc.py ======
-from zoneinfo import ZoneInfo
-from datetime import datetime
 
 # ==============================
 # Compatibilidad: filas completas
@@ -392,96 +1014,273 @@ def compute_rows():
     if "LEAGUE_ORDER" not in globals():
         raise RuntimeError("LEAGUE_ORDER no existe en standings_cascade_points_desc.py")
 
-    rows = []
-    for user_exact, team_name in LEAGUE_ORDER:
-        rows.append(func(user_exact, team_name))
-
-    rows.sort(key=lambda r: (-r.get("points", 0), -r.get("wins", 0), r.get("losses", 0)))
+    # Detección de cambios: p1 de todos; sólo se recalculan equipos con usuarios cambiados
+    pending = list(LEAGUE_ORDER)
+    reused = []
+    if CHANGE_DETECTION and not _full_resync_cycle and _PREV_ROWS:
+        with metrics.span("fetch"):
+            changed = detect_changed_users(_league_fetch_usernames())
+        pending, reused = [], []
+        for user_exact, team_name in LEAGUE_ORDER:
+            owners = {user_exact, *FETCH_ALIASES.get(user_exact, [])}
+            prev = _PREV_ROWS.get((user_exact, team_name))
+            if prev is not None and not (owners & changed):
+                reused.append(prev)
+            else:
+                pending.append((user_exact, team_name))
+        PAGE_STORE_STATS["rows_reused"] = len(reused)
+
+    # Descarga concurrente de todas las páginas del ciclo (si FETCH_WORKERS > 1)
+    with metrics.span("fetch"):
+        prefetch_pages([u for (user_exact, _t) in pending for u in [user_exact] + FETCH_ALIASES.get(user_exact, [])])
+
+    if ENGINE == "league":
+        rows = compute_league_records(pending) if pending else []
+    else:
+        rows = []
+        for user_exact, team_name in pending:
+            rows.append(func(user_exact, team_name))
+    for r in rows:
+        _PREV_ROWS[(r["user"], r["team"])] = r
+    # Volver al orden de LEAGUE_ORDER (recalculadas y reutilizadas mezcladas):
+    # el sort es estable y los empates completos se resuelven por ese orden
+    by_key = {(r["user"], r["team"]): r for r in rows + reused}
+    rows = [by_key[tuple(key)] for key in LEAGUE_ORDER if tuple(key) in by_key]
+
+    # Filas con datos de respaldo (o incompletos) quedan marcadas
+    not_fresh = STALE_USERS | DEGRADED_USERS
+    for r in rows:
+        r["stale"] = bool({r["user"], *FETCH_ALIASES.get(r["user"], [])} & not_fresh)
+
+    with metrics.span("sort"):
+        rows.sort(key=lambda r: (-r.get("points", 0), -r.get("wins", 0), r.get("losses", 0)))
     return rows
 
 
 # -------------------------------
-# Juegos jugados HOY (Chile) - FIX TZ + DEDUP EXTRA
+# Índice de juegos por día local (Chile)
 # -------------------------------
-def games_played_today_scl():
+SCL_TZ = ZoneInfo("America/Santiago")
+UTC_TZ = ZoneInfo("UTC")
+SPORTS_DAY_START_HOUR = 6   # DAY_WINDOW_MODE="sports": el día va de 06:00 a 05:59
+
+class DayEntry:
     """
-    Lista juegos del DÍA (America/Santiago) en formato:
-      'Yankees 1 - Brewers 2  - 30-08-2025 - 3:28 pm (hora Chile)'
-    Mejoras:
-      - Deduplicación por id y también por (equipos, runs, pitcher_info).
-      - Si la fecha viene sin tz, se asume UTC y se convierte a America/Santiago.
-      - Se requiere que AMBOS participantes pertenezcan a la liga.
+    Juego MODE ya ubicado en su día local, con la línea de salida lista. Guarda
+    sólo lo que usa el índice (no el dict original).
     """
-    tz_scl = ZoneInfo("America/Santiago")
-    tz_utc = ZoneInfo("UTC")
-    today_local = datetime.now(tz_scl).date()
-
-    # Traer páginas p1 y p2 de todos los usuarios de la liga
-    all_pages = []
-    for username_exact, _team in LEAGUE_ORDER:
-        for p in PAGES:
-            all_pages += fetch_page(username_exact, p)
-
-    # Deduplicadores
-    seen_ids = set()
-    seen_keys = set()  # (home, away, hr, ar, pitcher_info)
-    items = []
-
-    for g in dedup_by_id(all_pages):
-        if (g.get("game_mode") or "").strip().upper() != MODE:
-            continue
-
-        d = parse_date(g.get("display_date", ""))
-        if not d:
-            continue
+    __slots__ = ("day", "d_local", "sig", "seq", "home_norm", "away_norm", "owners", "canon", "label")
 
+    def __init__(self, g, rec):
+        d = rec.dt
         # Asumir UTC si es naive, luego convertir a SCL
         if d.tzinfo is None:
-            d = d.replace(tzinfo=tz_utc)
-        d_local = d.astimezone(tz_scl)
-
-        if d_local.date() != today_local:
+            d = d.replace(tzinfo=UTC_TZ)
+        self.d_local = d.astimezone(SCL_TZ)
+        self.day = local_day(self.d_local)
+        self.sig = rec.sig
+        gid = _game_key(g)
+        self.seq = int(gid) if gid.isdigit() else 0   # id numérico: orden de las páginas (más nuevo primero)
+        self.home_norm = rec.home_norm
+        self.away_norm = rec.away_norm
+        self.owners = set()   # usuarios en cuyo historial aparece
+        hr, ar = rec.home_runs, rec.away_runs
+        pitcher_info = (g.get("display_pitcher_info") or "").strip()
+        # Clave canónica más robusta (dedup además del id)
+        self.canon = (rec.home, rec.away, hr, ar, pitcher_info)
+        try:
+            fecha_hora = self.d_local.strftime("%d-%m-%Y - %-I:%M %p").lower()
+        except Exception:
+            fecha_hora = self.d_local.strftime("%d-%m-%Y - %#I:%M %p").lower()
+        self.label = f"{rec.home} {hr} - {rec.away} {ar}  - {fecha_hora} (hora Chile)"
+
+# Cada juego se indexa UNA vez, al ingerirse en _ingest_user() (vive entre ciclos),
+# sólo desde el corte de la ventana (el día local de FETCH_SINCE / SINCE):
+#   _DAY_INDEX = {date: {clave: DayEntry}}    _DAY_KEYS = {clave: DayEntry}
+# Los días anteriores no se guardan: se arman al pedirlos desde el almacén (o el
+# estado en memoria) y quedan como líneas por liga en _OLD_DAYS hasta que se
+# ingiera un juego de esos días que no se había visto.
+_DAY_INDEX = {}
+_DAY_KEYS = {}
+_INDEXED_USERS = set()   # usuarios cuyo historial del almacén ya está en el índice
+_INDEX_CUTOFF = None     # ((since, DAY_WINDOW_MODE), corte UTC naive) vigente
+_OLD_DAYS = {}           # slug de liga → {date: [líneas]} anteriores al corte
+_OLD_SEEN = set()        # huellas (clave, juego, usuario) de juegos anteriores al corte ya vistos
+
+def local_day(d_local):
+    """Día (date) al que pertenece un instante en hora Chile según DAY_WINDOW_MODE."""
+    if DAY_WINDOW_MODE == "sports":
+        d_local = d_local - timedelta(hours=SPORTS_DAY_START_HOUR)
+    return d_local.date()
+
+def current_day():
+    return local_day(datetime.now(SCL_TZ))
+
+def _index_cutoff():
+    """
+    Inicio (UTC naive, como las fechas de los juegos) del día local de FETCH_SINCE
+    (o SINCE). Si cambia, el índice y _RECORDS se rehacen con el corte nuevo.
+    """
+    global _INDEX_CUTOFF
+    since = FETCH_SINCE or SINCE
+    window = (since, DAY_WINDOW_MODE)
+    if _INDEX_CUTOFF is None or _INDEX_CUTOFF[0] != window:
+        first_day = local_day((since if since.tzinfo else since.replace(tzinfo=UTC_TZ)).astimezone(SCL_TZ))
+        start = dt_time(SPORTS_DAY_START_HOUR if DAY_WINDOW_MODE == "sports" else 0)
+        cutoff = datetime.combine(first_day, start, tzinfo=SCL_TZ).astimezone(UTC_TZ).replace(tzinfo=None)
+        moved = _INDEX_CUTOFF is not None
+        _INDEX_CUTOFF = (window, cutoff)
+        if moved:
+            for gid in [gid for gid, rec in _RECORDS.items() if rec.dt < cutoff]:
+                del _RECORDS[gid]
+            _clear_day_index()
+            for username in list(_USER_PAGES):
+                _index_history(username)
+    return _INDEX_CUTOFF[1]
+
+def _index_key(g):
+    return _game_key(g) or ("", g.get("home_full_name"), g.get("away_full_name"),
+                            g.get("home_runs"), g.get("away_runs"), g.get("display_date"))
+
+def _index_games(username: str, games):
+    cutoff = _index_cutoff()
+    for g in games:
+        key = _index_key(g)
+        sig = _signature(g)
+        entry = _DAY_KEYS.get(key)
+        if entry is not None and entry.sig == sig:
+            entry.owners.add(username)
+            continue
+        rec = game_record(g, sig)
+        if rec.dt and rec.dt < cutoff:
+            # Día anterior a la ventana: sólo invalida las líneas armadas de esos días
+            mark = hash((key, sig, username))
+            if mark not in _OLD_SEEN:
+                _OLD_SEEN.add(mark)
+                _OLD_DAYS.clear()
+            if entry is not None:
+                _DAY_INDEX[entry.day].pop(key, None)
+                del _DAY_KEYS[key]
+            continue
+        if not rec.is_mode or not rec.dt or rec.unlisted:
+            continue
+        owners = set()
+        if entry is not None:
+            # El juego cambió (p.ej. fecha corregida): se re-ubica
+            owners = entry.owners
+            _DAY_INDEX[entry.day].pop(key, None)
+        entry = _DAY_KEYS[key] = DayEntry(g, rec)
+        entry.owners = owners | {username}
+        _DAY_INDEX.setdefault(entry.day, {})[key] = entry
+
+def _index_history(username: str):
+    """Indexa todo lo ya acumulado del usuario desde el corte (primera vez en el proceso o corte nuevo)."""
+    store = _store()
+    if store is None:
+        _index_games(username, _user_history(username))
+        return
+    _index_games(username, _games_without_id(_USER_PAGES.get(username, ())))
+    _index_games(username, store.iter_games(usernames=[username], game_mode=MODE, since=_index_cutoff()))
+    _INDEXED_USERS.add(username)
+
+def _clear_day_index():
+    _DAY_INDEX.clear()
+    _DAY_KEYS.clear()
+    _INDEXED_USERS.clear()
+    _OLD_DAYS.clear()
+    _OLD_SEEN.clear()
+
+def _ingest_league():
+    # Juegos de todos los usuarios de la liga (una sola vez por ciclo; quedan indexados)
+    for username_exact, _team in LEAGUE_ORDER:
+        _ingest_user(username_exact)
+
+def _day_lines(entries):
+    """Líneas de un día para la liga activa: ambos jugadores miembros, dedup por id y por clave canónica."""
+    position = {u: i for i, (u, _t) in enumerate(LEAGUE_ORDER)}
+    candidates = []
+    for e in entries.values():
+        owners = [position[u] for u in e.owners if u in position]
+        if not owners:
             continue
-
         # Ambos jugadores deben pertenecer a la liga
-        home_name_raw = (g.get("home_name") or "")
-        away_name_raw = (g.get("away_name") or "")
-        h_norm = normalize_user_for_compare(home_name_raw)
-        a_norm = normalize_user_for_compare(away_name_raw)
-        if not (h_norm in LEAGUE_USERS_NORM and a_norm in LEAGUE_USERS_NORM):
+        if e.home_norm not in LEAGUE_USERS_NORM or e.away_norm not in LEAGUE_USERS_NORM:
             continue
-
-        # Dedup por id
-        gid = str(g.get("id") or "")
-        if gid and gid in seen_ids:
+        candidates.append((min(owners), -e.seq, e))
+    # Mismo orden que recorrer las páginas de LEAGUE_ORDER una tras otra: decide
+    # qué juego queda en un empate de clave canónica y, con el sort estable, el
+    # orden de los juegos a la misma hora
+    candidates.sort(key=lambda c: c[:2])
+    seen_keys = set()
+    items = []
+    for _pos, _seq, e in candidates:
+        if e.canon in seen_keys:
             continue
-
-        home = (g.get("home_full_name") or "").strip()
-        away = (g.get("away_full_name") or "").strip()
-        hr = str(g.get("home_runs") or "0")
-        ar = str(g.get("away_runs") or "0")
-        pitcher_info = (g.get("display_pitcher_info") or "").strip()
-
-        # Clave canónica más robusta
-        canon_key = (home, away, hr, ar, pitcher_info)
-        if canon_key in seen_keys:
+        seen_keys.add(e.canon)
+        items.append(e)
+    items.sort(key=lambda e: e.d_local)
+    return [e.label for e in items]
+
+def _old_days():
+    """{date: [líneas]} de la liga activa anteriores al corte, armado al pedirlo."""
+    days = _OLD_DAYS.get(ACTIVE_LEAGUE)
+    if days is not None:
+        return days
+    cutoff = _index_cutoff()
+    usernames = list(dict.fromkeys(_league_fetch_usernames()))
+    store = _store()
+    if store is not None:
+        games = chain(((g, {u}) for u in usernames for g in _games_without_id(_USER_PAGES.get(u, ()))),
+                      store.iter_games_with_owners(usernames, game_mode=MODE, until=cutoff))
+    else:
+        games = ((g, {u}) for u in usernames for g in _user_history(u))
+    by_day, keys = {}, {}
+    for g, owners in games:
+        rec = game_record(g)
+        if not rec.is_mode or not rec.dt or rec.dt >= cutoff or rec.unlisted:
             continue
+        key = _index_key(g)
+        entry = keys.get(key)
+        if entry is None:
+            entry = keys[key] = DayEntry(g, rec)
+            by_day.setdefault(entry.day, {})[key] = entry
+        entry.owners |= owners
+    days = _OLD_DAYS[ACTIVE_LEAGUE] = {}
+    for day in sorted(by_day):
+        lines = _day_lines(by_day[day])
+        if lines:
+            days[day] = lines
+    return days
+
+def games_index_by_day():
+    """Todos los días indexados de la liga activa: {'YYYY-MM-DD': [líneas]}."""
+    with metrics.span("games_index"):
+        _ingest_league()
+        out = {day.isoformat(): lines for day, lines in _old_days().items()}
+        for day in sorted(_DAY_INDEX):
+            lines = _day_lines(_DAY_INDEX[day])
+            if lines:
+                out[day.isoformat()] = lines
+        return out
 
-        # Marcar vistos
-        if gid:
-            seen_ids.add(gid)
-        seen_keys.add(canon_key)
-
-        # Formato de salida
-        try:
-            fecha_hora = d_local.strftime("%d-%m-%Y - %-I:%M %p").lower()
-        except Exception:
-            fecha_hora = d_local.strftime("%d-%m-%Y - %#I:%M %p").lower()
-
-        items.append((d_local, f"{home} {hr} - {away} {ar}  - {fecha_hora} (hora Chile)"))
 
-    items.sort(key=lambda x: x[0])
-    return [s for _, s in items]
+# -------------------------------
+# Juegos jugados HOY (Chile) - FIX TZ + DEDUP EXTRA
+# -------------------------------
+def games_played_today_scl():
+    """
+    Lista juegos del DÍA (America/Santiago) en formato:
+      'Yankees 1 - Brewers 2  - 30-08-2025 - 3:28 pm (hora Chile)'
+    El día sigue DAY_WINDOW_MODE: "calendar" (00:00–23:59) o "sports" (06:00–05:59).
+    Mejoras:
+      - Deduplicación por id y también por (equipos, runs, pitcher_info).
+      - Si la fecha viene sin tz, se asume UTC y se convierte a America/Santiago.
+      - Se requiere que AMBOS participantes pertenezcan a la liga.
+      - Lectura directa del índice por día (sin re-escanear ni convertir zonas horarias).
+    """
+    with metrics.span("games_today"):
+        _ingest_league()
+        return _day_lines(_DAY_INDEX.get(current_day(), {}))
 
 
 # ====== FIN DEL BLOQUE ======
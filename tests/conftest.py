@@ -0,0 +1,77 @@
+# tests/conftest.py
+# Fixtures compartidas: motor de standings en estado limpio (como un proceso
+# recién iniciado) con sus archivos en un directorio temporal, y upstream falso.
+
+import os, sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "bench"))
+import replay
+import standings_cascade_points_desc as s
+import update_cache
+import upstream
+
+# Atributos que replay.reset_engine() redirige; se restauran al terminar cada test
+_REDIRECTED = ((s, "GAME_STORE_PATH"), (upstream, "RESPONSE_CACHE_PATH"),
+               (update_cache, "CACHE_FILE"), (update_cache, "GAMES_INDEX_FILE"),
+               (update_cache, "HISTORY_FILE"), (update_cache, "METRICS_FILE"),
+               (update_cache, "HEARTBEAT_FILE"))
+
+
+@pytest.fixture
+def engine(tmp_path, monkeypatch):
+    """
+    Devuelve reset(name, **modos): deja el motor limpio con esos modos y sus
+    archivos en tmp_path/name. Los modos y rutas se restauran al final.
+    """
+    for mod, name in _REDIRECTED:
+        monkeypatch.setattr(mod, name, getattr(mod, name))
+    for name in ("PRINT_CAPTURE_SUMMARY", "PRINT_CAPTURE_LIST", "PRINT_DETAILS", "DUMP_ENABLED"):
+        monkeypatch.setattr(s, name, False)
+    monkeypatch.setattr(s, "PAGES", s.PAGES)
+    monkeypatch.setattr(upstream, "RATE_LIMIT_PER_SEC", 0)
+    dirs = []
+
+    def reset(name, **overrides):
+        for k, v in overrides.items():
+            mod = upstream if hasattr(upstream, k) else s
+            monkeypatch.setattr(mod, k, getattr(mod, k))
+        tmpdir = tmp_path / name
+        tmpdir.mkdir()
+        dirs.append(str(tmpdir))
+        replay.reset_engine(str(tmpdir), overrides)
+        return s
+
+    yield reset
+    if dirs:
+        replay.reset_engine(dirs[-1], {})
+    s.use_league(s.DEFAULT_LEAGUE)
+    s.begin_refresh_cycle()
+
+
+class FakeUpstream:
+    """upstream.fetch_page sobre páginas en memoria: registra cada pedido y falla las de `failing`."""
+    def __init__(self, pages_by_user):
+        self.pages = pages_by_user
+        self.failing = set()
+        self.calls = []
+
+    def fetch_page(self, username, page, anchor=None):
+        self.calls.append((username, page))
+        if (username, page) in self.failing:
+            return None
+        pages = self.pages.get(username, [])
+        return pages[page - 1]["game_history"] if 0 < page <= len(pages) else []
+
+
+@pytest.fixture
+def fake_upstream(monkeypatch):
+    """Devuelve install(pages_by_user) → FakeUpstream ya conectado al motor."""
+    def install(pages_by_user):
+        fake = FakeUpstream(pages_by_user)
+        monkeypatch.setattr(upstream, "fetch_page", fake.fetch_page)
+        return fake
+    return install
@@ -0,0 +1,48 @@
+# tests/test_cache_write.py
+# write_cache_atomic: el archivo se lee una sola vez por proceso; un ciclo sin
+# cambios no toca disco ni publica, y el primero publica aunque no haya cambiado.
+
+import os
+
+import pytest
+
+import update_cache
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(update_cache, "_LAST_HASH", {})
+    monkeypatch.setattr(update_cache, "PUBLISHERS", [])
+    reads = []
+    current = update_cache._current_cache_hash
+    monkeypatch.setattr(update_cache, "_current_cache_hash", lambda path: reads.append(path) or current(path))
+    return str(tmp_path / "standings_cache.json"), reads
+
+
+def test_unchanged_cycle_skips_file_and_publishers(cache):
+    path, reads = cache
+    published = []
+    assert update_cache.write_cache_atomic({"standings": [1]}, path)
+    update_cache.PUBLISHERS.append(lambda p, payload: published.append(payload["content_hash"]))
+
+    assert not update_cache.write_cache_atomic({"standings": [1], "last_updated": "otro"}, path)
+    assert published == [] and reads == [path]
+
+    assert update_cache.write_cache_atomic({"standings": [2]}, path)
+    assert len(published) == 1 and reads == [path]
+
+
+def test_first_cycle_publishes_existing_content(cache):
+    path, reads = cache
+    assert update_cache.write_cache_atomic({"standings": [1]}, path)
+    mtime = os.stat(path).st_mtime_ns
+
+    # Proceso nuevo (p. ej. otro líder): mismo contenido en disco
+    update_cache._LAST_HASH.clear()
+    published = []
+    update_cache.PUBLISHERS.append(lambda p, payload: published.append(p))
+    assert not update_cache.write_cache_atomic({"standings": [1]}, path)
+    assert published == [path]
+    assert os.stat(path).st_mtime_ns == mtime
+    assert not update_cache.write_cache_atomic({"standings": [1]}, path)
+    assert published == [path] and reads == [path, path]
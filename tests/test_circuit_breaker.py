@@ -0,0 +1,101 @@
+# tests/test_circuit_breaker.py
+# Semi-abierto: pasa una sola request de prueba y las concurrentes esperan su
+# resultado (no se cortan), así el ciclo de recuperación sale completo.
+
+import json, threading, time
+from datetime import datetime, timedelta
+
+import leagues
+import replay
+import upstream
+
+LEAGUE = replay.synthetic_league(6)
+
+
+def _tripped(cooldown=0.05):
+    breaker = upstream.CircuitBreaker(1, cooldown)
+    breaker.failure()
+    time.sleep(cooldown * 2)
+    assert breaker.allow()   # la prueba
+    return breaker
+
+
+def _concurrent_allows(breaker, n=5):
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(breaker.allow())) for _ in range(n)]
+    for t in threads:
+        t.start()
+    time.sleep(0.05)
+    assert not results   # esperan a la prueba
+    return threads, results
+
+
+def test_half_open_waiters_follow_probe_success():
+    breaker = _tripped()
+    threads, results = _concurrent_allows(breaker)
+    breaker.success()
+    for t in threads:
+        t.join(1)
+    assert results == [True] * 5
+
+
+def test_half_open_waiters_fail_fast_after_probe_failure():
+    breaker = _tripped()
+    threads, results = _concurrent_allows(breaker)
+    breaker.failure()
+    for t in threads:
+        t.join(1)
+    assert results == [False] * 5
+
+
+class _Response:
+    def __init__(self, data):
+        self.status_code = 200
+        self.headers = {}
+        self.content = json.dumps(data).encode()
+
+    def json(self):
+        return json.loads(self.content)
+
+
+class _Session:
+    """Sesión HTTP falsa: sirve las páginas con algo de latencia, o falla si `down`."""
+    def __init__(self, pages_by_user):
+        self.pages = pages_by_user
+        self.down = False
+
+    def get(self, url, params=None, timeout=None):
+        time.sleep(0.01)
+        if self.down:
+            raise ConnectionError("upstream caído")
+        pages = self.pages.get(params["username"], [])
+        page = params["page"]
+        return _Response(pages[page - 1] if 0 < page <= len(pages) else {"game_history": []})
+
+
+def test_recovery_cycle_after_outage_is_complete(engine, monkeypatch):
+    session = _Session(replay.synthetic_history(LEAGUE, 4, 10))
+    monkeypatch.setattr(upstream, "_SESSION", session)
+    monkeypatch.setattr(upstream, "_BREAKER", upstream.CircuitBreaker(2, 0.2))
+    monkeypatch.setattr(upstream, "RETRIES", 1)
+    s = engine("run", ENGINE="league", FETCH_WORKERS=6, INCREMENTAL=True, GAME_STORE_ENABLED=True,
+               RESPONSE_CACHE_ENABLED=False, CHANGE_DETECTION=True)
+    s.use_league(leagues.LeagueConfig(slug="test", league_order=LEAGUE,
+                                      since=datetime.utcnow() - timedelta(days=30)))
+    s.PAGES = (1, 2, 3, 4)
+
+    s.begin_refresh_cycle()
+    warm = s.compute_rows()
+
+    session.down = True
+    s.begin_refresh_cycle()
+    s.compute_rows()
+    assert s.PAGE_STORE_STATS["failed"]
+
+    time.sleep(0.3)   # pasa el cooldown
+    session.down = False
+    s.begin_refresh_cycle()
+    rows = s.compute_rows()
+    assert s.PAGE_STORE_STATS["failed"] == 0
+    assert not s.STALE_USERS and not s.DEGRADED_USERS
+    assert rows == warm
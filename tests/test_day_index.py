@@ -0,0 +1,62 @@
+# tests/test_day_index.py
+# El índice por día sólo guarda en memoria los días desde el corte (día local de
+# SINCE); los anteriores salen del almacén (o del estado) al pedirlos, con el
+# mismo resultado que si todo estuviera en memoria.
+
+from datetime import datetime, timedelta
+
+import pytest
+
+import leagues
+import replay
+
+LEAGUE = replay.synthetic_league(6)
+MODES = dict(ENGINE="league", FETCH_WORKERS=1, RESPONSE_CACHE_ENABLED=False, CHANGE_DETECTION=True)
+
+
+def _use_league(s, days_back):
+    s.use_league(leagues.LeagueConfig(slug="test", league_order=LEAGUE,
+                                      since=datetime.utcnow() - timedelta(days=days_back)))
+    s.PAGES = (1, 2, 3, 4)
+
+
+def _cycle(s):
+    s.begin_refresh_cycle()
+    s.compute_rows()
+    return s.games_index_by_day()
+
+
+@pytest.mark.parametrize("store,incremental", [(True, True), (False, True), (False, False)],
+                         ids=["store", "memory-incremental", "memory"])
+def test_old_days_served_on_demand(engine, fake_upstream, tmp_path, store, incremental):
+    history = replay.synthetic_history(LEAGUE, 4, 10)
+    fake = fake_upstream(history)
+
+    s = engine("all", GAME_STORE_ENABLED=store, INCREMENTAL=incremental, **MODES)
+    _use_league(s, 60)
+    expected = _cycle(s)
+
+    s = engine("window", GAME_STORE_ENABLED=store, INCREMENTAL=incremental, **MODES)
+    _use_league(s, 10)
+    assert _cycle(s) == expected
+    # En memoria sólo quedan días posteriores a los armados desde el historial
+    old_days = s._OLD_DAYS["test"]
+    assert old_days and all(day > max(old_days) for day in s._DAY_INDEX)
+    assert all(rec.dt >= s._index_cutoff() for rec in s._RECORDS.values())
+
+    # Llega tarde un juego de un día anterior al corte: invalida las líneas armadas
+    late = dict(history[LEAGUE[0][0]][0]["game_history"][0], id=10 ** 6,
+                display_date=(datetime.utcnow() - timedelta(days=20)).strftime("%m/%d/%Y %H:%M:%S"),
+                home_name=LEAGUE[0][0], away_name=LEAGUE[1][0], game_mode="LEAGUE",
+                home_full_name=LEAGUE[0][1], away_full_name=LEAGUE[1][1])
+    for user in (LEAGUE[0][0], LEAGUE[1][0]):
+        history[user][0]["game_history"].insert(0, late)
+    fake.pages = history
+    days = _cycle(s)
+    assert sum(map(len, days.values())) == sum(map(len, expected.values())) + 1
+
+    if store:
+        # Reinicio: el arranque lee del almacén sólo desde el corte; lo anterior, al pedirlo
+        replay.reset_engine(str(tmp_path / "window"), {})
+        _use_league(s, 10)
+        assert _cycle(s) == days
@@ -0,0 +1,46 @@
+# tests/test_degraded_publish.py
+# Un usuario con una página perdida (sin respaldo) sigue degradado hasta que se
+# recupere: en frío se publica marcado; con cache anterior, no se pisa.
+
+import json
+from datetime import datetime, timedelta
+
+import leagues
+import replay
+import update_cache
+
+LEAGUE = replay.synthetic_league(6)
+USER = LEAGUE[0][0]
+
+
+def _cache():
+    with open(update_cache.CACHE_FILE, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def test_degraded_until_recovered(engine, fake_upstream):
+    fake = fake_upstream(replay.synthetic_history(LEAGUE, 4, 10))
+    s = engine("run", ENGINE="league", FETCH_WORKERS=4, INCREMENTAL=True, GAME_STORE_ENABLED=True,
+               RESPONSE_CACHE_ENABLED=False, CHANGE_DETECTION=True)
+    s.use_league(leagues.LeagueConfig(slug="test", league_order=LEAGUE,
+                                      since=datetime.utcnow() - timedelta(days=30)))
+    s.PAGES = (1, 2, 3, 4)
+
+    # En frío: se publica igual, con el usuario en degraded_users y su fila marcada
+    fake.failing = {(USER, 3)}
+    assert update_cache.update_data_cache()
+    cache = _cache()
+    assert cache["degraded_users"] == [USER]
+    assert [r["user"] for r in cache["standings"] if r["stale"]] == [USER]
+
+    # Su p1 también falla: se reutiliza lo anterior, pero sigue incompleto → no se publica
+    fake.failing = {(USER, 1), (USER, 3)}
+    assert not update_cache.update_data_cache()
+    assert _cache() == cache
+
+    # Recuperado: tabla completa y sin marcas
+    fake.failing = set()
+    assert update_cache.update_data_cache()
+    cache = _cache()
+    assert cache["degraded_users"] == []
+    assert not any(r["stale"] for r in cache["standings"])
@@ -0,0 +1,46 @@
+# tests/test_dumps.py
+# Con DUMP_ENABLED, el cálculo de liga escribe los mismos <usuario>_*.jsonl que
+# el cálculo por equipo.
+
+import json
+from datetime import datetime, timedelta
+
+import pytest
+
+import leagues
+import replay
+
+LEAGUE = replay.synthetic_league(6)
+
+
+def _dump_ids(path):
+    out = {}
+    for f in sorted(path.iterdir()):
+        with open(f, "r", encoding="utf-8") as fh:
+            out[f.name] = sorted(json.loads(line)["id"] for line in fh)
+    return out
+
+
+def _run(engine, fake_upstream, tmp_path, name, **modes):
+    fake_upstream(replay.synthetic_history(LEAGUE, 4, 10))
+    s = engine(name, FETCH_WORKERS=1, INCREMENTAL=False, RESPONSE_CACHE_ENABLED=False,
+               CHANGE_DETECTION=False, DUMP_ENABLED=True, DUMP_DIR=str(tmp_path / f"{name}_out"), **modes)
+    s.use_league(leagues.LeagueConfig(slug="test", league_order=LEAGUE,
+                                      since=datetime.utcnow() - timedelta(days=30)))
+    s.PAGES = (1, 2, 3, 4)
+    s.begin_refresh_cycle()
+    s.compute_rows()
+    return _dump_ids(tmp_path / f"{name}_out")
+
+
+@pytest.mark.parametrize("store", [False, True], ids=["memory", "store"])
+def test_league_dumps_match_per_team(engine, fake_upstream, tmp_path, store):
+    per_team = _run(engine, fake_upstream, tmp_path, "per_team", ENGINE="per_team", GAME_STORE_ENABLED=store)
+    league = _run(engine, fake_upstream, tmp_path, "league", ENGINE="league", GAME_STORE_ENABLED=store)
+    assert len(league) == 3 * len(LEAGUE)
+    # Con almacén, la consulta del cálculo por equipo ya filtra por equipo: sólo "considered" coincide
+    kinds = ("raw", "dedup", "considered") if not store else ("considered",)
+    for name, ids in league.items():
+        if name.rsplit("_", 1)[1][:-len(".jsonl")] in kinds:
+            assert ids == per_team[name], name
+    assert any(ids for name, ids in league.items() if name.endswith("_considered.jsonl"))
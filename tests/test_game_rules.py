@@ -0,0 +1,56 @@
+# tests/test_game_rules.py
+# Exclusiones de game_rules: "scope": "all" saca el juego de la tabla y de las
+# listas; "games" sólo de las listas (la tabla queda como sin la regla).
+
+from datetime import datetime, timedelta
+
+import pytest
+
+import game_rules
+import leagues
+import replay
+
+LEAGUE = replay.synthetic_league(4)
+(HOME, HOME_TEAM), (AWAY, AWAY_TEAM) = LEAGUE[:2]
+
+
+def _history():
+    g = {"id": 9001, "game_mode": "LEAGUE",
+         "display_date": (datetime.utcnow() - timedelta(days=2)).strftime("%m/%d/%Y %H:%M:%S"),
+         "home_full_name": HOME_TEAM, "away_full_name": AWAY_TEAM, "home_name": HOME, "away_name": AWAY,
+         "home_display_result": "W", "away_display_result": "L", "home_runs": 0, "away_runs": 0,
+         "display_pitcher_info": "x"}
+    pages = {u: [{"game_history": []}] for u, _t in LEAGUE}
+    pages[HOME] = pages[AWAY] = [{"game_history": [g]}]
+    return pages
+
+
+def _run(engine, fake_upstream, monkeypatch, rules):
+    fake_upstream(_history())
+    s = engine("run", ENGINE="league", INCREMENTAL=False, GAME_STORE_ENABLED=False,
+               RESPONSE_CACHE_ENABLED=False, CHANGE_DETECTION=False)
+    s.use_league(leagues.LeagueConfig(slug="test", league_order=LEAGUE,
+                                      since=datetime.utcnow() - timedelta(days=30)))
+    s.PAGES = (1,)
+    monkeypatch.setattr(s, "GAME_RULES", game_rules.RuleSet(rules))
+    s.begin_refresh_cycle()
+    wins = {r["team"]: r["wins"] for r in s.compute_rows()}
+    listed = sum(len(lines) for lines in s.games_index_by_day().values())
+    return wins[HOME_TEAM], listed
+
+
+@pytest.mark.parametrize("scope, wins, listed", [(None, 0, 0), ("all", 0, 0), ("games", 1, 0)])
+def test_exclusion_scope(engine, fake_upstream, monkeypatch, scope, wins, listed):
+    rule = {"home_team": HOME_TEAM, "away_team": AWAY_TEAM, "home_runs": 0, "away_runs": 0}
+    if scope:
+        rule["scope"] = scope
+    assert _run(engine, fake_upstream, monkeypatch, [rule]) == (wins, listed)
+
+
+def test_no_rule(engine, fake_upstream, monkeypatch):
+    assert _run(engine, fake_upstream, monkeypatch, []) == (1, 1)
+
+
+def test_scope_only_for_exclusions():
+    with pytest.raises(ValueError):
+        game_rules.RuleSet([{"id": "1", "winner": "home", "scope": "games"}])
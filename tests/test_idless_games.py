@@ -0,0 +1,42 @@
+# tests/test_idless_games.py
+# Juegos sin id: no se guardan en el almacén, pero cuentan igual en todos los
+# modos (salen de la última pasada, como en el cálculo original).
+
+from datetime import datetime, timedelta
+
+import pytest
+
+import leagues
+import replay
+
+LEAGUE = replay.synthetic_league(4)
+(HOME, HOME_TEAM), (AWAY, AWAY_TEAM) = LEAGUE[:2]
+
+
+def _history():
+    g = {"game_mode": "LEAGUE",
+         "display_date": (datetime.utcnow() - timedelta(days=1)).strftime("%m/%d/%Y %H:%M:%S"),
+         "home_full_name": HOME_TEAM, "away_full_name": AWAY_TEAM, "home_name": HOME, "away_name": AWAY,
+         "home_display_result": "W", "away_display_result": "L", "home_runs": 3, "away_runs": 1,
+         "display_pitcher_info": "sin id"}
+    pages = {u: [{"game_history": []}] for u, _t in LEAGUE}
+    pages[HOME] = [{"game_history": [g]}]
+    pages[AWAY] = [{"game_history": [dict(g)]}]
+    return pages
+
+
+@pytest.mark.parametrize("engine_name", ["league", "per_team"])
+@pytest.mark.parametrize("store, incremental", [(False, False), (False, True), (True, True)],
+                         ids=["memory", "memory-incremental", "store"])
+def test_idless_game_counts_in_every_mode(engine, fake_upstream, engine_name, store, incremental):
+    fake_upstream(_history())
+    s = engine("run", ENGINE=engine_name, FETCH_WORKERS=1, INCREMENTAL=incremental, GAME_STORE_ENABLED=store,
+               RESPONSE_CACHE_ENABLED=False, CHANGE_DETECTION=incremental)
+    s.use_league(leagues.LeagueConfig(slug="test", league_order=LEAGUE,
+                                      since=datetime.utcnow() - timedelta(days=30)))
+    s.PAGES = (1,)
+    for _cycle in range(2):
+        s.begin_refresh_cycle()
+        rows = {r["team"]: (r["wins"], r["losses"]) for r in s.compute_rows()}
+        assert rows[HOME_TEAM] == (1, 0)
+        assert rows[AWAY_TEAM] == (0, 1)
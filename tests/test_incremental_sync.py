@@ -0,0 +1,63 @@
+# tests/test_incremental_sync.py
+# Una página profunda perdida en la primera sincronización completa no puede
+# quedar perdida: el usuario sigue en pasadas completas hasta recuperarla.
+
+from datetime import datetime, timedelta
+
+import pytest
+
+import leagues
+import replay
+
+PAGES, PER_PAGE = 4, 10
+LEAGUE = replay.synthetic_league(6)
+USERS = [u for u, _team in LEAGUE]
+
+
+def _use_league(s):
+    s.use_league(leagues.LeagueConfig(slug="test", league_order=LEAGUE,
+                                      since=datetime.utcnow() - timedelta(days=30)))
+    s.PAGES = tuple(range(1, PAGES + 1))
+
+
+def _without_stale(rows):
+    return [{k: v for k, v in r.items() if k != "stale"} for r in rows]
+
+
+@pytest.mark.parametrize("store", [True, False], ids=["store", "memory"])
+@pytest.mark.parametrize("change_detection", [True, False], ids=["cd", "no-cd"])
+def test_lost_deep_page_is_refetched(engine, fake_upstream, store, change_detection):
+    history = replay.synthetic_history(LEAGUE, PAGES, PER_PAGE)
+    fake = fake_upstream(history)
+
+    s = engine("reference", ENGINE="league", FETCH_WORKERS=1, INCREMENTAL=False,
+               GAME_STORE_ENABLED=False, RESPONSE_CACHE_ENABLED=False, CHANGE_DETECTION=False)
+    _use_league(s)
+    s.begin_refresh_cycle()
+    expected = _without_stale(s.compute_rows())
+
+    s = engine("run", ENGINE="league", FETCH_WORKERS=4, INCREMENTAL=True, GAME_STORE_ENABLED=store,
+               RESPONSE_CACHE_ENABLED=False, CHANGE_DETECTION=change_detection)
+    _use_league(s)
+
+    # Ciclo 1: la p3 de cada usuario falla (sin respaldo) → filas incompletas y marcadas
+    fake.failing = {(u, 3) for u in USERS}
+    s.begin_refresh_cycle()
+    rows = s.compute_rows()
+    assert _without_stale(rows) != expected
+    assert all(r["stale"] for r in rows)
+
+    # Ciclo 2: el upstream vuelve; nadie quedó sincronizado → pasadas completas
+    fake.failing = set()
+    fake.calls.clear()
+    s.begin_refresh_cycle()
+    rows = s.compute_rows()
+    assert set(fake.calls) == {(u, p) for u in USERS for p in s.PAGES}
+    assert _without_stale(rows) == expected
+    assert not any(r["stale"] for r in rows)
+
+    # Ciclo 3: ya sincronizado, vuelve al modo incremental (sólo p1)
+    fake.calls.clear()
+    s.begin_refresh_cycle()
+    assert _without_stale(s.compute_rows()) == expected
+    assert set(fake.calls) == {(u, 1) for u in USERS}
@@ -0,0 +1,52 @@
+# tests/test_replay.py
+# bench/replay.py como test: cada modo del motor contra la copia congelada del
+# cálculo original, con un historial que crece entre ciclos y páginas caídas.
+
+from datetime import datetime, timedelta
+
+import leagues
+import replay
+import standings_cascade_points_desc as s
+import upstream
+
+LEAGUE = replay.synthetic_league(6)
+CYCLES = 4
+FAIL_CYCLE = 2
+
+
+def _scenario(monkeypatch):
+    monkeypatch.setattr(s, "PAGES", (1, 2, 3, 4))
+    monkeypatch.setattr(upstream, "BACKOFF_BASE", 0)
+    cfg = leagues.LeagueConfig(slug="test", league_order=LEAGUE, since=datetime.utcnow() - timedelta(days=30))
+    history = replay.GrowingHistory(LEAGUE, 4, 10)
+    snapshots = []
+    for cycle in range(CYCLES):
+        if cycle:
+            history.grow(4)
+        snapshots.append(history.snapshot())
+    plan = replay.failure_plan(cfg.fetch_usernames(), CYCLES, {FAIL_CYCLE})
+    return cfg, snapshots, plan
+
+
+def test_all_modes_match_baseline(engine, monkeypatch):
+    engine("setup")
+    cfg, snapshots, plan = _scenario(monkeypatch)
+    assert snapshots[0] != snapshots[-1]
+    assert replay.replay(cfg, snapshots, plan, out=lambda *a: None) == []
+
+
+def test_failed_page_marks_row_stale(engine, monkeypatch):
+    # Sin caches ni store: la p1 caída del 2º usuario no tiene respaldo fresco
+    engine("league", **dict(replay.ENGINE_MODES[1][1]))
+    cfg, snapshots, plan = _scenario(monkeypatch)
+    api = replay.FakeAPI(snapshots[0])
+    monkeypatch.setattr(upstream, "API", api.url)
+    monkeypatch.setattr(s, "DAY_WINDOW_MODE", "calendar")
+    s.use_league(cfg)
+    try:
+        results, _report = replay.run_mode(api, dict(replay.ENGINE_MODES[1][1]), snapshots, plan)
+    finally:
+        api.close()
+    stale = [{r["user"] for r in rows if r.get("stale")} for rows, _games in results]
+    assert stale[FAIL_CYCLE - 1] >= {LEAGUE[1][0]}
+    assert all(not users for c, users in enumerate(stale, 1) if c != FAIL_CYCLE)
@@ -1,112 +1,353 @@
 # update_cache.py
-# Genera el cache usando compute_rows() y games_played_today_scl() del módulo standings_*
-import json, os, sys, time
+# Genera el cache usando compute_rows() y games_played_today_scl() de standings_cascade_points_desc
+import hashlib, json, os, random, sys, tempfile, time
 from datetime import datetime
 from zoneinfo import ZoneInfo
 
-# --- Import robusto del módulo principal ---
-try:
-    import standings_cascade_points_desc as standings
-except Exception:
-    import standings_cascade_points as standings  # fallback si el nombre no tiene _desc
+import history
+import leagues
+import metrics
+import standings_cascade_points_desc as standings
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-CACHE_FILE = os.path.join(BASE_DIR, "standings_cache.json")
+CACHE_FILE = leagues.CACHE_FILE   # liga por defecto; el resto en standings_cache.<liga>.json
+# Juegos por día local (lo sirve /api/games); mismo esquema de nombres por liga
+GAMES_INDEX_FILE = leagues.GAMES_INDEX_FILE
+# Historial de standings: un delta por ciclo con cambios (lo sirve /api/history)
+HISTORY_FILE = leagues.HISTORY_FILE
+HISTORY_ENABLED = os.getenv("STANDINGS_HISTORY", "1") == "1"
+_HISTORY = {}   # ruta del log → HistoryLog (estado del último registro en memoria)
+# Métricas del worker (las lee app.py para /metrics)
+METRICS_FILE = os.getenv("METRICS_FILE", os.path.join(BASE_DIR, "refresh_stats.json"))
+# Latido: hora del último ciclo completado, cambien o no los datos (el cache sólo
+# se reescribe si cambió), y epoch del próximo ciclo; app.py lo sirve en /api/status
+# y la web sincroniza sus consultas con eso
+HEARTBEAT_FILE = os.getenv("HEARTBEAT_FILE", os.path.join(BASE_DIR, "refresh_heartbeat.json"))
+_HEARTBEAT = {"last_refresh": None, "next_refresh": None}
 SCL = ZoneInfo("America/Santiago")
 
-# --- Lista de exclusiones manuales ---
-# Caso 1: excluir por string exacto (cuando games_today es lista de strings)
-EXCLUDE_STRINGS = {
-    "Yankees 0 - 0 Mets - 08-09-2025 - 9:40 pm (hora Chile)",
-}
-
-# Caso 2: excluir por reglas (cuando games_today es lista de objetos)
-EXCLUDE_RULES = [
-    {
-        "home_team": "Yankees",
-        "away_team": "Mets",
-        "home_score": 0,
-        "away_score": 0,
-        "ended_at_local_contains": "08-09-2025 - 9:40"
+# --- Formato del cache ---
+CACHE_SCHEMA_VERSION = 1
+# "compact" = JSON minificado (por defecto) | "indent" = JSON legible (indent=2)
+CACHE_FORMAT = os.getenv("CACHE_FORMAT", "compact")
+
+# --- Resultado del último ciclo (lo usa el scheduler adaptativo) ---
+LAST_CYCLE = {"ok": False, "new_games": 0, "games_today": 0, "failed_pages": 0, "leagues": 0}
+
+# --- Publicadores extra ---
+# Funciones (path, payload) llamadas con cada cache que cambió, y con el primero
+# de cada archivo en el proceso aunque no haya cambiado (un líder nuevo del
+# refresher embebido publica así su primera versión en memoria compartida).
+PUBLISHERS = []
+# content_hash ya escrito y publicado por archivo: se siembra leyendo el archivo
+# una sola vez por proceso; después un ciclo sin cambios no toca disco ni publica
+_LAST_HASH = {}
+
+# --- Exclusiones manuales ---
+# Viven en game_rules.json (por id o por condiciones sobre el juego) y se aplican
+# al ingerir cada juego en el motor: afectan la tabla y los juegos de hoy, o sólo
+# los juegos de hoy si la regla tiene "scope": "games".
+
+
+def _content_hash(payload):
+    """Hash del contenido útil (sin last_updated ni el propio hash)."""
+    body = {k: v for k, v in payload.items() if k not in ("last_updated", "content_hash")}
+    raw = json.dumps(body, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _current_cache_hash(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return (json.load(f) or {}).get("content_hash")
+    except Exception:
+        return None
+
+
+def write_cache_atomic(payload, path=None):
+    """
+    Escribe el cache en un archivo temporal del mismo directorio y lo renombra
+    (os.replace es atómico): los lectores nunca ven un archivo a medio escribir.
+    Si el contenido no cambió respecto del cache actual, no reescribe (el mtime
+    no se mueve y la web no recarga). Devuelve True si escribió.
+    """
+    path = path or CACHE_FILE
+    payload = dict(payload, schema_version=CACHE_SCHEMA_VERSION)
+    content_hash = payload["content_hash"] = _content_hash(payload)
+    if path not in _LAST_HASH:
+        _LAST_HASH[path] = _current_cache_hash(path)
+    elif content_hash == _LAST_HASH[path]:
+        return False
+    for publish in PUBLISHERS:
+        publish(path, payload)
+    if content_hash == _LAST_HASH[path]:
+        return False
+
+    if CACHE_FORMAT == "indent":
+        raw = json.dumps(payload, ensure_ascii=False, indent=2)
+    else:
+        raw = json.dumps(payload, ensure_ascii=False, separators=(",", ":"))
+    _replace_file(path, raw)
+    _LAST_HASH[path] = content_hash
+    return True
+
+
+def _replace_file(path, raw):
+    """Escribe `raw` en un temporal del mismo directorio y lo renombra sobre `path`."""
+    fd, tmp = tempfile.mkstemp(prefix=".standings_cache.", suffix=".tmp", dir=os.path.dirname(path))
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(raw)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+
+
+def _write_heartbeat(**fields):
+    if _HEARTBEAT["last_refresh"] is None and "last_refresh" not in fields:
+        # Recién iniciado y sin ciclo exitoso aún: conservar el último del archivo
+        try:
+            with open(HEARTBEAT_FILE, "r", encoding="utf-8") as f:
+                _HEARTBEAT["last_refresh"] = (json.load(f) or {}).get("last_refresh")
+        except (OSError, ValueError):
+            pass
+    _HEARTBEAT.update(fields)
+    try:
+        _replace_file(HEARTBEAT_FILE, json.dumps(_HEARTBEAT))
+    except Exception as e:
+        print(f"[WARN] no se pudo escribir el latido: {e}")
+
+
+def _append_history(history_path, rows, days, t):
+    log = _HISTORY.get(history_path)
+    if log is None:
+        log = _HISTORY[history_path] = history.HistoryLog(history_path)
+    entry = log.append(rows, days, t)
+    if entry is not None:
+        print(f"Historial: registro {entry['kind']} en {os.path.basename(history_path)}")
+
+
+def _update_league(cfg, path, index_path, ts, history_path=None, t=None):
+    """
+    Calcula y escribe el cache de una liga. `ts` es la hora Chile del ciclo (para
+    mostrar) y `t` el mismo instante en epoch (orden del historial).
+    Devuelve la cantidad de juegos de hoy.
+    """
+    if cfg is not None:
+        standings.use_league(cfg)
+
+    # 1) Tabla
+    rows = standings.compute_rows()
+
+    # 2) Juegos de HOY (hora Chile; ya sin los juegos excluidos por game_rules.json)
+    games_today = standings.games_played_today_scl()
+
+    # 3) Fallos sin respaldo: no publicar una tabla degradada sobre una buena
+    # (sólo cuentan los usuarios de esta liga). En frío no hay cache anterior:
+    # se publica, con los usuarios afectados en degraded_users (la web lo avisa)
+    members = set(cfg.fetch_usernames()) if cfg is not None else None
+    degraded = sorted(u for u in standings.DEGRADED_USERS if members is None or u in members)
+    stale = {u for u in standings.STALE_USERS if members is None or u in members}
+    if degraded:
+        if os.path.exists(path):
+            raise RuntimeError(f"páginas sin datos ni respaldo para {', '.join(degraded)}; se mantiene el cache anterior")
+        print(f"[WARN] sin cache anterior: se publica una tabla incompleta (faltan páginas de {', '.join(degraded)})")
+
+    # 4) Escribir cache (sólo lo que necesita la web)
+    payload = {
+        "standings": rows,
+        "games_today": games_today,
+        "stale_users": sorted(stale | set(degraded)),
+        "degraded_users": degraded,
+        "last_updated": ts
     }
-]
-
-def _should_exclude_game(g):
-    # Si es string: comparación exacta contra EXCLUDE_STRINGS
-    if isinstance(g, str):
-        return g.strip() in EXCLUDE_STRINGS
-
-    # Si es objeto: coteja campos si existen
-    if isinstance(g, dict):
-        for rule in EXCLUDE_RULES:
-            ok = True
-            for k, v in rule.items():
-                if k == "ended_at_local_contains":
-                    if v not in (g.get("ended_at_local") or ""):
-                        ok = False
-                        break
-                else:
-                    if g.get(k) != v:
-                        ok = False
-                        break
-            if ok:
-                return True
-    return False
+    with metrics.span("cache_write"):
+        written = write_cache_atomic(payload, path)
+    if not written:
+        print(f"Sin cambios en los datos: {os.path.basename(path)} no reescrito.")
 
+    # 5) Índice de juegos por día
+    day_window = standings.DAY_WINDOW_MODE
+    index = {
+        "day_window": day_window,
+        # hora local en que empieza cada día (la web calcula "hoy" con esto)
+        "day_start_hour": standings.SPORTS_DAY_START_HOUR if day_window == "sports" else 0,
+        "days": standings.games_index_by_day(),
+        "last_updated": ts,
+    }
+    with metrics.span("cache_write"):
+        write_cache_atomic(index, index_path)
 
-def update_data_cache():
-    ts = datetime.now(SCL).strftime('%Y-%m-%d %H:%M:%S')
+    # 6) Historial (delta contra el ciclo anterior)
+    if HISTORY_ENABLED and history_path:
+        with metrics.span("cache_write"):
+            _append_history(history_path, rows, index["days"], int(time.time()) if t is None else t)
+    return len(games_today)
+
+
+def update_data_cache(full_resync=False):
+    now = datetime.now(SCL)
+    ts, t = now.strftime('%Y-%m-%d %H:%M:%S'), int(now.timestamp())
     print(f"[{ts}] Iniciando actualización del cache...")
 
     try:
-        # Validaciones mínimas para que el error sea claro si faltara algo
-        if not hasattr(standings, "compute_rows"):
-            raise AttributeError("El módulo no define compute_rows()")
-        if not hasattr(standings, "games_played_today_scl"):
-            raise AttributeError("El módulo no define games_played_today_scl()")
-
-        # 1) Tabla
-        rows = standings.compute_rows()
-
-        # 2) Juegos de HOY (hora Chile)
-        games_today = standings.games_played_today_scl()
-
-        # 3) Aplicar exclusiones manuales
-        games_today = [g for g in games_today if not _should_exclude_game(g)]
-
-        # 4) Escribir cache (sólo lo que necesita la web)
-        payload = {
-            "standings": rows,
-            "games_today": games_today,
-            "last_updated": ts
-        }
-        with open(CACHE_FILE, "w", encoding="utf-8") as f:
-            json.dump(payload, f, ensure_ascii=False, indent=2)
+        # Ligas desde leagues/*.json; sin archivos, la liga del propio módulo
+        configs = leagues.load_leagues()
+
+        # 0) Nuevo ciclo: cada (usuario, página) se descarga una sola vez,
+        # aunque el usuario juegue en varias ligas
+        standings.begin_refresh_cycle(full_resync=full_resync)
+        if configs:
+            standings.register_leagues(configs)
 
+        games_today = 0
+        errors = []
+        if not configs:
+            games_today = _update_league(None, CACHE_FILE, GAMES_INDEX_FILE, ts, HISTORY_FILE, t)
+        else:
+            default = leagues.default_slug(configs)
+            for cfg in configs:
+                if cfg.slug == default:
+                    path, index_path, history_path = CACHE_FILE, GAMES_INDEX_FILE, HISTORY_FILE
+                else:
+                    path = leagues.cache_file_for(cfg.slug, default)
+                    index_path = leagues.games_index_file_for(cfg.slug, default)
+                    history_path = leagues.history_file_for(cfg.slug, default)
+                try:
+                    games_today += _update_league(cfg, path, index_path, ts, history_path, t)
+                except Exception as e:
+                    # Una liga con problemas no frena a las demás
+                    print(f"ERROR en la liga {cfg.slug}: {e}")
+                    errors.append(cfg.slug)
+        if errors:
+            raise RuntimeError(f"ligas sin actualizar: {', '.join(errors)}")
+
+        stats = standings.PAGE_STORE_STATS
+        print(f"Páginas descargadas: {stats['fetched']}  (ahorradas: {stats['saved']})")
+        LAST_CYCLE.update(ok=True, new_games=stats.get("new_games", 0), games_today=games_today,
+                          failed_pages=stats.get("failed", 0), leagues=len(configs) or 1)
         print("Actualización completada exitosamente.")
+        _write_heartbeat(last_refresh=ts, next_refresh=None)
+        _write_metrics(True)
         return True
     except Exception as e:
         print(f"ERROR durante la actualización del cache: {e}")
+        LAST_CYCLE.update(ok=False, new_games=0, games_today=0, failed_pages=0)
+        _write_metrics(False)
         return False
 
 
+def _write_metrics(ok):
+    metrics.end_cycle(ok)
+    try:
+        metrics.write_stats(METRICS_FILE)
+    except Exception as e:
+        print(f"[WARN] no se pudieron escribir las métricas: {e}")
+
+
+class RefreshScheduler:
+    """
+    Intervalo adaptativo entre ciclos:
+      - ids nuevos en p1            → MIN (actividad en curso)
+      - juegos hoy u hora peak      → BASE
+      - sin actividad               → BASE * 2^n, hasta MAX
+      - error / páginas fallidas    → BASE * 2^n con jitter, hasta MAX
+    Siempre con ±JITTER para no sincronizarse con otros clientes del upstream.
+    """
+    def __init__(self, base, min_interval, max_interval, peak_hours, jitter=0.1):
+        self.base = base
+        self.min = min_interval
+        self.max = max_interval
+        self.peak_hours = peak_hours  # (inicio, fin) en horas Chile; puede cruzar medianoche
+        self.jitter = jitter
+        self.idle_streak = 0
+        self.error_streak = 0
+
+    def is_peak(self, now=None):
+        if not self.peak_hours:
+            return False
+        h = (now or datetime.now(SCL)).hour
+        start, end = self.peak_hours
+        return start <= h < end if start <= end else (h >= start or h < end)
+
+    def next_interval(self, cycle, now=None):
+        if not cycle["ok"] or cycle["failed_pages"]:
+            self.error_streak += 1
+            self.idle_streak = 0
+            interval = min(self.max, self.base * 2 ** (self.error_streak - 1))
+            # jitter completo hacia abajo para repartir reintentos
+            return max(self.min, random.uniform(interval / 2, interval))
+
+        self.error_streak = 0
+        if cycle["new_games"]:
+            self.idle_streak = 0
+            interval = self.min
+        elif cycle["games_today"] or self.is_peak(now):
+            self.idle_streak = 0
+            interval = self.base
+        else:
+            self.idle_streak += 1
+            interval = min(self.max, self.base * 2 ** self.idle_streak)
+        return max(1, min(self.max, interval * random.uniform(1 - self.jitter, 1 + self.jitter)))
+
+
+def _parse_peak_hours(s):
+    # "18-2" → (18, 2); vacío → None
+    if not s:
+        return None
+    a, b = s.split("-", 1)
+    return int(a), int(b)
+
+
+UPDATE_INTERVAL_SECONDS = int(os.getenv("UPDATE_INTERVAL_SECONDS", "300"))  # 5 min
+# Scheduler adaptativo (ADAPTIVE_SCHEDULE=0 vuelve al intervalo fijo)
+ADAPTIVE_SCHEDULE = os.getenv("ADAPTIVE_SCHEDULE", "1") == "1"
+
+
+def run_forever(full_resync=False, stop=None):
+    """
+    Bucle de refresco (worker propio o refresher embebido en la web). `stop` es
+    un threading.Event opcional para cortarlo entre ciclos.
+    """
+    scheduler = RefreshScheduler(
+        base=UPDATE_INTERVAL_SECONDS,
+        min_interval=int(os.getenv("MIN_INTERVAL_SECONDS", "60")),
+        max_interval=int(os.getenv("MAX_INTERVAL_SECONDS", "1800")),
+        peak_hours=_parse_peak_hours(os.getenv("PEAK_HOURS", "18-2")),
+    )
+    while stop is None or not stop.is_set():
+        update_data_cache(full_resync=full_resync)
+        full_resync = False
+        wait = scheduler.next_interval(LAST_CYCLE) if ADAPTIVE_SCHEDULE else UPDATE_INTERVAL_SECONDS
+        _write_heartbeat(next_refresh=int(time.time() + wait))
+        print(f"Esperando {wait:.0f} segundos para la próxima actualización...")
+        if stop is not None:
+            stop.wait(wait)
+        else:
+            time.sleep(wait)
+
+
 def _run_once_then_exit():
-    ok = update_data_cache()
+    ok = update_data_cache(full_resync=FULL_RESYNC)
     sys.exit(0 if ok else 1)
 
 
 if __name__ == "__main__":
+    # --full: ignora el estado incremental y baja todas las páginas en el primer ciclo
+    FULL_RESYNC = "--full" in sys.argv
+
     # Modo 1: una sola pasada (útil en Render antes de levantar la web)
     if "--once" in sys.argv or os.getenv("RUN_ONCE") == "1":
         _run_once_then_exit()
 
-    # Modo 2: bucle (local/worker)
-    UPDATE_INTERVAL_SECONDS = int(os.getenv("UPDATE_INTERVAL_SECONDS", "300"))  # 5 min
-    while True:
-        update_data_cache()
-        print(f"Esperando {UPDATE_INTERVAL_SECONDS} segundos para la próxima actualización...")
-        try:
-            time.sleep(UPDATE_INTERVAL_SECONDS)
-        except KeyboardInterrupt:
-            print("Detenido por el usuario.")
-            break
+    # Modo 2: bucle (local/worker). Con EMBEDDED_REFRESH=1 en la web no hace falta.
+    try:
+        run_forever(full_resync=FULL_RESYNC)
+    except KeyboardInterrupt:
+        print("Detenido por el usuario.")
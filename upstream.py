@@ -0,0 +1,313 @@
+# upstream.py
+# Capa HTTP hacia game_history: sesión compartida (keep-alive), límite de
+# requests por segundo, reintentos con backoff, circuit breaker, requests
+# idénticas en vuelo coalescidas, respeto de 429/Retry-After y cache de
+# respuestas en disco.
+# `requests` y el cache SQLite se cargan recién en la primera descarga, así
+# importar el motor (o este módulo) no paga ese costo.
+
+import json, os, random, threading, time
+import metrics
+
+API = os.getenv("GAME_HISTORY_API", "https://mlb25.theshow.com/apis/game_history.json")  # apuntable a un servidor local
+PLATFORM = "psn"
+TIMEOUT = 20            # seg de lectura
+CONNECT_TIMEOUT = 5     # seg para conectar (un host caído no espera TIMEOUT)
+RETRIES = 2
+BACKOFF_BASE = 0.4      # seg; se duplica por intento, con jitter
+
+# Conexiones keep-alive al host (una por hilo de descarga)
+POOL_SIZE = max(int(os.getenv("FETCH_WORKERS", "6")), 1)
+RATE_LIMIT_PER_SEC = float(os.getenv("RATE_LIMIT_PER_SEC", "8"))  # máx. requests/seg al host (0 = sin límite)
+
+# === Circuit breaker ===
+# Tras CIRCUIT_FAILURES fallos seguidos del host (conexión, timeout, 5xx) el
+# circuito se abre: fetch_page devuelve None al instante (el motor usa el
+# respaldo del cache HTTP) durante CIRCUIT_COOLDOWN seg. Después pasa una sola
+# request de prueba y las demás esperan su resultado: si anda, se cierra y
+# siguen todas; si no, vuelve a abrirse y fallan al instante.
+CIRCUIT_FAILURES = int(os.getenv("CIRCUIT_FAILURES", "5"))     # 0 = sin circuit breaker
+CIRCUIT_COOLDOWN = float(os.getenv("CIRCUIT_COOLDOWN", "60"))
+# 429: un Retry-After de hasta RETRY_AFTER_MAX_WAIT seg se espera (todos los
+# hilos); uno más largo abre el circuito hasta entonces
+RETRY_AFTER_MAX_WAIT = float(os.getenv("RETRY_AFTER_MAX_WAIT", "10"))
+
+# === Cache HTTP en disco (respuestas de game_history) ===
+# Sólo para arranque en frío y respaldo ante fallos: con el worker andando cada
+# página se pide al upstream (la p1 es la señal de actividad del scheduler).
+# En frío, las páginas de un usuario salen del cache sólo si su p1 tiene menos
+# de TTL_FIRST_PAGE seg, y las profundas sólo si se bajaron junto con esa p1:
+# las páginas se corren al llegar juegos nuevos, y una p2 vieja junto a una p1
+# más nueva perdería los juegos que pasaron de p1 a p2.
+RESPONSE_CACHE_ENABLED = os.getenv("RESPONSE_CACHE", "1") == "1"
+RESPONSE_CACHE_PATH = os.getenv("RESPONSE_CACHE_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "http_cache.db"))
+RESPONSE_CACHE_MAX_BYTES = int(float(os.getenv("RESPONSE_CACHE_MAX_MB", "50")) * 1024 * 1024)
+TTL_FIRST_PAGE = int(os.getenv("TTL_FIRST_PAGE", "60"))        # seg
+CACHE_COHERENCE_SECONDS = 10   # máx. diferencia entre la p1 y las demás páginas de un mismo ciclo
+
+_SESSION = None
+_SESSION_LOCK = threading.Lock()
+_RATE_LOCK = threading.Lock()
+_next_slot = 0.0
+
+
+def _session():
+    global _SESSION
+    with _SESSION_LOCK:
+        if _SESSION is None:
+            import requests
+            s = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=POOL_SIZE)
+            s.mount("https://", adapter)
+            s.mount("http://", adapter)
+            _SESSION = s
+        return _SESSION
+
+
+def _rate_limit():
+    """
+    Espacia las requests al host según RATE_LIMIT_PER_SEC (compartido entre
+    hilos) y respeta la pausa pedida por un 429 aunque no haya límite.
+    """
+    global _next_slot
+    with _RATE_LOCK:
+        now = time.monotonic()
+        slot = max(now, _next_slot)
+        if RATE_LIMIT_PER_SEC > 0:
+            _next_slot = slot + 1.0 / RATE_LIMIT_PER_SEC
+    if slot > now:
+        time.sleep(slot - now)
+
+
+def _defer_requests(seconds):
+    """Corre el próximo turno del limitador `seconds` hacia adelante (429 con Retry-After corto)."""
+    global _next_slot
+    with _RATE_LOCK:
+        _next_slot = max(_next_slot, time.monotonic() + seconds)
+
+
+def _retry_after(response):
+    """Segundos de Retry-After (número o fecha HTTP), o None."""
+    value = (response.headers.get("Retry-After") or "").strip()
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    from email.utils import parsedate_to_datetime
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+def _backoff(attempt):
+    if attempt + 1 < RETRIES:
+        time.sleep(BACKOFF_BASE * 2 ** attempt * random.uniform(0.5, 1.5))
+
+
+class CircuitBreaker:
+    """Cerrado → (fallos seguidos) abierto → (cooldown) una prueba → cerrado / abierto."""
+    def __init__(self, threshold, cooldown):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.open_until = 0.0   # 0 = cerrado
+        self.probing = False
+        self._probe_done = None  # Event de la prueba en curso (los demás hilos la esperan)
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """
+        True si la request puede salir. Semi-abierto: la primera pasa como prueba
+        y las concurrentes esperan su resultado en vez de fallar al instante.
+        """
+        if self.threshold <= 0:
+            return True
+        while True:
+            with self._lock:
+                if not self.open_until:
+                    return True
+                if time.monotonic() < self.open_until:
+                    return False
+                if not self.probing:
+                    self.probing = True
+                    self._probe_done = threading.Event()
+                    return True
+                probe_done = self._probe_done
+            probe_done.wait()
+
+    def success(self):
+        with self._lock:
+            self.failures = 0
+            self.open_until = 0.0
+            self._end_probe()
+
+    def failure(self):
+        if self.threshold <= 0:
+            return
+        with self._lock:
+            self.failures += 1
+            if self.probing or (not self.open_until and self.failures >= self.threshold):
+                self._open(self.cooldown)
+
+    def open_for(self, seconds):
+        with self._lock:
+            self._open(max(seconds, self.open_until - time.monotonic()))
+
+    def _open(self, seconds):
+        self.open_until = time.monotonic() + seconds
+        self._end_probe()
+        metrics.inc("circuit_trips")
+        print(f"[WARN] circuito abierto por {seconds:.0f}s: requests a game_history suspendidas")
+
+    def _end_probe(self):
+        self.probing = False
+        if self._probe_done is not None:
+            self._probe_done.set()
+            self._probe_done = None
+
+
+_BREAKER = CircuitBreaker(CIRCUIT_FAILURES, CIRCUIT_COOLDOWN)
+
+# Requests idénticas en vuelo: (username, page) → _Call; los demás hilos esperan su resultado
+_INFLIGHT = {}
+_INFLIGHT_LOCK = threading.Lock()
+
+
+class _Call:
+    __slots__ = ("done", "result")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+
+
+_RESPONSE_CACHE = None
+
+
+def response_cache():
+    """ResponseCache compartido (o None si RESPONSE_CACHE=0)."""
+    global _RESPONSE_CACHE
+    if not RESPONSE_CACHE_ENABLED:
+        return None
+    with _SESSION_LOCK:
+        if _RESPONSE_CACHE is None:
+            from response_cache import ResponseCache
+            _RESPONSE_CACHE = ResponseCache(RESPONSE_CACHE_PATH, RESPONSE_CACHE_MAX_BYTES)
+        return _RESPONSE_CACHE
+
+
+def cached_page(username, page):
+    """Última respuesta guardada de la página aunque esté vencida (respaldo), o None."""
+    cache = response_cache()
+    body = cache.get(username, PLATFORM, page, ttl=None) if cache is not None else None
+    if body is None:
+        return None
+    return (json.loads(body) or {}).get("game_history") or []
+
+
+def cache_anchor(username, first_page):
+    """
+    Arranque en frío: momento (epoch) en que se guardó la p1 (`first_page`) de
+    `username` si tiene menos de TTL_FIRST_PAGE seg, o None (ir al upstream).
+    """
+    cache = response_cache()
+    if cache is None:
+        return None
+    fetched_at = cache.fetched_at(username, PLATFORM, first_page)
+    if fetched_at is None or time.time() - fetched_at > TTL_FIRST_PAGE:
+        return None
+    return fetched_at
+
+
+def fetch_page(username, page, anchor=None):
+    """
+    game_history de (username, page): con `anchor` (ver cache_anchor) desde el
+    cache en disco si la página se guardó junto con esa p1; si no, desde el
+    upstream con RETRIES intentos. Devuelve la lista de juegos, o None si falló
+    (o si el circuito está abierto). Si otro hilo ya está bajando la misma
+    página, espera y comparte su resultado.
+    """
+    key = (username, page)
+    with _INFLIGHT_LOCK:
+        call = _INFLIGHT.get(key)
+        owner = call is None
+        if owner:
+            call = _INFLIGHT[key] = _Call()
+    if not owner:
+        metrics.inc("coalesced")
+        call.done.wait()
+        return call.result
+    try:
+        call.result = _fetch_page(username, page, anchor)
+    finally:
+        with _INFLIGHT_LOCK:
+            del _INFLIGHT[key]
+        call.done.set()
+    return call.result
+
+
+def _fetch_page(username, page, anchor):
+    cache = response_cache()
+    if cache is not None and anchor is not None:
+        body = cache.get(username, PLATFORM, page, ttl=None, min_fetched_at=anchor - CACHE_COHERENCE_SECONDS)
+        if body is not None:
+            metrics.inc("cache_hits")
+            return (json.loads(body) or {}).get("game_history") or []
+
+    params = {"username": username, "platform": PLATFORM, "page": page}
+    last = None
+    for attempt in range(RETRIES):
+        if not _BREAKER.allow():
+            metrics.inc("short_circuits")
+            return None
+        if attempt:
+            metrics.inc("retries")
+        t0 = time.perf_counter()
+        try:
+            _rate_limit()
+            r = _session().get(API, params=params, timeout=(CONNECT_TIMEOUT, TIMEOUT))
+        except Exception as e:
+            # conexión / timeout: el host no responde
+            last = e
+            _BREAKER.failure()
+            _backoff(attempt)
+            continue
+        metrics.observe_request(username, time.perf_counter() - t0, len(r.content or b""))
+
+        if r.status_code == 429:
+            metrics.inc("rate_limited")
+            last = "HTTP 429"
+            wait = _retry_after(r)
+            if wait is not None and wait > RETRY_AFTER_MAX_WAIT:
+                _BREAKER.open_for(wait)
+                break
+            _BREAKER.success()   # el host responde; sólo pide bajar el ritmo
+            _defer_requests(wait if wait is not None else BACKOFF_BASE * 2 ** attempt)
+            continue
+        if r.status_code >= 500:
+            last = f"HTTP {r.status_code}"
+            _BREAKER.failure()
+            _backoff(attempt)
+            continue
+        if r.status_code >= 400:
+            # error del pedido (p. ej. usuario inexistente): reintentar no sirve
+            _BREAKER.success()
+            last = f"HTTP {r.status_code}"
+            break
+        try:
+            items = (r.json() or {}).get("game_history") or []
+        except Exception as e:   # cuerpo inválido
+            last = e
+            _BREAKER.failure()
+            _backoff(attempt)
+            continue
+        _BREAKER.success()
+        if cache is not None:
+            cache.put(username, PLATFORM, page, r.content)
+        return items
+    print(f"[WARN] {username} p{page} sin datos ({last})")
+    metrics.inc("failures")
+    return None